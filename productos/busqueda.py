@@ -0,0 +1,100 @@
+from django.db import connection
+from rest_framework.filters import SearchFilter
+
+# -----------------------------------------------------------------------------
+# BÚSQUEDA DE PRODUCTOS CON SQLite FTS5 (tokenizador trigram)
+# La tabla virtual es un índice de contenido externo sobre productos_producto
+# y se mantiene sincronizada con triggers, así también cubre bulk_create,
+# update() y cambios hechos fuera del ORM.
+# -----------------------------------------------------------------------------
+TABLA_FTS = 'productos_producto_fts'
+
+# El trigram no puede buscar términos de menos de 3 caracteres
+LARGO_MINIMO = 3
+
+SQL_INSTALAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        nombre, sku,
+        content='productos_producto', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON productos_producto BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, nombre, sku) VALUES (new.id, new.nombre, new.sku);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON productos_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, sku) VALUES ('delete', old.id, old.nombre, old.sku);
+    END
+    """,
+    # Sólo nombre y sku: los UPDATE de stock o precio no tocan el índice
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF nombre, sku ON productos_producto BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, nombre, sku) VALUES ('delete', old.id, old.nombre, old.sku);
+        INSERT INTO {TABLA_FTS}(rowid, nombre, sku) VALUES (new.id, new.nombre, new.sku);
+    END
+    """,
+    f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_DESINSTALAR = [
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {TABLA_FTS}_au",
+    f"DROP TABLE IF EXISTS {TABLA_FTS}",
+]
+
+
+def instalar_fts(conexion):
+    """
+    Crea (o repara) la tabla FTS y sus triggers y reindexa el catálogo.
+    Es idempotente: hay que volver a ejecutarlo si una migración reconstruye
+    productos_producto, porque SQLite borra los triggers junto con la tabla.
+    """
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        for sql in SQL_INSTALAR:
+            cursor.execute(sql)
+
+
+def desinstalar_fts(conexion):
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        for sql in SQL_DESINSTALAR:
+            cursor.execute(sql)
+
+
+def expresion_fts(terminos):
+    # Cada término como frase literal ("" escapa comillas); FTS5 los une con AND
+    return ' '.join('"{}"'.format(t.replace('"', '""')) for t in terminos)
+
+
+class BusquedaProductoFilter(SearchFilter):
+    """
+    Igual que SearchFilter (mismo parámetro `search`), pero en SQLite resuelve
+    la búsqueda con el índice FTS5 y ordena por relevancia (bm25).
+    Para términos cortos u otros motores vuelve al LIKE de SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terminos = self.get_search_terms(request)
+        if not terminos:
+            return queryset
+
+        usar_fts = (
+            connection.vendor == 'sqlite'
+            and all(len(t) >= LARGO_MINIMO for t in terminos)
+        )
+        if not usar_fts:
+            return super().filter_queryset(request, queryset, view)
+
+        return (
+            queryset
+            .filter(busqueda__indice__coincide=expresion_fts(terminos))
+            .order_by('busqueda__rank', 'pk')
+        )
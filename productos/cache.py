@@ -0,0 +1,122 @@
+import time
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .models import Producto
+
+# -----------------------------------------------------------------------------
+# CACHÉ VERSIONADA DEL CATÁLOGO
+# Cualquier escritura en Producto cambia la versión (ver productos/signals.py).
+# Las respuestas se guardan por versión + URL, así nunca hay que borrarlas:
+# una versión nueva simplemente deja de encontrar las anteriores.
+# El stock tiene su propia versión: una venta no invalida las respuestas,
+# sólo el mapa id -> stock que se les superpone al servirlas.
+# -----------------------------------------------------------------------------
+VERSION_CACHE_KEY = 'productos:catalogo_version'
+STOCK_VERSION_CACHE_KEY = 'productos:stock_version'
+RESPUESTA_TIMEOUT = 60 * 60
+
+
+def cache_catalogo():
+    return caches['catalogo']
+
+
+def _nueva_version(clave):
+    version = {"token": f"{time.time_ns():x}", "modificado": time.time()}
+    cache_catalogo().set(clave, version, timeout=None)
+    return version
+
+
+def invalidar_catalogo():
+    """
+    Genera una versión nueva del catálogo. Las señales la llaman en save() y
+    delete(); quien escriba con update() o bulk_create() debe llamarla a mano.
+    """
+    return _nueva_version(VERSION_CACHE_KEY)
+
+
+def invalidar_stock():
+    """Para update() que sólo cambian el stock (ventas y sus reversas)."""
+    return _nueva_version(STOCK_VERSION_CACHE_KEY)
+
+
+def obtener_version(clave=VERSION_CACHE_KEY):
+    version = cache_catalogo().get(clave)
+    if version is None:
+        # Caché vacía (reinicio o limpieza): partimos con una versión nueva
+        version = _nueva_version(clave)
+    return version
+
+
+def filas_con_stock(datos):
+    # Filas de la respuesta que muestran stock (?fields= puede omitirlo)
+    filas = datos if isinstance(datos, list) else [datos]
+    return [fila for fila in filas if 'id' in fila and 'stock' in fila]
+
+
+class CatalogoVersionadoMixin:
+    """
+    Para ViewSets del catálogo: list y retrieve responden desde la caché de la
+    versión vigente, con ETag y Last-Modified. Si el cliente ya tiene la
+    versión actual se responde 304 sin tocar la BD ni serializar.
+    """
+
+    def list(self, request, *args, **kwargs):
+        generar = super().list
+        return self.respuesta_versionada(request, lambda: generar(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        generar = super().retrieve
+        return self.respuesta_versionada(request, lambda: generar(request, *args, **kwargs))
+
+    def respuesta_versionada(self, request, generar):
+        version = obtener_version()
+        version_stock = obtener_version(STOCK_VERSION_CACHE_KEY)
+        etag = f'"{version["token"]}.{version_stock["token"]}"'
+        modificado = int(max(version["modificado"], version_stock["modificado"]))
+
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if no_modificado is not None:
+            no_modificado['ETag'] = etag
+            return no_modificado
+
+        ruta = request.get_full_path()
+        clave = f"productos:respuesta:{version['token']}:{ruta}"
+        clave_stock = f"productos:stock:{version['token']}:{version_stock['token']}:{ruta}"
+        datos = cache_catalogo().get(clave)
+        if datos is None:
+            respuesta = generar()
+            if respuesta.status_code != 200:
+                return respuesta
+            datos = respuesta.data
+            cache_catalogo().set(clave, datos, timeout=RESPUESTA_TIMEOUT)
+            stock = {fila['id']: fila['stock'] for fila in filas_con_stock(datos)}
+            cache_catalogo().set(clave_stock, stock, timeout=RESPUESTA_TIMEOUT)
+        else:
+            self.poner_stock_vigente(datos, clave_stock)
+
+        respuesta = Response(datos)
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(modificado)
+        # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+        respuesta['Cache-Control'] = 'private, no-cache'
+        return respuesta
+
+    def poner_stock_vigente(self, datos, clave_stock):
+        """
+        Reemplaza el stock de una respuesta guardada por el de la versión de
+        stock vigente: tras una venta, una consulta de (id, stock) de las filas
+        de esta respuesta en vez de volver a buscar y serializar todo.
+        """
+        filas = filas_con_stock(datos)
+        if not filas:
+            return
+        stock = cache_catalogo().get(clave_stock)
+        if stock is None:
+            ids = [fila['id'] for fila in filas]
+            stock = dict(Producto.objects.filter(pk__in=ids).values_list('id', 'stock'))
+            cache_catalogo().set(clave_stock, stock, timeout=RESPUESTA_TIMEOUT)
+        # La caché devuelve una copia (pickle): se puede modificar en el lugar
+        for fila in filas:
+            fila['stock'] = stock.get(fila['id'], fila['stock'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from productos.busqueda import instalar_fts
+
+
+class Command(BaseCommand):
+    help = "Recrea el índice FTS5 de productos y sus triggers, y reindexa el catálogo."
+
+    def handle(self, *args, **options):
+        instalar_fts(connection)
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda de productos reconstruido."))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:46
+
+from django.db import migrations, models
+
+
+def sku_vacio_a_null(apps, schema_editor):
+    # Varios '' chocarían con el índice único; NULL sí puede repetirse
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.filter(sku='').update(sku=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0003_alter_producto_sku'),
+    ]
+
+    operations = [
+        migrations.RunPython(sku_vacio_a_null, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='producto',
+            name='sku',
+            field=models.CharField(blank=True, max_length=12, null=True, unique=True),
+        ),
+    ]
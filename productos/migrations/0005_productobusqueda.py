@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:49
+
+import django.db.models.deletion
+import productos.models
+from django.db import migrations, models
+from productos.busqueda import desinstalar_fts, instalar_fts
+
+
+def crear_indice_fts(apps, schema_editor):
+    instalar_fts(schema_editor.connection)
+
+
+def borrar_indice_fts(apps, schema_editor):
+    desinstalar_fts(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_sku_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductoBusqueda',
+            fields=[
+                ('producto', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busqueda', serialize=False, to='productos.producto')),
+                ('nombre', models.TextField()),
+                ('sku', models.TextField(null=True)),
+                ('indice', productos.models.ColumnaFTS(db_column='productos_producto_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'productos_producto_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(crear_indice_fts, borrar_indice_fts),
+    ]
@@ -1,10 +1,45 @@
 from django.db import models
+from django.db.models import Lookup
 
 class Producto(models.Model):
-    sku = models.CharField(max_length= 12, null=True, blank=True)
+    sku = models.CharField(max_length= 12, null=True, blank=True, unique=True)
     nombre = models.CharField(max_length=100)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.IntegerField(default=0)
 
     def __str__(self):
         return self.nombre
+
+
+
+# -----------------------------------------------------------------------------
+# ÍNDICE DE BÚSQUEDA (tabla virtual FTS5, ver productos/busqueda.py)
+# -----------------------------------------------------------------------------
+class ColumnaFTS(models.TextField):
+    """Columna oculta de una tabla FTS5 (se llama igual que la tabla)."""
+
+
+@ColumnaFTS.register_lookup
+class Coincide(Lookup):
+    lookup_name = 'coincide'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class ProductoBusqueda(models.Model):
+    # Sólo lectura: los triggers de SQLite la mantienen al día
+    producto = models.OneToOneField(
+        Producto, primary_key=True, db_column='rowid', db_constraint=False,
+        on_delete=models.DO_NOTHING, related_name='busqueda',
+    )
+    nombre = models.TextField()
+    sku = models.TextField(null=True)
+    indice = ColumnaFTS(db_column='productos_producto_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'productos_producto_fts'
@@ -1,7 +1,12 @@
 from rest_framework import serializers
+from tienda.campos import CamposDinamicosMixin
 from .models import Producto
 
-class ProductoSerializer(serializers.ModelSerializer):
+class ProductoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Producto
         fields = '__all__'
+
+    def validate_sku(self, value):
+        # SKU vacío se guarda como NULL para no chocar con el índice único
+        return value or None
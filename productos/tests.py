@@ -1,3 +1,90 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from usuarios.models import User
+from .cache import cache_catalogo
+from .models import Producto
 
-# Create your tests here.
+
+class BusquedaProductoTests(APITestCase):
+    def setUp(self):
+        cache_catalogo().clear()
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        Producto.objects.bulk_create([
+            Producto(nombre="Coca Cola 1.5L", sku="BEB-001", precio=Decimal('1990.00')),
+            Producto(nombre="Pepsi Cola Cola 3L", sku="BEB-002", precio=Decimal('2490.00')),
+            Producto(nombre="Arroz Grado 1", sku="ABA-010", precio=Decimal('1290.00')),
+        ])
+
+    def buscar(self, termino):
+        resp = self.client.get('/api/productos/', {'search': termino})
+        self.assertEqual(resp.status_code, 200)
+        return [p['nombre'] for p in resp.data]
+
+    def test_busca_subcadena_en_nombre_y_sku(self):
+        self.assertEqual(set(self.buscar('cola')), {"Coca Cola 1.5L", "Pepsi Cola Cola 3L"})
+        self.assertEqual(self.buscar('a-01'), ["Arroz Grado 1"])
+
+    def test_ordena_por_relevancia(self):
+        self.assertEqual(self.buscar('cola')[0], "Pepsi Cola Cola 3L")
+
+    def test_varios_terminos_se_combinan_con_and(self):
+        self.assertEqual(self.buscar('cola pepsi'), ["Pepsi Cola Cola 3L"])
+
+    def test_indice_sigue_los_cambios(self):
+        arroz = Producto.objects.get(sku="ABA-010")
+        arroz.nombre = "Fideos Spaghetti"
+        arroz.save()
+        Producto.objects.filter(sku="BEB-001").delete()
+
+        self.assertEqual(self.buscar('arroz'), [])
+        self.assertEqual(self.buscar('spaghetti'), ["Fideos Spaghetti"])
+        self.assertEqual(self.buscar('coca'), [])
+
+    def test_terminos_cortos_usan_like(self):
+        self.assertEqual(set(self.buscar('co')), {"Coca Cola 1.5L", "Pepsi Cola Cola 3L"})
+
+
+class CatalogoVersionadoTests(APITestCase):
+    def setUp(self):
+        cache_catalogo().clear()
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1290.00'))
+
+    def test_etag_vigente_responde_304_sin_consultas(self):
+        primera = self.client.get('/api/productos/')
+        self.assertIn('Last-Modified', primera)
+
+        with CaptureQueriesContext(connection) as ctx:
+            segunda = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=primera['ETag'])
+
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_lista_cacheada_hasta_que_cambia_un_producto(self):
+        etag = self.client.get('/api/productos/')['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/productos/')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        self.producto.precio = Decimal('1390.00')
+        self.producto.save()
+        resp = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual(resp.data[0]['precio'], '1390.00')
+
+    def test_detalle_inexistente_no_se_cachea(self):
+        self.assertEqual(self.client.get('/api/productos/999/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/productos/{self.producto.id}/').status_code, 200)
+
+    def test_fields_se_cachea_aparte_de_la_lista_completa(self):
+        completa = self.client.get('/api/productos/').data[0]
+        self.assertIn('stock', completa)
+
+        liviana = self.client.get('/api/productos/', {"fields": "id,nombre,precio"}).data[0]
+        self.assertEqual(set(liviana), {"id", "nombre", "precio"})
@@ -4,12 +4,15 @@ from usuarios.permisos import IsAdmin, IsAdminOrVendedor
 from .models import Producto
 from .serializers import ProductoSerializer
 
-from rest_framework.filters import SearchFilter
+from .busqueda import BusquedaProductoFilter
+from .cache import CatalogoVersionadoMixin
+from tienda.campos import CamposDinamicosViewMixin
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(CatalogoVersionadoMixin, CamposDinamicosViewMixin, viewsets.ModelViewSet):
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
     permission_classes = [IsAuthenticated, IsAdminOrVendedor]  
 
-    filter_backends = [SearchFilter]
+    # FTS5 en SQLite; search_fields se usa como respaldo (LIKE) en términos cortos
+    filter_backends = [BusquedaProductoFilter]
     search_fields = ['nombre', 'sku' ]
\ No newline at end of file
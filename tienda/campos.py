@@ -0,0 +1,100 @@
+"""
+Campos a pedido para los serializers de la API (sparse fieldsets).
+
+    ?fields=id,numero_boleta,total_final   sólo esos campos
+    ?expand=detalles                       incluye relaciones anidadas
+
+Los campos de Meta.campos_expandibles (p. ej. detalles) no salen en los
+listados salvo que se pidan con ?expand= o se nombren en ?fields=; en el
+detalle de un objeto y en las respuestas de escritura salen siempre. El ViewSet carga de la BD sólo
+las columnas que el serializer va a leer y prefetchea sólo lo expandido.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def leer_lista(valor):
+    return {nombre.strip() for nombre in valor.split(',') if nombre.strip()} if valor else set()
+
+
+class CamposDinamicosMixin:
+    """Para ModelSerializers: aplica 'campos', 'expandir' y 'listado' del contexto."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        campos = self.context.get('campos')
+        expandibles = set(getattr(self.Meta, 'campos_expandibles', ()))
+        # Pedir una relación expandible en ?fields= también la expande
+        expandir = self.context.get('expandir', set()) | ((campos or set()) & expandibles)
+
+        pedidos = (campos or set()) | expandir
+        desconocidos = pedidos - set(self.fields)
+        if desconocidos:
+            raise ValidationError({"fields": f"Campos desconocidos: {', '.join(sorted(desconocidos))}."})
+
+        ocultar = set()
+        if self.context.get('listado'):
+            ocultar |= expandibles - expandir
+        if campos:
+            ocultar |= set(self.fields) - campos - expandir
+        for nombre in ocultar:
+            self.fields.pop(nombre)
+
+
+def columnas_de(serializer, modelo):
+    """
+    Columnas del modelo que leen los campos del serializer (para .only()),
+    o None si algún campo necesita el objeto completo (source='*', métodos).
+    """
+    columnas = {modelo._meta.pk.name}
+    for campo in serializer.fields.values():
+        if campo.source == '*':
+            return None
+        try:
+            campo_modelo = modelo._meta.get_field(campo.source.split('.')[0])
+        except FieldDoesNotExist:
+            return None
+        # Relaciones inversas/M2M (detalles) no son columnas: van por prefetch
+        if campo_modelo.concrete:
+            columnas.add(campo_modelo.name)
+    return columnas
+
+
+class CamposDinamicosViewMixin:
+    """
+    Para ViewSets cuyo serializer usa CamposDinamicosMixin. `expansiones`
+    asocia cada campo expandible con el prefetch que necesita.
+    """
+    expansiones = {}
+
+    def es_lectura(self):
+        return self.request is not None and self.request.method in SAFE_METHODS
+
+    def get_serializer_context(self):
+        contexto = super().get_serializer_context()
+        if self.es_lectura():
+            params = self.request.query_params
+            contexto.update(
+                campos=leer_lista(params.get('fields')) or None,
+                expandir=leer_lista(params.get('expand')),
+                listado=self.action == 'list',
+            )
+        return contexto
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.es_lectura():
+            # Escrituras: la respuesta lleva el objeto completo
+            for prefetch in self.expansiones.values():
+                queryset = queryset.prefetch_related(prefetch)
+            return queryset
+
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        for nombre, prefetch in self.expansiones.items():
+            if nombre in serializer.fields:
+                queryset = queryset.prefetch_related(prefetch)
+        columnas = columnas_de(serializer, queryset.model)
+        if columnas is not None:
+            queryset = queryset.only(*columnas)
+        return queryset
@@ -0,0 +1,120 @@
+"""
+Enrutamiento de base de datos: escrituras al primario ('default') y lecturas
+de reportes/listados a la réplica ('reporting').
+
+Sólo las vistas que lo piden (LecturaReplicaMixin) leen de la réplica, y sólo
+mientras el request no haya escrito nada ni esté dentro de una transacción en
+el primario: así cada request ve sus propias escrituras.
+"""
+import contextvars
+from datetime import datetime, timezone
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'reporting'
+
+# Estado del request actual: {'replica': bool, 'escribio': bool}
+_estado = contextvars.ContextVar('tienda_db_estado', default=None)
+
+
+def replica_configurada():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def archivo_marca(nombre_bd):
+    # Junto a la réplica: instante (epoch) en que empezó su última copia
+    return f"{nombre_bd}.sincronizada"
+
+
+def sincronizada_hasta(alias):
+    """
+    Hasta cuándo tiene `alias` todos los datos del primario: ahora para el
+    primario (o una réplica sobre el mismo archivo); para una copia, el
+    inicio de la última sincronizar_replica. None si no se sabe.
+    """
+    nombre = connections[alias].settings_dict['NAME']
+    if alias == DEFAULT_DB_ALIAS or str(nombre) == str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME']):
+        return datetime.now(timezone.utc)
+    try:
+        with open(archivo_marca(nombre), encoding='utf-8') as archivo:
+            return datetime.fromtimestamp(float(archivo.read()), timezone.utc)
+    except (OSError, ValueError):
+        return None
+
+
+def activar_wal(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate: deja la BD SQLite en modo WAL. El modo es persistente en el
+    archivo, así que basta con hacerlo una vez, al migrar (que igual escribe).
+    """
+    conexion = connections[using]
+    if conexion.vendor == 'sqlite' and not conexion.is_in_memory_db():
+        with conexion.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+
+def leer_de_replica():
+    estado = _estado.get()
+    if estado is not None:
+        estado['replica'] = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if not estado or not estado['replica'] or estado['escribio'] or not replica_configurada():
+            return None
+        if transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            # Desde aquí el request lee del primario (read-your-writes)
+            estado['escribio'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica y primario tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema al copiarse del primario
+        return db != REPLICA_DB_ALIAS
+
+
+class EstadoBaseDatosMiddleware:
+    """Abre un estado de enrutamiento limpio para cada request (WSGI o ASGI)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # No se restablece al salir: las respuestas en streaming leen después
+        _estado.set({'replica': False, 'escribio': False})
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # En ASGI el estado queda en el contexto de la tarea del request, y
+        # sync_to_async lo copia a los hilos que ejecutan las consultas
+        _estado.set({'replica': False, 'escribio': False})
+        return await self.get_response(request)
+
+
+class LecturaReplicaMixin:
+    """Para APIViews/ViewSets: los GET/HEAD leen de la réplica."""
+
+    def initial(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            leer_de_replica()
+        super().initial(request, *args, **kwargs)
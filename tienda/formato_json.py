@@ -0,0 +1,99 @@
+"""
+Renderer y parser JSON sobre orjson (configurados en REST_FRAMEWORK).
+
+La salida es byte a byte la de rest_framework.renderers.JSONRenderer: los
+DecimalField ya llegan como texto (COERCE_DECIMAL_TO_STRING) y los Decimal
+sueltos de los reportes pasan por el mismo JSONEncoder de DRF (float), cuyo
+formato coincide con el de orjson entre 1e-4 y 1e16. Lo que orjson no
+reproduce igual (indentación, claves no texto, enteros de más de 64 bits,
+un Decimal fuera de ese rango o NaN) se renderiza con el renderer
+estándar; el parser hace lo mismo con los cuerpos que orjson rechaza o
+leería distinto (enteros enormes).
+
+Única diferencia: un float nativo (no Decimal) fuera de ese rango sale
+como 1e16 en vez de 1e+16. Revisarlo costaría más que el propio
+renderizado y la API no genera esos valores (los float son porcentajes y
+métricas redondeadas).
+
+Sin orjson instalado, ambas clases se comportan exactamente como las de DRF.
+"""
+import io
+from decimal import Decimal
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+# Cifras -> "0", todo lo demás -> " ": una secuencia de 19 ceros delata un
+# entero que orjson podría leer como float (fuera de 64 bits) y json no.
+# translate() + "in" recorren el cuerpo en C, mucho más rápido que un regex.
+SOLO_CIFRAS = bytes(ord('0') if ord('0') <= i <= ord('9') else ord(' ') for i in range(256))
+ENTERO_LARGO = b'0' * 19
+
+SEPARADORES_JS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')  # U+2028 y U+2029 en UTF-8
+
+_encoder_drf = encoders.JSONEncoder()
+
+
+def _a_json(obj):
+    # Tipos que orjson no conoce (o que se le piden de vuelta, como datetime):
+    # misma conversión que el JSONEncoder de DRF. Decimal va primero: es el
+    # caso frecuente (precio_real de cada línea, sumas de los reportes)
+    valor = float(obj) if type(obj) is Decimal else _encoder_drf.default(obj)
+    if isinstance(valor, float) and valor and not 1e-4 <= abs(valor) < 1e16:
+        # Fuera de ese rango json escribe el exponente distinto (1e+16 vs
+        # 1e16), y NaN/Infinity DRF los rechaza donde orjson escribe null
+        raise TypeError("float fuera del rango compatible")
+    return valor
+
+
+class JSONRendererRapido(JSONRenderer):
+
+    def usa_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.encoder_class is encoders.JSONEncoder
+            and not self.ensure_ascii and self.compact and self.strict
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.usa_orjson(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_a_json, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que DRF: JSON que también sea JavaScript válido
+        if SEPARADORES_JS[0] in ret or SEPARADORES_JS[1] in ret:
+            ret = ret.replace(SEPARADORES_JS[0], b'\\u2028').replace(SEPARADORES_JS[1], b'\\u2029')
+        return ret
+
+
+class JSONParserRapido(JSONParser):
+    renderer_class = JSONRendererRapido
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        contenido = stream.read()
+        if ENTERO_LARGO not in contenido.translate(SOLO_CIFRAS):
+            try:
+                return orjson.loads(contenido)
+            except orjson.JSONDecodeError:
+                # orjson es más estricto (p. ej. surrogates sueltos): el
+                # parser estándar acepta o rechaza con su propio mensaje
+                pass
+        return super().parse(io.BytesIO(contenido), media_type, parser_context)
@@ -0,0 +1,253 @@
+"""
+Instrumentación por request: consultas SQL, tiempo en BD, tiempo de
+serialización y tiempo total.
+
+Con INSTRUMENTACION = True el middleware agrega la cabecera Server-Timing,
+registra en el log 'tienda.instrumentacion' los requests más lentos que
+INSTRUMENTACION_UMBRAL_MS (con sus consultas más lentas) y acumula un
+histograma de latencias por ruta en el proceso (api/metricas/, sólo admin).
+
+Funciona en WSGI y en ASGI: las consultas se capturan con un envoltorio
+instalado en cada conexión que se abre (connection_created), que busca la
+medición en el contexto del request. sync_to_async copia ese contexto a
+sus hilos, también con thread_sensitive=False, así que se cuentan las
+consultas de las vistas async sin importar en qué hilo corran.
+
+Desactivada no cuesta nada: el middleware se retira de la cadena
+(MiddlewareNotUsed) y no se instala ningún envoltorio.
+"""
+import contextvars
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from usuarios.login import pool_hashing
+from usuarios.permisos import IsAdmin
+from ventas.cache import cache_reportes
+
+logger = logging.getLogger('tienda.instrumentacion')
+
+# Límites superiores (ms) de cada cubeta del histograma; la última es "+Inf"
+CUBETAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+ANCLAS = re.compile(r'[\^$]')
+
+# Medición del request actual (None fuera de un request instrumentado)
+_medicion = contextvars.ContextVar('tienda_medicion', default=None)
+
+
+class Medicion:
+    def __init__(self):
+        self.consultas = []  # (ms, sql)
+        self.serializacion_ms = 0.0
+
+    @property
+    def sql_ms(self):
+        return sum(ms for ms, _ in self.consultas)
+
+    def mas_lentas(self, cantidad):
+        return heapq.nlargest(cantidad, self.consultas, key=lambda consulta: consulta[0])
+
+    def registrar(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            # list.append es atómico: sirve aunque consulten varios hilos
+            self.consultas.append(((time.perf_counter() - inicio) * 1000, sql))
+
+
+def medir_consulta(execute, sql, params, many, context):
+    # Envoltorio permanente de cada conexión: sólo mide dentro de un request
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    return medicion.registrar(execute, sql, params, many, context)
+
+
+def _envolver_conexion(sender=None, connection=None, **kwargs):
+    # connection_created se emite en cada reconexión del mismo wrapper
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _instalar_medicion_consultas():
+    """Conexiones futuras de cualquier hilo y las ya abiertas en este."""
+    connection_created.connect(_envolver_conexion, dispatch_uid='tienda_instrumentacion')
+    for conexion in connections.all(initialized_only=True):
+        _envolver_conexion(connection=conexion)
+
+
+# -----------------------------------------------------------------------------
+# HISTOGRAMAS POR RUTA (en memoria del proceso)
+# -----------------------------------------------------------------------------
+class HistogramasPorRuta:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._rutas = {}
+
+    def registrar(self, ruta, total_ms, consultas):
+        with self._candado:
+            datos = self._rutas.setdefault(ruta, {
+                "requests": 0, "suma_ms": 0.0, "max_ms": 0.0, "consultas": 0,
+                "cubetas": [0] * (len(CUBETAS_MS) + 1),
+            })
+            datos["requests"] += 1
+            datos["suma_ms"] += total_ms
+            datos["max_ms"] = max(datos["max_ms"], total_ms)
+            datos["consultas"] += consultas
+            datos["cubetas"][bisect_left(CUBETAS_MS, total_ms)] += 1
+
+    def como_dict(self):
+        with self._candado:
+            rutas = {ruta: dict(datos, cubetas=list(datos["cubetas"])) for ruta, datos in self._rutas.items()}
+        etiquetas = [f"<={limite}" for limite in CUBETAS_MS] + ["+Inf"]
+        return {
+            ruta: {
+                "requests": datos["requests"],
+                "media_ms": round(datos["suma_ms"] / datos["requests"], 3),
+                "max_ms": round(datos["max_ms"], 3),
+                "consultas_por_request": round(datos["consultas"] / datos["requests"], 2),
+                "histograma_ms": dict(zip(etiquetas, datos["cubetas"])),
+            }
+            for ruta, datos in sorted(rutas.items())
+        }
+
+    def reiniciar(self):
+        with self._candado:
+            self._rutas.clear()
+
+
+histogramas = HistogramasPorRuta()
+
+
+# -----------------------------------------------------------------------------
+# TIEMPO DE SERIALIZACIÓN
+# -----------------------------------------------------------------------------
+_serializacion_instalada = False
+
+
+def _instalar_medicion_serializacion():
+    """
+    Envuelve BaseSerializer.data (la única entrada pública a
+    to_representation: los anidados no pasan por aquí, así no se cuenta dos
+    veces). Se instala una vez y sólo si la instrumentación está activa.
+    """
+    global _serializacion_instalada
+    if _serializacion_instalada:
+        return
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+
+    def data(self):
+        medicion = _medicion.get()
+        if medicion is None:
+            return original.fget(self)
+        inicio = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            medicion.serializacion_ms += (time.perf_counter() - inicio) * 1000
+
+    BaseSerializer.data = property(data)
+    _serializacion_instalada = True
+
+
+# -----------------------------------------------------------------------------
+# MIDDLEWARE
+# -----------------------------------------------------------------------------
+class InstrumentacionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.umbral_ms = settings.INSTRUMENTACION_UMBRAL_MS
+        self.sql_lentas = settings.INSTRUMENTACION_SQL_LENTAS
+        _instalar_medicion_serializacion()
+        _instalar_medicion_consultas()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Conexiones de este hilo abiertas antes de instalar el envoltorio
+        for conexion in connections.all(initialized_only=True):
+            _envolver_conexion(connection=conexion)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self.registrar(request, response, medicion, inicio)
+
+    def registrar(self, request, response, medicion, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        sql_ms = medicion.sql_ms
+        cantidad = len(medicion.consultas)
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.2f};desc="{cantidad} consultas", '
+            f'ser;dur={medicion.serializacion_ms:.2f}, '
+            f'total;dur={total_ms:.2f}'
+        )
+
+        # Los routers de DRF generan regex (^boletas/$): se quitan las anclas
+        match = request.resolver_match
+        ruta = f"{request.method} {ANCLAS.sub('', match.route) if match else '<sin ruta>'}"
+        histogramas.registrar(ruta, total_ms, cantidad)
+
+        if total_ms >= self.umbral_ms:
+            lentas = "".join(
+                f"\n  {ms:8.2f} ms  {sql[:500]}" for ms, sql in medicion.mas_lentas(self.sql_lentas)
+            )
+            logger.warning(
+                "Request lento: %s %s -> %s en %.2f ms (%d consultas, %.2f ms en BD, %.2f ms serializando)%s",
+                request.method, request.get_full_path(), response.status_code, total_ms,
+                cantidad, sql_ms, medicion.serializacion_ms, lentas,
+            )
+        return response
+
+
+class MetricasView(APIView):
+    # GET: api/metricas/  (DELETE reinicia los contadores)
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response({
+            "activa": getattr(settings, 'INSTRUMENTACION', False),
+            "cubetas_ms": CUBETAS_MS,
+            "rutas": histogramas.como_dict(),
+            "cache_reportes": cache_reportes.estadisticas(),
+            "login": pool_hashing.estadisticas(),
+        })
+
+    def delete(self, request):
+        histogramas.reiniciar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
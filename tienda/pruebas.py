@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def caches_aisladas():
+    """
+    CACHES con el catálogo y la generación de reportes en memoria del proceso:
+    las pruebas y los benchmarks trabajan sobre otra BD y no deben leer ni
+    dejar datos en las cachés en archivo que comparten los workers del servidor.
+    """
+    return override_settings(CACHES={
+        **settings.CACHES,
+        'catalogo': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tienda-catalogo-aislado',
+        },
+        'reportes': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tienda-reportes-aislado',
+        },
+    })
+
+
+class TiendaTestRunner(DiscoverRunner):
+    """
+    Además de las cachés aisladas, la BD de pruebas SQLite va en un archivo
+    temporal en vez de en memoria: la memoria compartida entre conexiones
+    (cache=shared) bloquea por tabla sin esperar el busy_timeout, y las
+    pruebas con hilos que escriben a la vez fallarían con "database table
+    is locked" donde el servidor real sólo espera su turno.
+    """
+
+    def setup_databases(self, **kwargs):
+        self.directorio_bd = tempfile.mkdtemp(prefix='tienda_pruebas_')
+        for alias in connections:
+            datos = connections[alias].settings_dict
+            prueba = datos.setdefault('TEST', {})
+            if datos['ENGINE'] == 'django.db.backends.sqlite3' and not prueba.get('NAME') \
+                    and not prueba.get('MIRROR'):
+                prueba['NAME'] = os.path.join(self.directorio_bd, f'{alias}.sqlite3')
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        try:
+            super().teardown_databases(old_config, **kwargs)
+        finally:
+            shutil.rmtree(self.directorio_bd, ignore_errors=True)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches_aisladas = caches_aisladas()
+        self.caches_aisladas.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches_aisladas.disable()
+        super().teardown_test_environment(**kwargs)
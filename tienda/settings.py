@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import hashlib
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,17 +51,63 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'usuarios.autenticacion.JWTClaimsAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'rest_framework.filters.SearchFilter',
-    ]
+    ],
+    # JSON con orjson (misma salida que el JSONRenderer de DRF, al que vuelve
+    # si orjson no está instalado), ver tienda/formato_json.py
+    'DEFAULT_RENDERER_CLASSES': [
+        'tienda.formato_json.JSONRendererRapido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'tienda.formato_json.JSONParserRapido',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 AUTH_USER_MODEL = 'usuarios.User'
 
+# Segundos que cada proceso confía en que un usuario sigue activo antes de
+# volver a consultarlo (0 = nunca consulta la BD al autenticar)
+JWT_REVOCACION_TTL = 60
+
+# Folios de boletas/facturas asignados en el servidor (ventas/folios.py):
+# números que reserva cada proceso por viaje a la BD, y si cada terminal
+# (cabecera X-Terminal) tiene su propia serie
+FOLIOS_BLOQUE = 20
+FOLIOS_POR_TERMINAL = False
+
+# Rechazar líneas de venta cuyo precio_unitario no sea el precio actual del
+# producto (desactivado: el POS puede aplicar precios propios)
+VENTAS_VALIDAR_PRECIO = False
+
+# Caché en memoria del reporte de ventas (ventas/cache.py): cantidad máxima
+# de resultados (LRU) y segundos de vida de los que incluyen el día en curso
+REPORTES_CACHE_MAX = 512
+REPORTES_CACHE_TTL = 30
+
+# Instrumentación por request (tienda/instrumentacion.py): Server-Timing,
+# log de requests lentos con sus consultas más lentas e histogramas por ruta
+# en api/metricas/. Desactivada, el middleware ni siquiera se carga.
+INSTRUMENTACION = os.environ.get('TIENDA_INSTRUMENTACION') == '1'
+INSTRUMENTACION_UMBRAL_MS = 500
+INSTRUMENTACION_SQL_LENTAS = 3
+
+# Login async (api/auth/login/async/, usuarios/login.py): hashes de contraseña
+# calculados a la vez, verificaciones que pueden esperar turno y segundos del
+# Retry-After del 503 cuando ambos están llenos
+LOGIN_HASH_HILOS = max(2, (os.cpu_count() or 2) // 2)
+LOGIN_HASH_COLA = 32
+LOGIN_REINTENTAR_SEGUNDOS = 1
+
 MIDDLEWARE = [
+    'tienda.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'tienda.db.EstadoBaseDatosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
@@ -97,13 +146,66 @@ WSGI_APPLICATION = 'tienda.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Cada conexión SQLite espera hasta 5 s por el bloqueo de escritura en vez de
+# fallar. El modo WAL (lectores y escritor no se bloquean) queda guardado en
+# el archivo: lo activa `migrate` (tienda.db.activar_wal), no cada conexión,
+# así abrir la BD no reescribe su cabecera
+SQLITE_INIT_COMMAND = 'PRAGMA busy_timeout=5000; PRAGMA synchronous=NORMAL'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+        },
+    },
+    # Réplica de sólo lectura para reportes, filtros y listados (tienda/db.py).
+    # Por defecto es el mismo archivo (en WAL los reportes no bloquean ventas);
+    # TIENDA_DB_REPLICA apunta a una copia (ver manage.py sincronizar_replica).
+    'reporting': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': Path(os.environ.get('TIENDA_DB_REPLICA', BASE_DIR / 'db.sqlite3')),
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND + '; PRAGMA query_only=ON',
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['tienda.db.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tienda',
+    },
+    # Catálogo de productos: en archivo para que todos los workers compartan la
+    # versión. El prefijo sale de la BD: otra base (u otro checkout) en la misma
+    # máquina no lee este catálogo. Pruebas y benchmarks usan memoria (tienda/pruebas.py).
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'tienda' / 'catalogo',
+        'KEY_PREFIX': hashlib.sha1(str(DATABASES['default']['NAME']).encode()).hexdigest()[:12],
+    },
+    # Generación de la caché de reportes (ventas/cache.py): también en archivo,
+    # para que editar o borrar una venta en un worker descarte los días
+    # cerrados que guardaron los demás.
+    'reportes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'tienda' / 'reportes',
+        'KEY_PREFIX': hashlib.sha1(str(DATABASES['default']['NAME']).encode()).hexdigest()[:12],
+    },
+}
+
+TEST_RUNNER = 'tienda.pruebas.TiendaTestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .instrumentacion import MetricasView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,4 +16,7 @@ urlpatterns = [
     path('api/', include('usuarios.urls')),
     path('api/', include('productos.urls')),
     path('api/', include('ventas.urls')),
+
+    # Histogramas de latencia por ruta (sólo jefe venta, ver INSTRUMENTACION)
+    path('api/metricas/', MetricasView.as_view(), name='metricas'),
 ]
\ No newline at end of file
@@ -0,0 +1,77 @@
+import time
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from .models import User
+
+# Claims que CustomTokenObtainPairSerializer agrega al token
+CLAIMS_USUARIO = ('username', 'role', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+
+# Claims que dan permisos: se comparan con la BD para que un cambio de rol
+# (o de is_staff/is_superuser) invalide los tokens ya emitidos
+CLAIMS_PERMISOS = ('role', 'is_staff', 'is_superuser')
+
+# str(user_id) -> (vence_en, permisos). Caché por proceso para la verificación opcional
+# (el claim user_id puede venir como texto, por eso normalizamos la clave)
+_usuarios_activos = {}
+
+
+def permisos_vigentes(user_id, ttl):
+    """
+    Valores actuales de CLAIMS_PERMISOS del usuario (None si está inactivo o
+    no existe). Consulta la BD como máximo una vez cada `ttl` segundos por
+    usuario y proceso; guardar el usuario borra su entrada (usuarios/signals.py).
+    """
+    ahora = time.monotonic()
+    clave = str(user_id)
+    vigente = _usuarios_activos.get(clave)
+    if vigente and vigente[0] > ahora:
+        return vigente[1]
+
+    permisos = next(iter(User.objects.filter(pk=user_id, is_active=True).values_list(*CLAIMS_PERMISOS)[:1]), None)
+    _usuarios_activos[clave] = (ahora + ttl, permisos)
+    return permisos
+
+
+def id_usuario(user):
+    """Id numérico de request.user: en un TokenUser viene del claim como texto."""
+    return None if user.id is None else int(user.id)
+
+
+def olvidar_usuario(user_id=None):
+    # Sólo afecta a este proceso; los demás se enteran al vencer el TTL
+    if user_id is None:
+        _usuarios_activos.clear()
+    else:
+        _usuarios_activos.pop(str(user_id), None)
+
+
+class JWTClaimsAuthentication(JWTStatelessUserAuthentication):
+    """
+    Autentica sólo con los claims del token: request.user es un TokenUser
+    (id, username, role, ...) y los permisos no consultan la BD.
+
+    Con JWT_REVOCACION_TTL > 0 se verifica además que el usuario siga activo
+    y que su rol y flags de staff sigan siendo los del token, con una caché
+    por proceso de ese TTL (en el proceso que guarda el cambio vale desde el
+    request siguiente). Los tokens emitidos antes de agregar los claims
+    siguen funcionando con la autenticación estándar (con BD).
+    """
+
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return JWTAuthentication.get_user(self, validated_token)
+
+        user = super().get_user(validated_token)
+
+        ttl = getattr(settings, 'JWT_REVOCACION_TTL', 0)
+        if ttl:
+            permisos = permisos_vigentes(user.id, ttl)
+            if permisos is None:
+                raise AuthenticationFailed("Usuario inactivo o eliminado.", code="user_inactive")
+            if permisos != tuple(validated_token.get(claim) for claim in CLAIMS_PERMISOS):
+                # El refresh emite un access con los claims actuales
+                raise AuthenticationFailed("Los permisos del usuario cambiaron, renueve el token.",
+                                           code="token_desactualizado")
+
+        return user
@@ -0,0 +1,24 @@
+from django.core.cache import cache
+from .models import User
+
+# Lista de vendedores activos para los filtros de reportes.
+# Se invalida desde usuarios/signals.py cuando cambia cualquier usuario.
+VENDEDORES_CACHE_KEY = 'usuarios:vendedores_activos'
+# Con TTL: si se llenó desde una réplica atrasada, el desfase no es permanente
+VENDEDORES_TIMEOUT = 5 * 60
+
+
+def obtener_vendedores():
+    vendedores = cache.get(VENDEDORES_CACHE_KEY)
+    if vendedores is None:
+        vendedores = list(
+            User.objects.filter(role='vendedor', is_active=True)
+            .values('id', 'username', 'first_name', 'last_name')
+            .order_by('id')
+        )
+        cache.set(VENDEDORES_CACHE_KEY, vendedores, timeout=VENDEDORES_TIMEOUT)
+    return vendedores
+
+
+def invalidar_vendedores():
+    cache.delete(VENDEDORES_CACHE_KEY)
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# -----------------------------------------------------------------------------
+# POOL ACOTADO PARA LOS HASHES DE CONTRASEÑA DEL LOGIN ASYNC
+# PBKDF2 es CPU pura pero hashlib suelta el GIL mientras calcula: con hilos
+# se aprovechan varios núcleos sin procesos aparte. Como máximo
+# LOGIN_HASH_HILOS hashes a la vez y LOGIN_HASH_COLA esperando turno; por
+# encima el login responde 503 (Retry-After) en vez de acumular trabajo que
+# quitaría CPU a las ventas en un cambio de turno.
+# -----------------------------------------------------------------------------
+
+# Últimas mediciones que se guardan para los percentiles de /api/metricas/
+MUESTRAS = 1000
+
+
+class LoginSaturado(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Demasiados inicios de sesión simultáneos, reintente en unos segundos."
+    default_code = 'login_saturado'
+
+
+def percentiles(muestras):
+    ordenadas = sorted(muestras)
+    if not ordenadas:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(ordenadas[len(ordenadas) // 2], 3),
+        "p95_ms": round(ordenadas[min(len(ordenadas) - 1, len(ordenadas) * 95 // 100)], 3),
+        "max_ms": round(ordenadas[-1], 3),
+    }
+
+
+class PoolHashing:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._ejecutor = None
+        self.en_curso = 0
+        self.reiniciar()
+
+    def ejecutor(self):
+        with self._candado:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    max_workers=settings.LOGIN_HASH_HILOS, thread_name_prefix='login-hash')
+            return self._ejecutor
+
+    def reservar(self):
+        """Ocupa un lugar (hilo o cola) o lanza LoginSaturado."""
+        with self._candado:
+            if self.en_curso >= settings.LOGIN_HASH_HILOS + settings.LOGIN_HASH_COLA:
+                self.rechazados += 1
+                raise LoginSaturado()
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+
+    def liberar(self, *_):
+        with self._candado:
+            self.en_curso -= 1
+
+    async def ejecutar(self, funcion, *args):
+        self.reservar()
+        encolado = time.perf_counter()
+
+        def medir():
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args)
+            finally:
+                fin = time.perf_counter()
+                with self._candado:
+                    self.hashes += 1
+                    self._espera_ms.append((inicio - encolado) * 1000)
+                    self._hash_ms.append((fin - inicio) * 1000)
+
+        try:
+            futuro = self.ejecutor().submit(medir)
+        except BaseException:
+            self.liberar()
+            raise
+        # El lugar se libera cuando el hilo termina, aunque el cliente se
+        # haya desconectado y nadie espere ya el resultado
+        futuro.add_done_callback(self.liberar)
+        return await asyncio.wrap_future(futuro)
+
+    async def verificar(self, encoded, password):
+        """(correcta, hay_que_rehashear), como django.contrib.auth.hashers.verify_password."""
+        return await self.ejecutar(verify_password, password, encoded)
+
+    async def hashear(self, password):
+        return await self.ejecutar(make_password, password)
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                "hilos": settings.LOGIN_HASH_HILOS,
+                "cola": settings.LOGIN_HASH_COLA,
+                "en_curso": self.en_curso,
+                "max_en_curso": self.max_en_curso,
+                "hashes": self.hashes,
+                "rechazados": self.rechazados,
+                "hash": percentiles(self._hash_ms),
+                "espera": percentiles(self._espera_ms),
+            }
+
+    def reiniciar(self):
+        # Para pruebas y benchmarks: contadores a cero (no toca lo que está en curso)
+        with self._candado:
+            self.max_en_curso = self.en_curso
+            self.hashes = self.rechazados = 0
+            self._hash_ms = deque(maxlen=MUESTRAS)
+            self._espera_ms = deque(maxlen=MUESTRAS)
+
+
+pool_hashing = PoolHashing()
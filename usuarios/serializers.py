@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import User
 from django.contrib.auth.hashers import make_password
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .autenticacion import CLAIMS_USUARIO
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,18 +14,56 @@ class UserSerializer(serializers.ModelSerializer):
             "password": {"write_only": True}
         }    
 
+def agregar_claims(token, user):
+    # Claims para autenticar sin BD (ver usuarios/autenticacion.py)
+    for claim in CLAIMS_USUARIO:
+        token[claim] = getattr(user, claim)
+    return token
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return agregar_claims(super().get_token(user), user)
+
+    @staticmethod
+    def datos_usuario(user):
+        return {
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+        }
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
-        # Datos del usuario
-        user_data = {
-            "id": self.user.id,
-            "username": self.user.username,
-            "role": self.user.role,
+        # Agregamos los datos del usuario al response
+        data["user"] = self.datos_usuario(self.user)
+
+        return data
+
+    @classmethod
+    def respuesta_login(cls, user):
+        # Lo mismo que validate() para un usuario ya verificado (login async)
+        refresh = cls.get_token(user)
+        return {
+            "refresh": str(refresh),
+            "access": str(refresh.access_token),
+            "user": cls.datos_usuario(user),
         }
 
-        # Agregamos al response
-        data["user"] = user_data
 
-        return data
+class RefreshTokenVigente(RefreshToken):
+    @property
+    def access_token(self):
+        # Los claims del access nuevo salen de la BD, no del refresh: un
+        # cambio de rol se aplica en el próximo refresh
+        access = super().access_token
+        user = User.objects.filter(pk=self.payload.get(jwt_settings.USER_ID_CLAIM)).first()
+        if user is not None:
+            agregar_claims(access, user)
+        return access
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RefreshTokenVigente
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .autenticacion import olvidar_usuario
+from .cache import invalidar_vendedores
+from .models import User
+
+
+def solo_ultimo_acceso(update_fields):
+    # Cada login guarda last_login (update_last_login): no cambia ni la lista
+    # de vendedores ni los permisos, no hay nada que invalidar
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refrescar_cache_vendedores(sender, update_fields=None, **kwargs):
+    if not solo_ultimo_acceso(update_fields):
+        invalidar_vendedores()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def olvidar_estado_usuario(sender, instance, update_fields=None, **kwargs):
+    if not solo_ultimo_acceso(update_fields):
+        olvidar_usuario(instance.pk)
@@ -1,3 +1,116 @@
-from django.test import TestCase
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from productos.cache import cache_catalogo
+from .autenticacion import olvidar_usuario
+from .login import pool_hashing
+from .models import User
 
-# Create your tests here.
+
+class AutenticacionPorClaimsTests(APITestCase):
+    def setUp(self):
+        olvidar_usuario()
+        cache_catalogo().clear()
+        self.jefe = User.objects.create_user(username='jefe', password='clave-segura-123', role='jefe venta')
+        self.vendedor = User.objects.create_user(username='vendedor', password='clave-segura-123', role='vendedor')
+
+    def login(self, username):
+        resp = self.client.post('/api/auth/login/', {'username': username, 'password': 'clave-segura-123'})
+        self.assertEqual(resp.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+        return resp
+
+    @override_settings(JWT_REVOCACION_TTL=0)
+    def test_permisos_sin_consultar_usuario(self):
+        self.login('vendedor')
+
+        self.client.get('/api/productos/')  # deja el catálogo en caché
+
+        with self.assertNumQueries(0):
+            resp = self.client.get('/api/productos/')
+
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(JWT_REVOCACION_TTL=0)
+    def test_rol_viene_del_token(self):
+        self.login('vendedor')
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 403)
+
+        self.login('jefe')
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 200)
+
+    @override_settings(JWT_REVOCACION_TTL=60)
+    def test_usuario_desactivado_es_rechazado(self):
+        self.login('jefe')
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 200)
+        with self.assertNumQueries(1):  # la verificación de activo quedó en caché
+            self.client.get('/api/usuarios/')
+
+        self.jefe.is_active = False
+        self.jefe.save()
+
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 401)
+
+    @override_settings(JWT_REVOCACION_TTL=60)
+    def test_cambio_de_rol_invalida_el_token_y_el_refresh_trae_el_nuevo(self):
+        refresh = self.login('jefe').data['refresh']
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 200)
+
+        self.jefe.role = 'vendedor'
+        self.jefe.save()
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 401)
+
+        self.client.credentials()
+        resp = self.client.post('/api/auth/refresh/', {'refresh': refresh})
+        self.assertEqual(resp.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.data['access']}")
+        self.assertEqual(self.client.get('/api/usuarios/').status_code, 403)
+        self.assertEqual(self.client.get('/api/productos/').status_code, 200)
+
+
+class LoginAsyncTests(APITestCase):
+    def setUp(self):
+        olvidar_usuario()
+        pool_hashing.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='clave-segura-123', role='jefe venta')
+
+    def login(self, url, password='clave-segura-123', **kwargs):
+        return self.client.post(url, {'username': 'jefe', 'password': password}, **kwargs)
+
+    def test_misma_respuesta_que_el_login_sincrono(self):
+        for formato in ('json', 'multipart'):
+            with self.subTest(formato=formato):
+                resp = self.login('/api/auth/login/async/', format=formato)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(resp.json()["user"], self.login('/api/auth/login/').data["user"])
+
+                self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.json()['access']}")
+                self.assertEqual(self.client.get('/api/usuarios/').status_code, 200)
+                self.client.credentials()
+
+    def test_credenciales_invalidas(self):
+        sincrono = self.login('/api/auth/login/', password='otra')
+        for datos in ({'username': 'jefe', 'password': 'otra'}, {'username': 'nadie', 'password': 'otra'}):
+            with self.subTest(datos=datos):
+                resp = self.client.post('/api/auth/login/async/', datos, format='json')
+                self.assertEqual(resp.status_code, sincrono.status_code)
+                self.assertEqual(resp.json(), sincrono.data)
+
+        resp = self.client.post('/api/auth/login/async/', {'username': 'jefe'}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('password', resp.json())
+
+    @override_settings(LOGIN_HASH_HILOS=1, LOGIN_HASH_COLA=0)
+    def test_pool_lleno_responde_503(self):
+        pool_hashing.reservar()  # el único lugar queda ocupado
+        try:
+            resp = self.login('/api/auth/login/async/', format='json')
+        finally:
+            pool_hashing.liberar()
+
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp['Retry-After'], '1')
+        self.assertEqual(self.login('/api/auth/login/async/', format='json').status_code, 200)
+
+        metricas = pool_hashing.estadisticas()
+        self.assertEqual((metricas["hashes"], metricas["rechazados"], metricas["en_curso"]), (1, 1, 0))
+        self.assertGreater(metricas["hash"]["max_ms"], 0)
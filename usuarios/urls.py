@@ -1,7 +1,6 @@
 from django.urls import path, include
 from rest_framework import routers
-from rest_framework_simplejwt.views import TokenRefreshView
-from .views import UserViewSet, CustomTokenObtainPairView
+from .views import UserViewSet, CustomTokenObtainPairView, CustomTokenRefreshView, LoginAsyncView
 
 # Router específico de usuarios
 router = routers.DefaultRouter()
@@ -15,5 +14,7 @@ urlpatterns = [
     # Rutas de Autenticación (api/auth/...)
     # Nota: Las moví aquí para que estén agrupadas con la app de usuarios
     path('auth/login/', CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path('auth/refresh/', TokenRefreshView.as_view(), name="token_refresh"),
+    # Hash de la contraseña fuera del worker, en un pool acotado (usuarios/login.py)
+    path('auth/login/async/', LoginAsyncView.as_view(), name="token_obtain_pair_async"),
+    path('auth/refresh/', CustomTokenRefreshView.as_view(), name="token_refresh"),
 ]
\ No newline at end of file
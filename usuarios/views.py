@@ -4,8 +4,20 @@ from .models import User
 from .serializers import UserSerializer
 from usuarios.permisos import IsAdmin
 
-from rest_framework_simplejwt.views import TokenObtainPairView
-from .serializers import CustomTokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
+
+import io
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from tienda.formato_json import JSONParserRapido, JSONRendererRapido
+from .login import LoginSaturado, pool_hashing
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -14,3 +26,67 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+# -----------------------------------------------------------------------------
+# LOGIN ASYNC (ASGI)
+# Misma entrada y respuesta que auth/login/, pero el hash de la contraseña
+# corre en el pool acotado de usuarios/login.py: el worker no queda tomado
+# mientras se calcula y, si el pool está lleno, responde 503 de inmediato.
+# Usa el ModelBackend (username + contraseña), no AUTHENTICATION_BACKENDS.
+# -----------------------------------------------------------------------------
+def buscar_usuario(username):
+    try:
+        return User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        return None
+
+
+class LoginAsyncView(View):
+    renderer = JSONRendererRapido()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Como las APIView de DRF: sin cookie de sesión no aplica CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request):
+        try:
+            return self.respuesta(await self.autenticar(request))
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            respuesta = self.respuesta(data, status=exc.status_code)
+            if isinstance(exc, LoginSaturado):
+                respuesta['Retry-After'] = str(settings.LOGIN_REINTENTAR_SEGUNDOS)
+            return respuesta
+
+    async def autenticar(self, request):
+        serializer = CustomTokenObtainPairSerializer()
+        if request.content_type == 'application/json':
+            datos = JSONParserRapido().parse(io.BytesIO(request.body))
+        else:
+            datos = request.POST
+        credenciales = serializer.to_internal_value(datos)  # sólo los campos, sin validate()
+
+        user = await sync_to_async(buscar_usuario)(credenciales[serializer.username_field])
+
+        # Usuario inexistente: verify_password igual calcula un hash (mismo tiempo)
+        correcta, rehashear = await pool_hashing.verificar(user.password if user else '', credenciales['password'])
+        # La regla por defecto de simplejwt exige is_active, como el ModelBackend
+        if not correcta or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(serializer.error_messages['no_active_account'], 'no_active_account')
+
+        if rehashear:
+            # Hasher o iteraciones cambiaron: como check_password(), se guarda el hash nuevo
+            user.password = await pool_hashing.hashear(credenciales['password'])
+            await sync_to_async(user.save)(update_fields=['password'])
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            await sync_to_async(update_last_login)(None, user)
+
+        return CustomTokenObtainPairSerializer.respuesta_login(user)
+
+    def respuesta(self, data, status=200):
+        return HttpResponse(self.renderer.render(data), status=status, content_type=self.renderer.media_type)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class VentasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ventas'
+
+    def ready(self):
+        # Registra los receptores de señales
+        from . import signals  # noqa: F401
+        from tienda.db import activar_wal
+        post_migrate.connect(activar_wal, sender=self)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+# -----------------------------------------------------------------------------
+# CACHÉ DE RESULTADOS DEL REPORTE DE VENTAS (en memoria del proceso)
+# Un día cerrado no cambia: su reporte (leído del primario o de una réplica
+# ya sincronizada) se guarda sin vencimiento mientras no cambie la generación
+# compartida (caché 'reportes', en archivo), que avanza cuando cualquier
+# worker edita o borra una venta o registra una en un día pasado. Los que
+# incluyen hoy (o no tienen "hasta") vencen a los REPORTES_CACHE_TTL segundos
+# y además se descartan en cuanto este proceso registra una venta nueva.
+# Tamaño acotado (REPORTES_CACHE_MAX) con desalojo LRU.
+# -----------------------------------------------------------------------------
+GENERACION_CACHE_KEY = 'ventas:reportes_generacion'
+
+
+def _nueva_generacion():
+    generacion = f"{time.time_ns():x}"
+    caches['reportes'].set(GENERACION_CACHE_KEY, generacion, timeout=None)
+    return generacion
+
+
+def generacion_compartida():
+    generacion = caches['reportes'].get(GENERACION_CACHE_KEY)
+    if generacion is None:
+        # Caché vacía (reinicio o limpieza): add() para que dos workers que
+        # llegan a la vez terminen con la misma
+        caches['reportes'].add(GENERACION_CACHE_KEY, f"{time.time_ns():x}", timeout=None)
+        generacion = caches['reportes'].get(GENERACION_CACHE_KEY)
+    return generacion
+
+
+class CacheReportes:
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> (valor, vence, version, generacion)
+        self._version = 0
+        self._generacion = None
+        self.aciertos = self.fallos = self.desalojos = 0
+
+    def obtener(self, clave, generar, inmutable):
+        """Devuelve el resultado guardado para `clave` o lo calcula con generar()."""
+        valor, version = self.buscar(clave)
+        if valor is None:
+            valor = generar()
+            self.guardar(clave, valor, inmutable, version)
+        return valor
+
+    def buscar(self, clave):
+        """
+        (valor, None) si hay una entrada vigente; si no, (None, version) con la
+        versión a pasar a guardar() (las vistas async calculan entre medio).
+        """
+        generacion = generacion_compartida()
+        with self._candado:
+            if generacion != self._generacion:
+                # Otro worker editó o borró ventas: lo guardado aquí ya no vale
+                self._entradas.clear()
+                self._generacion = generacion
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self._vigente(entrada):
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0], None
+            self.fallos += 1
+            # Versión de antes de calcular: si entra una venta mientras tanto,
+            # el resultado nace vencido en vez de guardar datos viejos
+            return None, (self._version, generacion)
+
+    def guardar(self, clave, valor, inmutable, version):
+        vence = None if inmutable else time.monotonic() + settings.REPORTES_CACHE_TTL
+        version, generacion = version
+        with self._candado:
+            self._entradas[clave] = (valor, vence, None if inmutable else version, generacion)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > settings.REPORTES_CACHE_MAX:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def _vigente(self, entrada):
+        _, vence, version, generacion = entrada
+        if generacion != self._generacion:
+            return False
+        if vence is None:
+            return True
+        return vence > time.monotonic() and version == self._version
+
+    def invalidar_hoy(self):
+        # Las entradas inmutables (días cerrados) no dependen de la versión
+        with self._candado:
+            self._version += 1
+
+    def limpiar(self):
+        # Además de lo propio, descarta lo que guardaron los demás workers
+        generacion = _nueva_generacion()
+        with self._candado:
+            self._entradas.clear()
+            self._version += 1
+            self._generacion = generacion
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "maximo": settings.REPORTES_CACHE_MAX,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+            }
+
+    def reiniciar(self):
+        # Para pruebas y benchmarks: vacía la caché y los contadores
+        self.limpiar()
+        with self._candado:
+            self.aciertos = self.fallos = self.desalojos = 0
+
+
+cache_reportes = CacheReportes()
@@ -0,0 +1,105 @@
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.db.models import F
+from .models import DetalleVenta
+
+# -----------------------------------------------------------------------------
+# EXPORTACIÓN EN STREAMING (CSV / NDJSON)
+# Las filas se leen con .iterator() por bloques y se escriben a medida que se
+# generan: la memoria del worker no depende de la cantidad de ventas.
+# En ASGI el mismo generador se consume por bloques desde un generador async
+# (Django no puede transmitir un iterador síncrono: lo leería entero).
+# -----------------------------------------------------------------------------
+TAMANO_BLOQUE = 2000
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Todas las filas comparten columnas; `registro` indica si es cabecera o línea
+COLUMNAS = [
+    'registro', 'tipo', 'numero', 'fecha', 'vendedor_id',
+    'rut_cliente', 'razon_social',
+    'producto_id', 'nombre_producto', 'cantidad', 'subtotal',
+    'total_neto', 'total_iva', 'total_final',
+]
+
+
+class _Eco:
+    # "Archivo" que devuelve lo escrito en vez de guardarlo (para csv.writer)
+    def write(self, valor):
+        return valor
+
+
+def _documentos(queryset, tipo, campo_numero, extras=()):
+    campos = ['fecha', 'vendedor_id', 'total_neto', 'total_iva', 'total_final', campo_numero, *extras]
+    for fila in queryset.order_by('fecha', 'id').values(*campos).iterator(chunk_size=TAMANO_BLOQUE):
+        fila['numero'] = fila.pop(campo_numero)
+        yield {'registro': 'documento', 'tipo': tipo, **fila}
+
+
+def _detalles(queryset, tipo, campo_numero):
+    # Las líneas de los mismos documentos filtrados, con el nombre del producto en el JOIN
+    lineas = (
+        DetalleVenta.objects
+        .filter(**{f'{tipo}__in': queryset.values('id')})
+        .order_by(f'{tipo}_id', 'id')
+        .values(
+            'producto_id', 'cantidad', 'subtotal',
+            numero=F(f'{tipo}__{campo_numero}'),
+            nombre_producto=F('producto__nombre'),
+        )
+    )
+    for fila in lineas.iterator(chunk_size=TAMANO_BLOQUE):
+        yield {'registro': 'detalle', 'tipo': tipo, **fila}
+
+
+def filas_exportacion(qs_boletas, qs_facturas):
+    yield from _documentos(qs_boletas, 'boleta', 'numero_boleta')
+    yield from _detalles(qs_boletas, 'boleta', 'numero_boleta')
+    yield from _documentos(qs_facturas, 'factura', 'numero_factura', ('rut_cliente', 'razon_social'))
+    yield from _detalles(qs_facturas, 'factura', 'numero_factura')
+
+
+def _csv(filas):
+    escritor = csv.DictWriter(_Eco(), fieldnames=COLUMNAS, restval='')
+    yield escritor.writeheader()
+    for fila in filas:
+        if 'fecha' in fila:
+            fila['fecha'] = fila['fecha'].isoformat()
+        yield escritor.writerow(fila)
+
+
+def _ndjson(filas):
+    for fila in filas:
+        yield json.dumps(fila, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+async def en_bloques_async(generador):
+    """
+    Recorre un generador síncrono (que consulta la BD) de a TAMANO_BLOQUE
+    piezas en el hilo de sync_to_async, siempre el mismo: el cursor de
+    .iterator() no cambia de conexión entre bloques.
+    """
+    siguiente = sync_to_async(lambda: ''.join(islice(generador, TAMANO_BLOQUE)))
+    try:
+        while bloque := await siguiente():
+            yield bloque
+    finally:
+        await sync_to_async(generador.close)()
+
+
+def respuesta_exportacion(formato, qs_boletas, qs_facturas, asincrona=False):
+    generar = _csv if formato == 'csv' else _ndjson
+    contenido = generar(filas_exportacion(qs_boletas, qs_facturas))
+    respuesta = StreamingHttpResponse(
+        en_bloques_async(contenido) if asincrona else contenido,
+        content_type=FORMATOS[formato],
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="reporte-ventas.{formato}"'
+    return respuesta
@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+# -----------------------------------------------------------------------------
+# RANGOS DE FECHA "SARGABLES"
+# `fecha__date=` envuelve la columna en una función y ningún índice sirve.
+# En su lugar filtramos con un rango semiabierto [inicio, fin) de datetimes
+# calculados en la zona horaria activa (TIME_ZONE).
+# -----------------------------------------------------------------------------
+
+
+def leer_fecha(valor, parametro='fecha'):
+    """Convierte 'YYYY-MM-DD' en date o responde 400."""
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({parametro: "Formato de fecha inválido, use YYYY-MM-DD."})
+    return fecha
+
+
+def inicio_del_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def rango_dias(desde, hasta=None):
+    """Devuelve (inicio, fin) para filtrar fecha__gte=inicio, fecha__lt=fin."""
+    hasta = hasta or desde
+    return inicio_del_dia(desde), inicio_del_dia(hasta + timedelta(days=1))
+
+
+def leer_rango(params):
+    """
+    Lee `fecha` (un día) o `desde`/`hasta` (días inclusive, cualquiera puede
+    faltar) y devuelve (desde, hasta) como date o None.
+    """
+    fecha = params.get('fecha')
+    if fecha:
+        dia = leer_fecha(fecha)
+        return dia, dia
+
+    desde = params.get('desde')
+    hasta = params.get('hasta')
+    desde = leer_fecha(desde, 'desde') if desde else None
+    hasta = leer_fecha(hasta, 'hasta') if hasta else None
+    if desde and hasta and desde > hasta:
+        raise ValidationError({'desde': "'desde' no puede ser posterior a 'hasta'."})
+    return desde, hasta
@@ -0,0 +1,115 @@
+import re
+import threading
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, F, Max
+from django.db.models.functions import Cast, Substr
+from .models import Boleta, Factura, SecuenciaFolio
+
+# -----------------------------------------------------------------------------
+# ASIGNACIÓN DE FOLIOS (numero_boleta / numero_factura) EN EL SERVIDOR
+# Cada proceso reserva un bloque de FOLIOS_BLOQUE números con un único UPDATE
+# y luego los entrega desde memoria. Sólo se toca la BD al agotar el bloque.
+# Los números de un bloque no usado (reinicio del proceso) quedan como saltos.
+# -----------------------------------------------------------------------------
+CAMPOS_NUMERO = {
+    'boleta': (Boleta, 'numero_boleta'),
+    'factura': (Factura, 'numero_factura'),
+}
+
+SERIE_VALIDA = re.compile(r'^[A-Za-z0-9]{1,8}$')
+
+
+def formatear_folio(serie, numero):
+    return f"{serie}-{numero}" if serie else str(numero)
+
+
+def primer_folio_libre(tipo, serie):
+    """
+    Al crear la secuencia, parte después del mayor número ya usado con el
+    mismo formato (incluye los que enviaron los clientes antes de este cambio).
+    """
+    modelo, campo = CAMPOS_NUMERO[tipo]
+    prefijo = f"{serie}-" if serie else ''
+    mayor = (
+        modelo.objects
+        .filter(**{f'{campo}__regex': rf'^{re.escape(prefijo)}[0-9]+$'})
+        .annotate(n=Cast(Substr(campo, len(prefijo) + 1), BigIntegerField()))
+        .aggregate(mayor=Max('n'))['mayor']
+    )
+    return (mayor or 0) + 1
+
+
+def reservar_bloque(tipo, serie, tamano):
+    """
+    Reserva [inicio, fin) en su propia transacción. No debe llamarse dentro de
+    la transacción de una venta: si ésta se revierte, el bloque que ya está en
+    memoria volvería a quedar libre en la BD.
+    """
+    filtro = {"tipo": tipo, "serie": serie}
+    with transaction.atomic():
+        if not SecuenciaFolio.objects.filter(**filtro).update(siguiente=F('siguiente') + tamano):
+            inicio = primer_folio_libre(tipo, serie)
+            try:
+                with transaction.atomic():
+                    SecuenciaFolio.objects.create(**filtro, siguiente=inicio + tamano)
+                return inicio, inicio + tamano
+            except IntegrityError:
+                # Otro worker creó la secuencia primero
+                SecuenciaFolio.objects.filter(**filtro).update(siguiente=F('siguiente') + tamano)
+
+        fin = SecuenciaFolio.objects.filter(**filtro).values_list('siguiente', flat=True).get()
+    return fin - tamano, fin
+
+
+class AsignadorFolios:
+    def __init__(self, tamano_bloque=None):
+        self.tamano_bloque = tamano_bloque
+        self._bloques = {}
+        self._candados = {}
+        self._candado_general = threading.Lock()
+        self.reservas = 0
+
+    def _candado(self, clave):
+        # Un candado por (tipo, serie): las series no se bloquean entre sí
+        candado = self._candados.get(clave)
+        if candado is None:
+            with self._candado_general:
+                candado = self._candados.setdefault(clave, threading.Lock())
+        return candado
+
+    def siguiente(self, tipo, serie=''):
+        clave = (tipo, serie)
+        with self._candado(clave):
+            actual, fin = self._bloques.get(clave, (0, 0))
+            if actual >= fin:
+                tamano = self.tamano_bloque or getattr(settings, 'FOLIOS_BLOQUE', 20)
+                actual, fin = reservar_bloque(tipo, serie, tamano)
+                self.reservas += 1
+            self._bloques[clave] = (actual + 1, fin)
+        return formatear_folio(serie, actual)
+
+    def reiniciar(self):
+        self._bloques.clear()
+
+
+# Instancia por proceso
+asignador = AsignadorFolios()
+
+
+def folio_en_uso(modelo, numero):
+    """True si ya hay un documento del modelo con ese número."""
+    _, campo = CAMPOS_NUMERO[modelo._meta.model_name]
+    return modelo.objects.filter(**{campo: numero}).exists()
+
+
+def serie_de_request(request):
+    """Serie del terminal (cabecera X-Terminal) si FOLIOS_POR_TERMINAL está activo."""
+    if request is None or not getattr(settings, 'FOLIOS_POR_TERMINAL', False):
+        return ''
+    serie = request.headers.get('X-Terminal', '')
+    return serie if SERIE_VALIDA.match(serie) else ''
+
+
+def asignar_folio(tipo, request=None):
+    return asignador.siguiente(tipo, serie_de_request(request))
@@ -0,0 +1,204 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from tienda.pruebas import caches_aisladas
+
+# -----------------------------------------------------------------------------
+# UTILIDADES COMPARTIDAS POR LOS COMANDOS DE BENCHMARK
+# (el prefijo "_" evita que Django lo registre como comando)
+# -----------------------------------------------------------------------------
+
+
+@contextmanager
+def base_temporal(en_archivo=True, verbosity=0):
+    """
+    Crea una BD de prueba desechable para no ensuciar db.sqlite3.
+    Con en_archivo=True se usa un archivo real, así los COMMIT pagan
+    el costo de disco igual que en producción. La caché del catálogo
+    también es desechable (en memoria), como en las pruebas.
+    """
+    directorio = None
+    if en_archivo and connection.vendor == 'sqlite':
+        directorio = tempfile.mkdtemp(prefix='bench_tienda_')
+        connection.settings_dict.setdefault('TEST', {})
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'bench.sqlite3')
+
+    nombre_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    # Los alias espejo (la réplica 'reporting') leen la BD temporal, no db.sqlite3
+    espejos = {}
+    for alias in connections:
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+            espejos[alias] = connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    try:
+        with caches_aisladas():
+            yield connection
+    finally:
+        for alias, nombre in espejos.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = nombre
+        connection.creation.destroy_test_db(nombre_original, verbosity=verbosity)
+        if directorio:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+
+def percentil(muestras, p):
+    ordenadas = sorted(muestras)
+    if not ordenadas:
+        return 0.0
+    k = (len(ordenadas) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordenadas) - 1)
+    return ordenadas[f] + (ordenadas[c] - ordenadas[f]) * (k - f)
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta `funcion` N veces y devuelve (tiempos_ms, consultas_por_llamada)."""
+    tiempos = []
+    consultas = 0
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = len(ctx.captured_queries)
+    return tiempos, consultas
+
+
+def resumen(tiempos):
+    return {
+        "p50_ms": round(percentil(tiempos, 50), 3),
+        "p95_ms": round(percentil(tiempos, 95), 3),
+        "p99_ms": round(percentil(tiempos, 99), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3) if tiempos else 0.0,
+    }
+
+
+def sembrar_boletas(cantidad, vendedor_ids, dias=365, semilla=42, lote=20000):
+    """Inserta `cantidad` boletas sin detalles (ver sembrar_ventas)."""
+    from ventas.models import Boleta
+
+    sembrar_ventas(Boleta, cantidad, vendedor_ids, dias=dias, semilla=semilla, lote=lote)
+
+
+# Columnas propias de cada documento además de las de Venta
+_COLUMNAS_DOCUMENTO = {
+    'boleta': ("numero_boleta",),
+    'factura': ("numero_factura", "rut_cliente", "razon_social", "giro", "direccion"),
+}
+
+
+def _datos_documento(tipo, i):
+    if tipo == 'boleta':
+        return (f"S{i}",)
+    return (f"SF{i}", f"{76000000 + i % 1000}-{i % 10}", f"Cliente {i % 1000}", "Comercio", "Santiago")
+
+
+def sembrar_ventas(modelo, cantidad, vendedor_ids, productos=(), lineas=(1, 5),
+                   dias=365, semilla=42, lote=20000):
+    """
+    Inserta `cantidad` Boletas o Facturas repartidas en los últimos `dias`
+    días. Si se pasan `productos` (lista de (id, precio)) cada documento
+    lleva entre lineas[0] y lineas[1] DetalleVenta y sus totales cuadran
+    con ellas; si no, sólo cabeceras con totales al azar.
+
+    Va por SQL directo porque bulk_create pisa `fecha` (auto_now_add).
+    Llena también LibroVenta, pero no ResumenVentaDiario: luego hay que
+    correr reconstruir_resumen_ventas.
+    """
+    from ventas.models import DetalleVenta, LibroVenta
+    from ventas.services import IVA, redondear
+
+    tipo = modelo._meta.model_name
+    azar = random.Random(semilla)
+    ahora = timezone.now()
+    segundos = dias * 86400
+    quote = connection.ops.quote_name
+    columnas = ("id", "fecha", "vendedor_id", "total_neto", "total_iva", "total_final") + _COLUMNAS_DOCUMENTO[tipo]
+    sql = (
+        f"INSERT INTO {quote(modelo._meta.db_table)} ({', '.join(columnas)}) "
+        f"VALUES ({', '.join(['%s'] * len(columnas))})"
+    )
+    sql_detalle = (
+        f"INSERT INTO {quote(DetalleVenta._meta.db_table)} ({tipo}_id, producto_id, cantidad, subtotal) "
+        "VALUES (%s, %s, %s, %s)"
+    )
+    primer_id = (modelo.objects.aggregate(maximo=Max('id'))['maximo'] or 0) + 1
+
+    with connection.cursor() as cursor:
+        for base in range(0, cantidad, lote):
+            filas, detalles = [], []
+            for i in range(base, min(base + lote, cantidad)):
+                documento_id = primer_id + i
+                fecha = ahora - timedelta(seconds=azar.randrange(segundos))
+                if productos:
+                    neto = Decimal(0)
+                    for _ in range(azar.randint(*lineas)):
+                        producto_id, precio = azar.choice(productos)
+                        unidades = azar.randint(1, 5)
+                        subtotal = redondear(unidades * precio)
+                        neto += subtotal
+                        detalles.append((documento_id, producto_id, unidades, subtotal))
+                else:
+                    neto = Decimal(azar.randrange(1000, 200000))
+                iva = redondear(neto * IVA)
+                filas.append((
+                    documento_id,
+                    connection.ops.adapt_datetimefield_value(fecha),
+                    azar.choice(vendedor_ids),
+                    neto, iva, neto + iva,
+                    *_datos_documento(tipo, i),
+                ))
+            cursor.executemany(sql, filas)
+            if detalles:
+                cursor.executemany(sql_detalle, detalles)
+
+        # Libro de ventas de los documentos recién sembrados, en una sola consulta
+        cursor.execute(
+            f"INSERT INTO {quote(LibroVenta._meta.db_table)} "
+            "(tipo, documento_id, numero, fecha, vendedor_id, total_neto, total_iva, total_final) "
+            f"SELECT %s, id, numero_{tipo}, fecha, vendedor_id, total_neto, total_iva, total_final "
+            f"FROM {quote(modelo._meta.db_table)} WHERE id >= %s",
+            [tipo, primer_id],
+        )
+
+
+def sembrar_catalogo(productos, vendedores, semilla=42, password='bench'):
+    """
+    Crea `productos` productos (con stock de sobra) y `vendedores` usuarios
+    con rol vendedor y la misma contraseña. Devuelve (productos, vendedores).
+    """
+    from django.contrib.auth.hashers import make_password
+    from productos.models import Producto
+    from usuarios.models import User
+
+    azar = random.Random(semilla)
+    nombres = ("Arroz", "Azúcar", "Aceite", "Fideos", "Harina", "Leche", "Café", "Té", "Sal", "Jabón")
+    creados = Producto.objects.bulk_create([
+        Producto(
+            nombre=f"{azar.choice(nombres)} {i}",
+            sku=f"SKU{i:07d}",
+            precio=Decimal(azar.randrange(100, 5000)) * 10,
+            stock=10**9,
+        )
+        for i in range(productos)
+    ], batch_size=1000)
+    # Un solo hash: PBKDF2 por usuario haría que sembrar tarde minutos
+    clave = make_password(password)
+    usuarios = User.objects.bulk_create([
+        User(username=f"vendedor{i}", role='vendedor', password=clave)
+        for i in range(vendedores)
+    ], batch_size=1000)
+    return creados, usuarios
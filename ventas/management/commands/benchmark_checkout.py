@@ -0,0 +1,92 @@
+import json
+from decimal import Decimal
+from itertools import count
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from productos.cache import invalidar_stock
+from productos.models import Producto
+from usuarios.models import User
+from ventas.models import Boleta, DetalleVenta
+from ventas.services import (
+    IVA, StockInsuficiente, acumular_en_sesiones, acumular_productos, acumular_resumenes,
+    id_sesion_abierta, redondear, registrar_venta,
+)
+from ._bench import base_temporal, medir, resumen
+
+
+def registrar_venta_por_linea(validated_data, detalles_data):
+    # Camino anterior: por cada línea un UPDATE de stock y un INSERT, más un
+    # segundo save() de la cabecera. El libro (señal post_save), los
+    # resúmenes y la caja se escriben igual que en registrar_venta, para que
+    # la comparación sólo mida la diferencia por línea
+    with transaction.atomic():
+        boleta = Boleta.objects.create(sesion_id=id_sesion_abierta(), **validated_data)
+        lineas = []
+        total_neto = Decimal(0)
+        for detalle in detalles_data:
+            producto, cantidad = detalle["producto"], detalle["cantidad"]
+            if not Producto.objects.filter(pk=producto.pk, stock__gte=cantidad).update(stock=F("stock") - cantidad):
+                raise StockInsuficiente(producto.pk, cantidad)
+            subtotal = redondear(Decimal(cantidad) * Decimal(detalle["precio_unitario"]))
+            total_neto += subtotal
+            DetalleVenta.objects.create(boleta=boleta, producto=producto, cantidad=cantidad, subtotal=subtotal)
+            lineas.append({"producto": producto, "cantidad": cantidad, "subtotal": subtotal})
+        iva = redondear(total_neto * IVA)
+        boleta.total_neto = total_neto
+        boleta.total_iva = iva
+        boleta.total_final = total_neto + iva
+        boleta.save()
+
+        acumular_resumenes([boleta])
+        acumular_en_sesiones([boleta])
+        acumular_productos([(boleta, lineas)])
+        transaction.on_commit(invalidar_stock)
+    return boleta
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de commit de una boleta según su cantidad de líneas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', default='1,5,10,20,40,80',
+                            help="Cantidades de líneas a medir, separadas por coma.")
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--en-memoria', action='store_true',
+                            help="Usa SQLite en memoria (sin costo de disco en el COMMIT).")
+
+    def handle(self, *args, **options):
+        cantidades = [int(n) for n in options['lineas'].split(',')]
+
+        with base_temporal(en_archivo=not options['en_memoria']):
+            vendedor = User.objects.create_user(username='bench', password='x', role='vendedor')
+            productos = Producto.objects.bulk_create([
+                Producto(nombre=f"Producto {i}", precio=Decimal('990.00'), stock=10**9)
+                for i in range(max(cantidades))
+            ])
+            folio = count(1)
+
+            resultados = []
+            for n in cantidades:
+                detalles = [
+                    {"producto": p, "cantidad": 2, "precio_unitario": p.precio}
+                    for p in productos[:n]
+                ]
+                fila = {"lineas": n}
+                for nombre, escribir in (
+                    ("por_linea", lambda: registrar_venta_por_linea(
+                        {"vendedor": vendedor, "numero_boleta": f"B{next(folio)}"}, detalles)),
+                    ("bulk", lambda: registrar_venta(
+                        Boleta, {"vendedor": vendedor, "numero_boleta": f"B{next(folio)}"}, detalles)),
+                ):
+                    tiempos, consultas = medir(escribir, options['repeticiones'])
+                    fila[nombre] = {"consultas": consultas, **resumen(tiempos)}
+                resultados.append(fila)
+
+                self.stdout.write(
+                    f"{n:>4} líneas | por_linea: {fila['por_linea']['consultas']:>3} consultas "
+                    f"p50 {fila['por_linea']['p50_ms']:>8.3f} ms | bulk: {fila['bulk']['consultas']:>3} "
+                    f"consultas p50 {fila['bulk']['p50_ms']:>8.3f} ms"
+                )
+
+        self.stdout.write(json.dumps(resultados, indent=2))
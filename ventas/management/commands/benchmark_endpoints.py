@@ -0,0 +1,209 @@
+import json
+import platform
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from productos.cache import invalidar_catalogo
+from usuarios.autenticacion import olvidar_usuario
+from usuarios.cache import invalidar_vendedores
+from usuarios.login import pool_hashing
+from ventas.cache import cache_reportes
+from ventas.folios import asignador
+from ventas.models import Boleta, Factura
+from ._bench import base_temporal, resumen, sembrar_catalogo, sembrar_ventas
+
+PASSWORD = 'bench'
+
+
+def limpiar_caches():
+    # Cachés de proceso y de archivo que esconden el costo de la primera llamada
+    invalidar_catalogo()
+    invalidar_vendedores()
+    cache_reportes.reiniciar()
+    olvidar_usuario()
+
+
+def medir_llamada(llamada):
+    """(ms, consultas, status) de un request completo, contando las consultas
+    en todas las conexiones (primario y réplica)."""
+    with ExitStack() as pila:
+        contextos = [pila.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        inicio = time.perf_counter()
+        respuesta = llamada()
+        # Las respuestas en streaming consultan al recorrerse
+        if getattr(respuesta, 'streaming', False):
+            b''.join(respuesta.streaming_content)
+        ms = (time.perf_counter() - inicio) * 1000
+    return ms, sum(len(ctx.captured_queries) for ctx in contextos), respuesta.status_code
+
+
+def medir_endpoint(llamada, repeticiones):
+    """
+    Como _bench.medir pero para un request completo. La primera llamada va
+    con las cachés vacías y se informa aparte (frío); las `repeticiones`
+    siguientes miden el camino con cachés calientes. Devuelve
+    (frio, calientes), cada medición como (ms, consultas, status).
+    """
+    limpiar_caches()
+    frio = medir_llamada(llamada)
+    return frio, [medir_llamada(llamada) for _ in range(repeticiones)]
+
+
+class Command(BaseCommand):
+    help = ("Siembra una BD temporal con datos reproducibles (semilla) y mide "
+            "p50/p95/p99 y consultas por request de los endpoints principales. "
+            "Escribe el resultado en JSON para comparar corridas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=2000)
+        parser.add_argument('--vendedores', type=int, default=20)
+        parser.add_argument('--boletas', type=int, default=100_000)
+        parser.add_argument('--facturas', type=int, default=10_000)
+        parser.add_argument('--lineas', default='1,5',
+                            help="Mínimo y máximo de líneas por documento sembrado.")
+        parser.add_argument('--dias', type=int, default=365)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--repeticiones-login', type=int, default=10,
+                            help="El login paga el hash de la contraseña: menos repeticiones.")
+        parser.add_argument('--solo', default='',
+                            help="Nombres de endpoints a medir, separados por coma (por defecto todos).")
+        parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto stdout).")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior: muestra la variación de p95.")
+        parser.add_argument('--en-memoria', action='store_true',
+                            help="Usa SQLite en memoria (sin costo de disco en el COMMIT).")
+
+    def sembrar(self, options):
+        minimo, maximo = (int(n) for n in options['lineas'].split(','))
+        productos, vendedores = sembrar_catalogo(options['productos'], options['vendedores'],
+                                                 semilla=options['semilla'], password=PASSWORD)
+        catalogo = [(p.id, p.precio) for p in productos]
+        vendedor_ids = [v.id for v in vendedores]
+        for modelo, cantidad in ((Boleta, options['boletas']), (Factura, options['facturas'])):
+            self.stdout.write(f"Sembrando {cantidad} {modelo._meta.verbose_name_plural}...")
+            sembrar_ventas(modelo, cantidad, vendedor_ids, catalogo, lineas=(minimo, maximo),
+                           dias=options['dias'], semilla=options['semilla'])
+        call_command('reconstruir_resumen_ventas', stdout=self.stdout)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        return productos, vendedores
+
+    def escenarios(self, cliente, productos, vendedor):
+        """(nombre, repeticiones_opcion, función) de cada endpoint medido."""
+        hoy = timezone.localdate()
+        hace_30 = (hoy - timedelta(days=30)).isoformat()
+        lineas = [{"producto": p.id, "cantidad": 1, "precio_unitario": str(p.precio)} for p in productos[:3]]
+        termino = productos[0].nombre.split()[0]
+
+        return [
+            ("login", 'repeticiones_login', lambda: cliente.post(
+                '/api/auth/login/', {"username": vendedor.username, "password": PASSWORD}, format='json')),
+            ("login_async", 'repeticiones_login', lambda: cliente.post(
+                '/api/auth/login/async/', {"username": vendedor.username, "password": PASSWORD}, format='json')),
+            ("catalogo_lista", 'repeticiones', lambda: cliente.get('/api/productos/')),
+            ("catalogo_busqueda", 'repeticiones', lambda: cliente.get('/api/productos/', {"search": termino})),
+            ("venta_boleta", 'repeticiones', lambda: cliente.post(
+                '/api/boletas/', {"detalles": lineas}, format='json')),
+            ("caja_estado", 'repeticiones', lambda: cliente.get('/api/caja/estado/')),
+            ("filtros_reporte", 'repeticiones', lambda: cliente.get('/api/filtros-reporte/')),
+            ("reporte_historico", 'repeticiones', lambda: cliente.get('/api/reporte-ventas/')),
+            ("reporte_30_dias", 'repeticiones', lambda: cliente.get(
+                '/api/reporte-ventas/', {"desde": hace_30, "hasta": hoy.isoformat()})),
+            ("reporte_vendedor_mes", 'repeticiones', lambda: cliente.get(
+                '/api/reporte-ventas/', {"vendedor_id": vendedor.id, "group_by": "month"})),
+        ]
+
+    def handle(self, *args, **options):
+        solo = {n for n in options['solo'].split(',') if n}
+        # ALLOWED_HOSTS de prueba ('testserver') para el cliente de DRF
+        setup_test_environment()
+        try:
+            with base_temporal(en_archivo=not options['en_memoria']):
+                inicio = time.perf_counter()
+                productos, vendedores = self.sembrar(options)
+                segundos_siembra = round(time.perf_counter() - inicio, 1)
+                # Sin restos de corridas anteriores en cachés de proceso/archivo
+                limpiar_caches()
+                asignador.reiniciar()
+                pool_hashing.reiniciar()
+
+                vendedor = vendedores[0]
+                cliente = APIClient()
+
+                endpoints = {}
+                for nombre, opcion, llamada in self.escenarios(cliente, productos, vendedor):
+                    if solo and nombre not in solo:
+                        continue
+                    # JWT real (y vigente) en cada request: mide también la autenticación
+                    cliente.credentials()
+                    token = cliente.post('/api/auth/login/', {"username": vendedor.username, "password": PASSWORD},
+                                         format='json').json()["access"]
+                    cliente.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+                    frio, calientes = medir_endpoint(llamada, options[opcion])
+                    por_repeticion = [consultas for _, consultas, _ in calientes]
+                    endpoints[nombre] = {
+                        "status": calientes[-1][2] if calientes else frio[2],
+                        # Peor caso en caliente; el detalle por repetición muestra si varía
+                        "consultas": max(por_repeticion, default=frio[1]),
+                        "consultas_por_repeticion": por_repeticion,
+                        "frio": {"status": frio[2], "consultas": frio[1], "ms": round(frio[0], 3)},
+                        "repeticiones": options[opcion],
+                        **resumen([ms for ms, _, _ in calientes]),
+                    }
+                    fila = endpoints[nombre]
+                    self.stdout.write(
+                        f"{nombre:<22} {fila['status']} | frío {fila['frio']['consultas']:>3} consultas"
+                        f" {fila['frio']['ms']:>9.3f} ms | caliente {fila['consultas']:>3} consultas"
+                        f" p50 {fila['p50_ms']:>9.3f} ms | p95 {fila['p95_ms']:>9.3f} ms | p99 {fila['p99_ms']:>9.3f} ms"
+                    )
+        finally:
+            teardown_test_environment()
+
+        resultado = {
+            "fecha": timezone.now().isoformat(),
+            "entorno": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "motor": connection.vendor,
+                "en_memoria": options['en_memoria'],
+            },
+            "datos": {
+                clave: options[clave]
+                for clave in ('productos', 'vendedores', 'boletas', 'facturas', 'lineas', 'dias', 'semilla')
+            },
+            "segundos_siembra": segundos_siembra,
+            "endpoints": endpoints,
+        }
+
+        if options['comparar']:
+            self.comparar(options['comparar'], endpoints)
+
+        texto = json.dumps(resultado, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(texto + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+        else:
+            self.stdout.write(texto)
+
+    def comparar(self, ruta, endpoints):
+        with open(ruta, encoding='utf-8') as archivo:
+            anterior = json.load(archivo)["endpoints"]
+        for nombre, actual in endpoints.items():
+            if nombre not in anterior:
+                continue
+            antes = anterior[nombre]
+            variacion = (actual['p95_ms'] - antes['p95_ms']) / antes['p95_ms'] * 100 if antes['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{nombre:<22} p95 {antes['p95_ms']:>9.3f} -> {actual['p95_ms']:>9.3f} ms ({variacion:+.1f}%)"
+                f" | consultas {antes['consultas']} -> {actual['consultas']}"
+                + (f" | frío {antes['frio']['consultas']} -> {actual['frio']['consultas']}" if 'frio' in antes else "")
+            )
@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from ventas.folios import AsignadorFolios
+from ventas.models import SecuenciaFolio
+from ._bench import base_temporal, percentil
+
+
+class Command(BaseCommand):
+    help = ("Asigna folios desde varios hilos (cada uno simula un worker con su "
+            "propio asignador) y verifica que no haya repetidos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--folios', type=int, default=2000, help="Folios por worker.")
+        parser.add_argument('--bloque', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            workers = [AsignadorFolios(tamano_bloque=options['bloque']) for _ in range(options['workers'])]
+            folios = []
+            latencias = []
+            errores = []
+            inicio_total = time.perf_counter()
+
+            def trabajar(asignador):
+                propios, tiempos = [], []
+                try:
+                    for _ in range(options['folios']):
+                        inicio = time.perf_counter()
+                        propios.append(asignador.siguiente('boleta'))
+                        tiempos.append((time.perf_counter() - inicio) * 1000)
+                except Exception as exc:
+                    errores.append(repr(exc))
+                finally:
+                    folios.extend(propios)
+                    latencias.extend(tiempos)
+                    connection.close()
+
+            hilos = [threading.Thread(target=trabajar, args=(w,)) for w in workers]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            segundos = time.perf_counter() - inicio_total
+
+            resultado = {
+                "workers": options['workers'],
+                "folios": len(folios),
+                "repetidos": len(folios) - len(set(folios)),
+                "errores": errores,
+                "reservas_bd": sum(w.reservas for w in workers),
+                "siguiente_en_bd": SecuenciaFolio.objects.get(tipo='boleta').siguiente,
+                "folios_por_segundo": round(len(folios) / segundos),
+                "p50_ms": round(percentil(latencias, 50), 4),
+                "p99_ms": round(percentil(latencias, 99), 4),
+            }
+
+        self.stdout.write(json.dumps(resultado, indent=2))
@@ -0,0 +1,74 @@
+import json
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from usuarios.models import User
+from ventas.fechas import rango_dias
+from ventas.models import Boleta
+from ._bench import base_temporal, medir, resumen, sembrar_boletas
+
+
+def plan(queryset):
+    # EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (otros motores)
+    return queryset.explain()
+
+
+class Command(BaseCommand):
+    help = ("Compara planes y tiempos de los filtros de reporte con y sin índices, "
+            "usando fecha__date vs rango semiabierto.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1_000_000)
+        parser.add_argument('--vendedores', type=int, default=20)
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def consultas(self, vendedor_id):
+        dia = timezone.localdate() - timedelta(days=30)
+        inicio, fin = rango_dias(dia)
+        return {
+            "fecha__date": Boleta.objects.filter(fecha__date=dia),
+            "rango": Boleta.objects.filter(fecha__gte=inicio, fecha__lt=fin),
+            "vendedor+fecha__date": Boleta.objects.filter(vendedor_id=vendedor_id, fecha__date=dia),
+            "vendedor+rango": Boleta.objects.filter(vendedor_id=vendedor_id, fecha__gte=inicio, fecha__lt=fin),
+        }
+
+    def medir_escenario(self, vendedor_id, repeticiones):
+        resultado = {}
+        for nombre, qs in self.consultas(vendedor_id).items():
+            tiempos, _ = medir(lambda: qs.aggregate(total=Sum('total_final')), repeticiones)
+            resultado[nombre] = {"plan": plan(qs.values('total_final')), **resumen(tiempos)}
+        return resultado
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            vendedores = User.objects.bulk_create([
+                User(username=f"vendedor{i}", role='vendedor') for i in range(options['vendedores'])
+            ])
+            vendedor_ids = [v.id for v in vendedores]
+            self.stdout.write(f"Sembrando {options['filas']} boletas...")
+            sembrar_boletas(options['filas'], vendedor_ids, semilla=options['semilla'])
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+            indices = Boleta._meta.indexes
+            resultados = {}
+
+            with connection.schema_editor() as editor:
+                for indice in indices:
+                    editor.remove_index(Boleta, indice)
+            resultados["sin_indices"] = self.medir_escenario(vendedor_ids[0], options['repeticiones'])
+
+            with connection.schema_editor() as editor:
+                for indice in indices:
+                    editor.add_index(Boleta, indice)
+            resultados["con_indices"] = self.medir_escenario(vendedor_ids[0], options['repeticiones'])
+
+        for escenario, filas in resultados.items():
+            self.stdout.write(f"\n== {escenario}")
+            for nombre, r in filas.items():
+                self.stdout.write(f"{nombre:<22} p50 {r['p50_ms']:>9.3f} ms | {r['plan']}")
+        self.stdout.write(json.dumps(resultados, indent=2))
@@ -0,0 +1,95 @@
+import io
+import json
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from tienda.formato_json import JSONParserRapido, JSONRendererRapido, orjson
+from ventas.models import Boleta, Factura
+from ventas.reportes import ConsultaReporte, RankingProductos
+from ventas.serializers import BoletaSerializer, FacturaSerializer
+from ventas.views import DETALLES_CON_PRODUCTO
+from ._bench import base_temporal, resumen, sembrar_catalogo, sembrar_ventas
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+class Command(BaseCommand):
+    help = ("Compara el JSONRenderer/JSONParser de DRF con los de tienda/formato_json.py "
+            "sobre listados de boletas y reportes, verificando que la salida sea idéntica.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boletas', type=int, default=5000)
+        parser.add_argument('--facturas', type=int, default=1000)
+        parser.add_argument('--listado', type=int, default=1000,
+                            help="Boletas por listado renderizado.")
+        parser.add_argument('--productos', type=int, default=500)
+        parser.add_argument('--vendedores', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--repeticiones', type=int, default=50)
+
+    def payloads(self, limite):
+        boletas = list(Boleta.objects.prefetch_related(DETALLES_CON_PRODUCTO).order_by('-fecha', '-id')[:limite])
+        facturas = list(Factura.objects.prefetch_related(DETALLES_CON_PRODUCTO).order_by('-fecha', '-id')[:limite])
+        return {
+            "boletas_con_detalles": BoletaSerializer(boletas, many=True).data,
+            "boletas_cabeceras": BoletaSerializer(boletas, many=True, context={"listado": True}).data,
+            "facturas_con_detalles": FacturaSerializer(facturas, many=True).data,
+            "reporte_diario": self.reporte({"group_by": "day"}),
+            "reporte_por_vendedor": self.reporte({"group_by": "vendedor"}),
+            "ranking_productos": RankingProductos({"limite": "100", "group_by": "week"}).resultado(),
+        }
+
+    def reporte(self, params):
+        consulta = ConsultaReporte(params)
+        return consulta.armar({nombre: tarea() for nombre, tarea in consulta.tareas().items()})
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson no está instalado: el renderer rápido es el de DRF.")
+        repeticiones = options['repeticiones']
+
+        with base_temporal(en_archivo=False):
+            productos, vendedores = sembrar_catalogo(options['productos'], options['vendedores'],
+                                                     semilla=options['semilla'])
+            catalogo = [(p.id, p.precio) for p in productos]
+            for modelo, cantidad in ((Boleta, options['boletas']), (Factura, options['facturas'])):
+                sembrar_ventas(modelo, cantidad, [v.id for v in vendedores], catalogo,
+                               semilla=options['semilla'])
+            # Los reportes leen los resúmenes: sin reconstruirlos saldrían vacíos
+            call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+            payloads = self.payloads(options['listado'])
+
+        resultados = {}
+        for nombre, data in payloads.items():
+            estandar, rapido = JSONRenderer(), JSONRendererRapido()
+            cuerpo = estandar.render(data)
+            if rapido.render(data) != cuerpo:
+                raise AssertionError(f"{nombre}: la salida difiere del JSONRenderer de DRF")
+
+            fila = {"bytes": len(cuerpo)}
+            for etiqueta, funcion in (
+                ("render_drf", lambda: estandar.render(data)),
+                ("render_rapido", lambda: rapido.render(data)),
+                ("parse_drf", lambda: JSONParser().parse(io.BytesIO(cuerpo))),
+                ("parse_rapido", lambda: JSONParserRapido().parse(io.BytesIO(cuerpo))),
+            ):
+                fila[etiqueta] = resumen(cronometrar(funcion, repeticiones))
+            resultados[nombre] = fila
+
+            self.stdout.write(
+                f"{nombre:<22} {fila['bytes']:>9} bytes | render p50 {fila['render_drf']['p50_ms']:>8.3f} -> "
+                f"{fila['render_rapido']['p50_ms']:>8.3f} ms | parse p50 {fila['parse_drf']['p50_ms']:>8.3f} -> "
+                f"{fila['parse_rapido']['p50_ms']:>8.3f} ms"
+            )
+
+        self.stdout.write(json.dumps(resultados, indent=2))
+
@@ -0,0 +1,90 @@
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from productos.models import Producto
+from usuarios.models import User
+from ventas.models import Boleta, DetalleVenta
+from ventas.services import StockInsuficiente, registrar_venta
+from ._bench import base_temporal, percentil
+
+
+class Command(BaseCommand):
+    help = ("Varios terminales (hilos) venden los mismos productos a la vez: mide "
+            "throughput de checkout y verifica que no haya sobreventa.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminales', type=int, default=8)
+        parser.add_argument('--ventas', type=int, default=200, help="Ventas por terminal.")
+        parser.add_argument('--productos', type=int, default=5, help="Productos 'calientes'.")
+        parser.add_argument('--lineas', type=int, default=3)
+        parser.add_argument('--stock', type=int, default=2000, help="Stock inicial de cada producto.")
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            vendedor = User.objects.create_user(username='bench', password='x', role='vendedor')
+            productos = Producto.objects.bulk_create([
+                Producto(nombre=f"Caliente {i}", precio=Decimal('990.00'), stock=options['stock'])
+                for i in range(options['productos'])
+            ])
+            stock_inicial = options['stock'] * len(productos)
+
+            latencias, rechazadas, errores = [], [], []
+            candado = threading.Lock()
+
+            def terminal(numero):
+                azar = random.Random(options['semilla'] + numero)
+                propias, sin_stock, fallas = [], 0, []
+                try:
+                    for venta in range(options['ventas']):
+                        detalles = [
+                            {"producto": p, "cantidad": azar.randint(1, 3), "precio_unitario": p.precio}
+                            for p in azar.sample(productos, min(options['lineas'], len(productos)))
+                        ]
+                        inicio = time.perf_counter()
+                        try:
+                            registrar_venta(Boleta, {"vendedor_id": vendedor.id,
+                                                     "numero_boleta": f"T{numero}-{venta}"}, detalles)
+                        except StockInsuficiente:
+                            sin_stock += 1
+                        except OperationalError as exc:
+                            fallas.append(repr(exc))
+                        propias.append((time.perf_counter() - inicio) * 1000)
+                finally:
+                    with candado:
+                        latencias.extend(propias)
+                        rechazadas.append(sin_stock)
+                        errores.extend(fallas)
+                    connection.close()
+
+            hilos = [threading.Thread(target=terminal, args=(n,)) for n in range(options['terminales'])]
+            inicio_total = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            segundos = time.perf_counter() - inicio_total
+
+            vendido = DetalleVenta.objects.aggregate(total=Sum('cantidad'))['total'] or 0
+            stock_final = Producto.objects.aggregate(total=Sum('stock'))['total']
+            resultado = {
+                "terminales": options['terminales'],
+                "intentos": len(latencias),
+                "ventas_ok": Boleta.objects.count(),
+                "rechazadas_sin_stock": sum(rechazadas),
+                "errores_bd": errores[:5],
+                "checkouts_por_segundo": round(len(latencias) / segundos, 1),
+                "p50_ms": round(percentil(latencias, 50), 3),
+                "p95_ms": round(percentil(latencias, 95), 3),
+                "p99_ms": round(percentil(latencias, 99), 3),
+                # Invariante: lo vendido más lo que queda es exactamente el stock inicial
+                "stock_consistente": stock_inicial - vendido == stock_final,
+                "stock_negativo": Producto.objects.filter(stock__lt=0).exists(),
+            }
+
+        self.stdout.write(json.dumps(resultado, indent=2))
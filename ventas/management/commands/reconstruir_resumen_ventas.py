@@ -0,0 +1,83 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from ventas.models import Boleta, DetalleVenta, Factura, ResumenProductoDiario, ResumenVentaDiario
+
+
+def filas_resumen_ventas():
+    filas = []
+    for modelo in (Boleta, Factura):
+        # TruncDate usa la zona horaria activa (TIME_ZONE), igual que la escritura
+        agrupado = (
+            modelo.objects
+            .annotate(dia=TruncDate('fecha'))
+            .values('dia', 'vendedor_id')
+            .annotate(
+                cantidad=Count('id'),
+                suma_neto=Sum('total_neto'),
+                suma_iva=Sum('total_iva'),
+                suma_final=Sum('total_final'),
+            )
+            .order_by()
+        )
+        filas.extend(
+            ResumenVentaDiario(
+                dia=g['dia'],
+                vendedor_id=g['vendedor_id'],
+                tipo=modelo._meta.model_name,
+                cantidad=g['cantidad'],
+                total_neto=g['suma_neto'] or Decimal('0.00'),
+                total_iva=g['suma_iva'] or Decimal('0.00'),
+                total_final=g['suma_final'] or Decimal('0.00'),
+            )
+            for g in agrupado.iterator(chunk_size=2000)
+        )
+    return filas
+
+
+def filas_resumen_productos():
+    # Un producto puede venderse el mismo día en boletas y en facturas: se suman
+    acumulado = {}
+    for tipo in ('boleta', 'factura'):
+        agrupado = (
+            DetalleVenta.objects
+            .filter(**{f'{tipo}__isnull': False})
+            .annotate(dia=TruncDate(f'{tipo}__fecha'))
+            .values('dia', 'producto_id', f'{tipo}__vendedor_id')
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'))
+            .order_by()
+        )
+        for g in agrupado.iterator(chunk_size=2000):
+            clave = (g['dia'], g['producto_id'], g[f'{tipo}__vendedor_id'])
+            fila = acumulado.setdefault(clave, [0, Decimal(0)])
+            fila[0] += g['unidades']
+            fila[1] += g['ingresos']
+
+    return [
+        ResumenProductoDiario(dia=dia, producto_id=producto_id, vendedor_id=vendedor_id,
+                              cantidad=unidades, total_neto=ingresos)
+        for (dia, producto_id, vendedor_id), (unidades, ingresos) in acumulado.items()
+        if unidades
+    ]
+
+
+class Command(BaseCommand):
+    help = ("Reconstruye ResumenVentaDiario y ResumenProductoDiario desde el "
+            "histórico de boletas, facturas y sus detalles.")
+
+    def handle(self, *args, **options):
+        # Lectura y reemplazo en la misma transacción: una venta confirmada
+        # entre medio no queda fuera de los resúmenes
+        with transaction.atomic():
+            ventas = filas_resumen_ventas()
+            productos = filas_resumen_productos()
+            ResumenVentaDiario.objects.all().delete()
+            ResumenVentaDiario.objects.bulk_create(ventas, batch_size=1000)
+            ResumenProductoDiario.objects.all().delete()
+            ResumenProductoDiario.objects.bulk_create(productos, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen reconstruido: {len(ventas)} filas de ventas, {len(productos)} de productos."
+        ))
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tienda.db import REPLICA_DB_ALIAS, archivo_marca
+
+
+class Command(BaseCommand):
+    help = ("Copia la BD primaria sobre el archivo de la réplica de reportes "
+            "(SQLite backup API, consistente aunque haya ventas en curso).")
+
+    def handle(self, *args, **options):
+        primaria = settings.DATABASES['default']
+        replica = settings.DATABASES.get(REPLICA_DB_ALIAS)
+        if not replica or 'sqlite3' not in primaria['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError("Sólo aplica a una réplica SQLite configurada en DATABASES['reporting'].")
+        if str(primaria['NAME']) == str(replica['NAME']):
+            raise CommandError("La réplica usa el mismo archivo que el primario; defina TIENDA_DB_REPLICA.")
+
+        # La copia tiene todo lo confirmado antes de empezar: ésa es la marca
+        # con la que los reportes deciden si un día cerrado ya está completo
+        inicio = time.time()
+        origen = sqlite3.connect(primaria['NAME'])
+        destino = sqlite3.connect(replica['NAME'])
+        try:
+            with destino:
+                origen.backup(destino)
+        finally:
+            origen.close()
+            destino.close()
+
+        marca = archivo_marca(replica['NAME'])
+        with open(f"{marca}.tmp", 'w', encoding='utf-8') as archivo:
+            archivo.write(repr(inicio))
+        os.replace(f"{marca}.tmp", marca)
+
+        self.stdout.write(self.style.SUCCESS(f"Réplica actualizada: {replica['NAME']}"))
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def llenar_resumen_ventas(apps, schema_editor):
+    # Una fila por (día, vendedor, tipo) con las ventas ya registradas: sin
+    # esto los reportes y filtros, que leen sólo del resumen, saldrían vacíos
+    ResumenVentaDiario = apps.get_model('ventas', 'ResumenVentaDiario')
+    filas = []
+    for tipo in ('boleta', 'factura'):
+        modelo = apps.get_model('ventas', tipo.capitalize())
+        agrupado = (
+            modelo.objects
+            .annotate(dia=TruncDate('fecha'))
+            .values('dia', 'vendedor_id')
+            .annotate(
+                cantidad=Count('id'),
+                suma_neto=Sum('total_neto'),
+                suma_iva=Sum('total_iva'),
+                suma_final=Sum('total_final'),
+            )
+            .order_by()
+        )
+        filas.extend(
+            ResumenVentaDiario(
+                dia=g['dia'], vendedor_id=g['vendedor_id'], tipo=tipo, cantidad=g['cantidad'],
+                total_neto=g['suma_neto'] or 0, total_iva=g['suma_iva'] or 0, total_final=g['suma_final'] or 0,
+            )
+            for g in agrupado.iterator(chunk_size=2000)
+        )
+    ResumenVentaDiario.objects.bulk_create(filas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_sesioncaja'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVentaDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('boleta', 'Boleta'), ('factura', 'Factura')], max_length=10)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('total_neto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_iva', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_final', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'dia'], name='resumen_tipo_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'vendedor', 'tipo'), name='resumen_diario_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumen_ventas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0003_resumenventadiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resumenventadiario',
+            index=models.Index(fields=['vendedor', 'dia'], name='resumen_vendedor_dia_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0004_resumen_vendedor_dia_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='boleta',
+            index=models.Index(fields=['vendedor', 'fecha'], name='boleta_vendedor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='boleta',
+            index=models.Index(fields=['fecha'], name='boleta_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['vendedor', 'fecha'], name='factura_vendedor_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha'], name='factura_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:17
+
+from itertools import islice
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def llenar_libro(apps, schema_editor):
+    # Una fila por cada Boleta y Factura existente
+    LibroVenta = apps.get_model('ventas', 'LibroVenta')
+    for tipo in ('boleta', 'factura'):
+        modelo = apps.get_model('ventas', tipo.capitalize())
+        filas = (
+            LibroVenta(
+                tipo=tipo,
+                documento_id=documento.id,
+                numero=getattr(documento, f'numero_{tipo}'),
+                fecha=documento.fecha,
+                vendedor_id=documento.vendedor_id,
+                total_neto=documento.total_neto,
+                total_iva=documento.total_iva,
+                total_final=documento.total_final,
+            )
+            for documento in modelo.objects.order_by('id').iterator(chunk_size=2000)
+        )
+        # De a 2000 filas para no cargar todo el histórico en memoria
+        while lote := list(islice(filas, 2000)):
+            LibroVenta.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0006_secuenciafolio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibroVenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('boleta', 'Boleta'), ('factura', 'Factura')], max_length=10)),
+                ('documento_id', models.BigIntegerField()),
+                ('numero', models.CharField(max_length=20)),
+                ('fecha', models.DateTimeField()),
+                ('total_neto', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_iva', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_final', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='libro_ventas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha', 'id'], name='libro_fecha_id_idx'), models.Index(fields=['vendedor', 'fecha', 'id'], name='libro_vendedor_fecha_id_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'documento_id'), name='libro_venta_documento_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_libro, migrations.RunPython.noop),
+    ]
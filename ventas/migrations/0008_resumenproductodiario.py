@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def llenar_resumen_productos(apps, schema_editor):
+    # Suma de DetalleVenta por (día, producto, vendedor) de boletas y facturas
+    DetalleVenta = apps.get_model('ventas', 'DetalleVenta')
+    ResumenProductoDiario = apps.get_model('ventas', 'ResumenProductoDiario')
+    acumulado = {}
+    for tipo in ('boleta', 'factura'):
+        agrupado = (
+            DetalleVenta.objects
+            .filter(**{f'{tipo}__isnull': False})
+            .annotate(dia=TruncDate(f'{tipo}__fecha'))
+            .values('dia', 'producto_id', f'{tipo}__vendedor_id')
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'))
+            .order_by()
+        )
+        for g in agrupado.iterator(chunk_size=2000):
+            clave = (g['dia'], g['producto_id'], g[f'{tipo}__vendedor_id'])
+            fila = acumulado.setdefault(clave, [0, 0])
+            fila[0] += g['unidades']
+            fila[1] += g['ingresos']
+
+    ResumenProductoDiario.objects.bulk_create([
+        ResumenProductoDiario(dia=dia, producto_id=producto_id, vendedor_id=vendedor_id,
+                              cantidad=unidades, total_neto=ingresos)
+        for (dia, producto_id, vendedor_id), (unidades, ingresos) in acumulado.items()
+        if unidades
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_productobusqueda'),
+        ('ventas', '0007_libroventa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProductoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('total_neto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='productos.producto')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_productos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendedor', 'dia'], name='resumen_prod_vendedor_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'producto', 'vendedor'), name='resumen_producto_unico')],
+            },
+        ),
+        migrations.RunPython(llenar_resumen_productos, migrations.RunPython.noop),
+    ]
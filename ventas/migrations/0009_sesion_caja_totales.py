@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def asignar_ventas_a_sesiones(apps, schema_editor):
+    SesionCaja = apps.get_model('ventas', 'SesionCaja')
+
+    # Sólo puede quedar una abierta: se cierran las anteriores al abrirse la siguiente
+    abiertas = list(SesionCaja.objects.filter(fecha_cierre__isnull=True).order_by('fecha_apertura'))
+    for sesion, siguiente in zip(abiertas, abiertas[1:]):
+        sesion.fecha_cierre = siguiente.fecha_apertura
+        sesion.save(update_fields=['fecha_cierre'])
+
+    # Cada venta histórica va a la sesión abierta en su fecha, y la sesión
+    # acumula los totales de sus ventas
+    for sesion in SesionCaja.objects.all():
+        totales = {'cantidad': 0, 'total_neto': 0, 'total_iva': 0, 'total_final': 0}
+        for tipo in ('Boleta', 'Factura'):
+            ventas = apps.get_model('ventas', tipo).objects.filter(fecha__gte=sesion.fecha_apertura)
+            if sesion.fecha_cierre:
+                ventas = ventas.filter(fecha__lt=sesion.fecha_cierre)
+            ventas.update(sesion=sesion)
+            suma = ventas.aggregate(
+                cantidad=Count('id'), total_neto=Sum('total_neto'),
+                total_iva=Sum('total_iva'), total_final=Sum('total_final'),
+            )
+            for campo in totales:
+                totales[campo] += suma[campo] or 0
+        SesionCaja.objects.filter(pk=sesion.pk).update(**totales)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0008_resumenproductodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boleta',
+            name='sesion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)ss', to='ventas.sesioncaja'),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='sesion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)ss', to='ventas.sesioncaja'),
+        ),
+        migrations.AddField(
+            model_name='sesioncaja',
+            name='cantidad',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sesioncaja',
+            name='total_final',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='sesioncaja',
+            name='total_iva',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='sesioncaja',
+            name='total_neto',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(asignar_ventas_a_sesiones, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sesioncaja',
+            constraint=models.UniqueConstraint(models.Value(1), condition=models.Q(('fecha_cierre__isnull', True)), name='una_caja_abierta'),
+        ),
+    ]
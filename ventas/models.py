@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q, Value
 from django.utils import timezone 
 from django.db import transaction 
 from django.conf import settings
@@ -14,8 +15,17 @@ class Venta(models.Model):
     total_iva = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_final = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    # Sesión de caja abierta al momento de la venta (NULL si no había ninguna)
+    sesion = models.ForeignKey("SesionCaja", on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name="%(class)ss")
+
     class Meta:
         abstract = True
+        # Los reportes filtran por rango de fecha, con o sin vendedor
+        indexes = [
+            models.Index(fields=["vendedor", "fecha"], name="%(class)s_vendedor_fecha_idx"),
+            models.Index(fields=["fecha"], name="%(class)s_fecha_idx"),
+        ]
 
 
     def __str__(self):
@@ -55,12 +65,128 @@ class DetalleVenta(models.Model):
         return f"{self.producto} x {self.cantidad} = {self.subtotal}"
 
 
+# Secuencia de folios por tipo de documento (y serie/terminal si se configura).
+# Los workers reservan bloques de números (ver ventas/folios.py).
+class SecuenciaFolio(models.Model):
+    TIPO_CHOICES = (
+        ('boleta', 'Boleta'),
+        ('factura', 'Factura'),
+    )
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    serie = models.CharField(max_length=8, blank=True, default='')
+    siguiente = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tipo", "serie"], name="secuencia_folio_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.serie or '-'}: {self.siguiente}"
+
+
+# Libro de ventas: una fila por Boleta o Factura en una sola tabla, escrita en
+# la misma transacción que la venta. Permite listar y sumar ambos tipos en una
+# consulta y paginar por (fecha, id) sin UNION ni mezclas en Python.
+class LibroVenta(models.Model):
+    TIPO_CHOICES = (
+        ('boleta', 'Boleta'),
+        ('factura', 'Factura'),
+    )
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    documento_id = models.BigIntegerField()
+    numero = models.CharField(max_length=20)
+    fecha = models.DateTimeField()
+    vendedor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="libro_ventas")
+    total_neto = models.DecimalField(max_digits=10, decimal_places=2)
+    total_iva = models.DecimalField(max_digits=10, decimal_places=2)
+    total_final = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tipo", "documento_id"], name="libro_venta_documento_unico"),
+        ]
+        # Paginación keyset: ORDER BY fecha DESC, id DESC (con o sin vendedor)
+        indexes = [
+            models.Index(fields=["fecha", "id"], name="libro_fecha_id_idx"),
+            models.Index(fields=["vendedor", "fecha", "id"], name="libro_vendedor_fecha_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.numero} - {self.total_final}"
+
+
+# Resumen diario de ventas (se actualiza en la misma transacción que la venta)
+class ResumenVentaDiario(models.Model):
+    TIPO_CHOICES = (
+        ('boleta', 'Boleta'),
+        ('factura', 'Factura'),
+    )
+
+    dia = models.DateField()
+    vendedor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="resumenes_diarios")
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+
+    cantidad = models.PositiveIntegerField(default=0)
+    total_neto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_iva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_final = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dia", "vendedor", "tipo"], name="resumen_diario_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["tipo", "dia"], name="resumen_tipo_dia_idx"),
+            models.Index(fields=["vendedor", "dia"], name="resumen_vendedor_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.tipo} {self.vendedor_id}: {self.cantidad} ({self.total_final})"
+
+
+# Unidades e ingresos netos por producto, día y vendedor (misma transacción
+# que la venta). Los rankings leen esta tabla: su tamaño depende de días x
+# productos vendidos, no de la cantidad de líneas de DetalleVenta.
+class ResumenProductoDiario(models.Model):
+    dia = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name="resumenes_diarios")
+    vendedor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="resumenes_productos")
+
+    cantidad = models.PositiveIntegerField(default=0)
+    total_neto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dia", "producto", "vendedor"], name="resumen_producto_unico"),
+        ]
+        indexes = [
+            models.Index(fields=["vendedor", "dia"], name="resumen_prod_vendedor_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.producto_id} {self.vendedor_id}: {self.cantidad} ({self.total_neto})"
+
 
-from django.db import models
 
 class SesionCaja(models.Model):
     fecha_apertura = models.DateTimeField(auto_now_add=True)
     fecha_cierre = models.DateTimeField(null=True, blank=True)
 
+    # Totales acumulados de las ventas de la sesión (UPDATE atómico al vender)
+    cantidad = models.PositiveIntegerField(default=0)
+    total_neto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_iva = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_final = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Índice único parcial sobre una constante: a lo más una fila con
+            # fecha_cierre NULL. Además, buscar la sesión abierta lee sólo ese índice.
+            models.UniqueConstraint(Value(1), condition=Q(fecha_cierre__isnull=True), name="una_caja_abierta"),
+        ]
+
     def __str__(self):
-        return f"Sesión {self.id} - {'ABIERTA' if not self.fecha_cierre else 'CERRADA'}"
\ No newline at end of file
+        return f"Sesión {self.id} - {'ABIERTA' if not self.fecha_cierre else 'CERRADA'}"
@@ -0,0 +1,77 @@
+import base64
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# -----------------------------------------------------------------------------
+# PAGINACIÓN KEYSET POR (fecha, id)
+# En vez de OFFSET (que recorre y descarta todas las filas anteriores) cada
+# página sigue desde la última (fecha, id) vista: con el índice (fecha, id)
+# el costo es el mismo en la primera página que en la millonésima.
+# -----------------------------------------------------------------------------
+
+
+class PaginacionKeyset(BasePagination):
+    parametro_cursor = 'cursor'
+    parametro_limite = 'limite'
+    limite_por_defecto = 50
+    limite_maximo = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limite = self.leer_limite(request)
+
+        queryset = queryset.order_by('-fecha', '-id')
+        cursor = request.query_params.get(self.parametro_cursor)
+        if cursor:
+            fecha, ultimo_id = self.decodificar(cursor)
+            queryset = queryset.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=ultimo_id))
+
+        # Una fila extra indica si hay página siguiente (sin COUNT)
+        filas = list(queryset[:self.limite + 1])
+        self.hay_siguiente = len(filas) > self.limite
+        filas = filas[:self.limite]
+        self.ultima = filas[-1] if filas else None
+        return filas
+
+    def get_paginated_response(self, data):
+        return Response({
+            "siguiente": self.enlace_siguiente(),
+            "resultados": data,
+        })
+
+    def leer_limite(self, request):
+        valor = request.query_params.get(self.parametro_limite)
+        if valor is None:
+            return self.limite_por_defecto
+        try:
+            limite = int(valor)
+        except ValueError:
+            limite = 0
+        if limite < 1:
+            raise ValidationError({self.parametro_limite: "Debe ser un entero positivo."})
+        return min(limite, self.limite_maximo)
+
+    def enlace_siguiente(self):
+        if not self.hay_siguiente:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.parametro_cursor, self.codificar(self.ultima))
+
+    def codificar(self, fila):
+        posicion = f"{fila.fecha.isoformat()}|{fila.id}"
+        return base64.urlsafe_b64encode(posicion.encode()).decode()
+
+    def decodificar(self, cursor):
+        try:
+            fecha, ultimo_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            fecha = parse_datetime(fecha)
+            ultimo_id = int(ultimo_id)
+        except (ValueError, UnicodeError):
+            fecha = None
+        if fecha is None:
+            raise ValidationError({self.parametro_cursor: "Cursor inválido."})
+        return fecha, ultimo_id
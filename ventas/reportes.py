@@ -0,0 +1,337 @@
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from tienda.db import sincronizada_hasta
+from .exportar import FORMATOS
+from .fechas import inicio_del_dia, leer_rango
+from .models import Boleta, Factura, ResumenProductoDiario, ResumenVentaDiario
+from .services import redondear
+
+# -----------------------------------------------------------------------------
+# MOTOR DEL REPORTE DE VENTAS
+# Compartido por la vista síncrona (DRF) y la asíncrona (ASGI): la consulta se
+# arma una vez y sus partes independientes se pueden ejecutar en paralelo.
+# -----------------------------------------------------------------------------
+def sumar_resumen(qs_resumen):
+    return qs_resumen.aggregate(
+        cantidad=Coalesce(Sum('cantidad'), 0),
+        total_neto=Coalesce(Sum('total_neto'), Decimal('0.00')),
+        total_iva=Coalesce(Sum('total_iva'), Decimal('0.00')),
+        total_final=Coalesce(Sum('total_final'), Decimal('0.00'))
+    )
+
+
+def formato_resumen(fila):
+    return {
+        "cantidad": fila['cantidad'],
+        "suma_neto": fila['total_neto'],
+        "suma_iva": fila['total_iva'],
+        "suma_total": fila['total_final'],
+    }
+
+
+# Agrupaciones soportadas por la serie del reporte (sobre ResumenVentaDiario.dia)
+AGRUPACIONES = {
+    'day': F('dia'),
+    'week': TruncWeek('dia'),
+    'month': TruncMonth('dia'),
+    'vendedor': F('vendedor_id'),
+}
+
+
+def serie_resumen(qs_resumen, group_by):
+    """
+    Serie de tiempo (o por vendedor) en UNA consulta agrupada por
+    (grupo, tipo) sobre el resumen diario, en vez de un reporte por día.
+    """
+    clave = 'vendedor_id' if group_by == 'vendedor' else 'periodo'
+    vacio = {"cantidad": 0, "suma_neto": Decimal('0.00'), "suma_iva": Decimal('0.00'), "suma_total": Decimal('0.00')}
+
+    filas = (
+        qs_resumen
+        .annotate(grupo=AGRUPACIONES[group_by])
+        .values('grupo', 'tipo')
+        .annotate(
+            cantidad=Sum('cantidad'),
+            total_neto=Sum('total_neto'),
+            total_iva=Sum('total_iva'),
+            total_final=Sum('total_final'),
+        )
+        .order_by('grupo', 'tipo')
+    )
+
+    serie = {}
+    for fila in filas:
+        punto = serie.setdefault(fila['grupo'], {clave: fila['grupo'], "boletas": vacio, "facturas": vacio})
+        punto[f"{fila['tipo']}s"] = formato_resumen(fila)
+    return list(serie.values())
+
+
+class ConsultaReporte:
+    """Parámetros validados del reporte y los querysets ya filtrados."""
+
+    def __init__(self, params):
+        # 1. Obtener parámetros
+        self.vendedor_id = params.get('vendedor_id')
+        self.fecha = params.get('fecha')
+        self.desde, self.hasta = leer_rango(params)
+        self.group_by = params.get('group_by')
+        self.exportar = params.get('exportar')
+
+        if self.group_by and self.group_by not in AGRUPACIONES:
+            raise ValidationError({"group_by": f"Agrupación no soportada, use: {', '.join(AGRUPACIONES)}."})
+        # (no usamos ?format= porque DRF lo reserva para elegir el renderer)
+        if self.exportar and self.exportar not in FORMATOS:
+            raise ValidationError({"exportar": f"Formato no soportado, use: {', '.join(FORMATOS)}."})
+
+        self.qs_boletas = Boleta.objects.all()
+        self.qs_facturas = Factura.objects.all()
+        self.qs_resumen = ResumenVentaDiario.objects.all()
+
+        # 2. Filtros (Vendedor y rango de días, semiabierto en datetimes)
+        if self.vendedor_id:
+            self.filtrar(vendedor_id=self.vendedor_id)
+
+        if self.desde:
+            self.filtrar(fecha__gte=inicio_del_dia(self.desde))
+            self.qs_resumen = self.qs_resumen.filter(dia__gte=self.desde)
+
+        if self.hasta:
+            self.filtrar(fecha__lt=inicio_del_dia(self.hasta + timedelta(days=1)))
+            self.qs_resumen = self.qs_resumen.filter(dia__lte=self.hasta)
+
+    def filtrar(self, **filtros):
+        # El resumen no tiene `fecha`: sólo recibe el filtro de vendedor
+        self.qs_boletas = self.qs_boletas.filter(**filtros)
+        self.qs_facturas = self.qs_facturas.filter(**filtros)
+        if 'vendedor_id' in filtros:
+            self.qs_resumen = self.qs_resumen.filter(vendedor_id=filtros['vendedor_id'])
+
+    def clave(self):
+        # Parámetros ya validados y normalizados (fecha -> desde/hasta)
+        return (self.vendedor_id or None, self.fecha or None, self.desde, self.hasta, self.group_by or None)
+
+    def inmutable(self):
+        """
+        True si el rango terminó hace más de REPORTES_CACHE_TTL (margen para
+        las ventas que confirman justo después de medianoche) y los datos se
+        leen de una BD que ya tiene ese cierre: el primario, o una réplica
+        sincronizada después. Una réplica atrasada no se guarda para siempre.
+        """
+        if self.hasta is None:
+            return False
+        cierre = inicio_del_dia(self.hasta + timedelta(days=1)) + timedelta(seconds=settings.REPORTES_CACHE_TTL)
+        if timezone.now() <= cierre:
+            return False
+        sincronizada = sincronizada_hasta(self.qs_resumen.db)
+        return sincronizada is not None and sincronizada > cierre
+
+    def tareas(self):
+        """
+        Consultas independientes entre sí (nombre -> función sin argumentos).
+        La vista síncrona las ejecuta en orden; la asíncrona, a la vez.
+        """
+        tareas = {
+            # 3 y 4. Totales de BOLETAS y FACTURAS desde el resumen diario
+            # (una fila por día/vendedor/tipo: el costo no crece con las ventas)
+            "boletas": lambda: sumar_resumen(self.qs_resumen.filter(tipo='boleta')),
+            "facturas": lambda: sumar_resumen(self.qs_resumen.filter(tipo='factura')),
+            # 5. LISTA DETALLADA DE FACTURAS
+            # Usamos .values() para traer solo los campos necesarios y mejorar rendimiento
+            "lista_facturas": lambda: list(
+                self.qs_facturas.values(
+                    'numero_factura',
+                    'total_neto',
+                    'total_iva',
+                    'total_final'
+                ).order_by('numero_factura')
+            ),
+        }
+        # Serie agrupada (?group_by=day|week|month|vendedor)
+        if self.group_by:
+            tareas["serie"] = lambda: serie_resumen(self.qs_resumen, self.group_by)
+        return tareas
+
+    def armar(self, resultados):
+        # 6. Construir Respuesta
+        reporte_boletas = resultados["boletas"]
+        reporte_facturas_totales = resultados["facturas"]
+        data = {
+            "metadata": {
+                "vendedor": self.vendedor_id if self.vendedor_id else "Todos",
+                "fecha": self.fecha if self.fecha else "Histórico",
+                "desde": self.desde,
+                "hasta": self.hasta,
+                "group_by": self.group_by,
+            },
+
+            # Sección Boletas (Solo resumen)
+            "resumen_boletas": {
+                "cantidad_boletas": reporte_boletas['cantidad'],
+                "suma_neto": reporte_boletas['total_neto'],
+                "suma_iva": reporte_boletas['total_iva'],
+                "suma_total": reporte_boletas['total_final']
+            },
+
+            # Sección Facturas (Resumen + Detalle)
+            "facturas": {
+                "resumen": {
+                    "cantidad_facturas": reporte_facturas_totales['cantidad'],
+                    "suma_neto": reporte_facturas_totales['total_neto'],
+                    "suma_iva": reporte_facturas_totales['total_iva'],
+                    "suma_total": reporte_facturas_totales['total_final']
+                },
+                # Aquí está la lista solicitada
+                "detalle_lista": resultados["lista_facturas"]
+            }
+        }
+
+        if "serie" in resultados:
+            data["serie"] = resultados["serie"]
+
+        return data
+
+
+# -----------------------------------------------------------------------------
+# RANKING DE PRODUCTOS (sobre ResumenProductoDiario)
+# -----------------------------------------------------------------------------
+ORDENES_RANKING = {'ingresos', 'unidades'}
+LIMITE_RANKING = 10
+LIMITE_RANKING_MAXIMO = 100
+CIEN = Decimal('100')
+
+
+class RankingProductos:
+    """
+    Top-N de productos por unidades o ingresos netos en un rango de días,
+    opcionalmente de un vendedor, con su participación en los ingresos y su
+    tendencia (?group_by=day|week|month). Tres consultas como máximo.
+    """
+
+    def __init__(self, params):
+        self.vendedor_id = params.get('vendedor_id')
+        self.desde, self.hasta = leer_rango(params)
+        self.orden = params.get('orden', 'ingresos')
+        self.group_by = params.get('group_by')
+
+        if self.orden not in ORDENES_RANKING:
+            raise ValidationError({"orden": f"Orden no soportado, use: {', '.join(sorted(ORDENES_RANKING))}."})
+        if self.group_by and (self.group_by not in AGRUPACIONES or self.group_by == 'vendedor'):
+            raise ValidationError({"group_by": "Agrupación no soportada, use: day, week, month."})
+        try:
+            self.limite = int(params.get('limite', LIMITE_RANKING))
+        except ValueError:
+            self.limite = 0
+        if not 1 <= self.limite <= LIMITE_RANKING_MAXIMO:
+            raise ValidationError({"limite": f"Debe estar entre 1 y {LIMITE_RANKING_MAXIMO}."})
+
+        self.qs = ResumenProductoDiario.objects.all()
+        if self.vendedor_id:
+            self.qs = self.qs.filter(vendedor_id=self.vendedor_id)
+        if self.desde:
+            self.qs = self.qs.filter(dia__gte=self.desde)
+        if self.hasta:
+            self.qs = self.qs.filter(dia__lte=self.hasta)
+
+    def totales(self):
+        return self.qs.aggregate(
+            unidades=Coalesce(Sum('cantidad'), 0),
+            ingresos=Coalesce(Sum('total_neto'), Decimal('0.00')),
+        )
+
+    def top(self):
+        return list(
+            self.qs
+            .values('producto_id', nombre=F('producto__nombre'))
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum('total_neto'))
+            .order_by(f'-{self.orden}', 'producto_id')[:self.limite]
+        )
+
+    def tendencia(self, producto_ids):
+        return list(
+            self.qs
+            .filter(producto_id__in=producto_ids)
+            .annotate(periodo=AGRUPACIONES[self.group_by])
+            .values('producto_id', 'periodo')
+            .annotate(unidades=Sum('cantidad'), ingresos=Sum('total_neto'))
+            .order_by('producto_id', 'periodo')
+        )
+
+    def resultado(self):
+        totales = self.totales()
+        top = self.top()
+        tendencia = {}
+        if self.group_by and top:
+            for fila in self.tendencia([p['producto_id'] for p in top]):
+                tendencia.setdefault(fila['producto_id'], []).append({
+                    "periodo": fila['periodo'],
+                    "unidades": fila['unidades'],
+                    "ingresos": fila['ingresos'],
+                })
+
+        productos = []
+        for fila in top:
+            participacion = (
+                redondear(fila['ingresos'] * CIEN / totales['ingresos']) if totales['ingresos'] else Decimal('0.00')
+            )
+            producto = {
+                "producto": fila['producto_id'],
+                "nombre": fila['nombre'],
+                "unidades": fila['unidades'],
+                "ingresos": fila['ingresos'],
+                "participacion": participacion,
+            }
+            if self.group_by:
+                producto["tendencia"] = tendencia.get(fila['producto_id'], [])
+            productos.append(producto)
+
+        return {
+            "metadata": {
+                "vendedor": self.vendedor_id if self.vendedor_id else "Todos",
+                "desde": self.desde,
+                "hasta": self.hasta,
+                "orden": self.orden,
+                "limite": self.limite,
+                "group_by": self.group_by,
+            },
+            "totales": totales,
+            "productos": productos,
+        }
+
+
+def dias_con_ventas(vendedor_id=None):
+    # ResumenVentaDiario sólo tiene filas para días con ventas: basta un
+    # DISTINCT sobre el índice, opcionalmente acotado a un vendedor.
+    qs_dias = ResumenVentaDiario.objects.all()
+    if vendedor_id:
+        qs_dias = qs_dias.filter(vendedor_id=vendedor_id)
+    return list(qs_dias.order_by('dia').values_list('dia', flat=True).distinct())
+
+
+# -----------------------------------------------------------------------------
+# EJECUCIÓN CONCURRENTE (vistas asíncronas)
+# -----------------------------------------------------------------------------
+def _en_hilo_propio(tarea):
+    def ejecutar():
+        try:
+            return tarea()
+        finally:
+            # Cada hilo del pool abre su conexión: se cierra al terminar
+            connections.close_all()
+    # thread_sensitive=False: con el valor por defecto (y con aaggregate y
+    # compañía) todas las consultas pasan por el mismo hilo, una tras otra.
+    return sync_to_async(ejecutar, thread_sensitive=False)()
+
+
+async def ejecutar_en_paralelo(tareas):
+    """Ejecuta a la vez las tareas de {nombre: función} y devuelve {nombre: resultado}."""
+    nombres = list(tareas)
+    resultados = await asyncio.gather(*(_en_hilo_propio(tareas[nombre]) for nombre in nombres))
+    return dict(zip(nombres, resultados))
@@ -1,13 +1,64 @@
+from django.conf import settings
+from django.db import IntegrityError
 from rest_framework import serializers
-from decimal import Decimal
-from django.db import transaction
-from .models import Boleta, Factura, DetalleVenta
+from tienda.campos import CamposDinamicosMixin
+from usuarios.autenticacion import id_usuario
 from productos.models import Producto
+from .models import Boleta, Factura, DetalleVenta, LibroVenta, SesionCaja
+from .folios import asignar_folio, folio_en_uso
+from .services import StockInsuficiente, registrar_venta
 
 # -----------------------------------------------------------------------------
 # SERIALIZER DE DETALLE
 # -----------------------------------------------------------------------------
+def ids_de_productos(detalles):
+    """Ids de producto válidos (enteros) de una lista de detalles sin validar."""
+    ids = set()
+    for detalle in detalles if isinstance(detalles, list) else []:
+        valor = detalle.get("producto") if isinstance(detalle, dict) else None
+        if isinstance(valor, bool):
+            continue
+        try:
+            ids.add(int(valor))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+class DetallesVentaListSerializer(serializers.ListSerializer):
+    """
+    Resuelve los productos de todas las líneas con un solo in_bulk antes de
+    validarlas (en vez de un SELECT por línea). Si el contexto ya trae un
+    mapa 'productos' (ventas por lote) sólo se buscan los que faltan.
+    """
+
+    def to_internal_value(self, data):
+        productos = self.context.get('productos', {})
+        faltantes = ids_de_productos(data) - productos.keys()
+        self.productos = {**productos, **Producto.objects.in_bulk(faltantes)} if faltantes else productos
+        return super().to_internal_value(data)
+
+
+class ProductoDeLineaField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        # Fuera de DetallesVentaListSerializer se comporta como siempre
+        productos = getattr(self.parent.parent, 'productos', None)
+        if productos is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in productos:
+            self.fail('does_not_exist', pk_value=data)
+        return productos[pk]
+
+
 class DetalleVentaSerializer(serializers.ModelSerializer):
+    producto = ProductoDeLineaField(queryset=Producto.objects.all())
+
     # 1. Traemos el NOMBRE del producto relacionado
     nombre_producto = serializers.ReadOnlyField(source='producto.nombre')
     
@@ -20,6 +71,7 @@ class DetalleVentaSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = DetalleVenta
+        list_serializer_class = DetallesVentaListSerializer
         # AGREGAMOS 'nombre_producto' y 'precio_real' a la lista
         fields = [
             "producto", 
@@ -31,119 +83,132 @@ class DetalleVentaSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["subtotal"]
 
+    def validate(self, attrs):
+        # Opcional (VENTAS_VALIDAR_PRECIO): el precio enviado debe ser el del catálogo
+        if getattr(settings, 'VENTAS_VALIDAR_PRECIO', False):
+            precio = attrs["producto"].precio
+            if attrs["precio_unitario"] != precio:
+                raise serializers.ValidationError(
+                    {"precio_unitario": [f"No coincide con el precio del producto ({precio})."]}
+                )
+        return attrs
+
 # -----------------------------------------------------------------------------
-# SERIALIZER DE BOLETA
+# SERIALIZER BASE DE VENTA (Boleta y Factura comparten la escritura)
 # -----------------------------------------------------------------------------
-class BoletaSerializer(serializers.ModelSerializer):
+# Folios del servidor que se saltan como máximo por venta si ya los usaron
+# números enviados a mano por los clientes
+REINTENTOS_FOLIO = 20
+
+
+def completar_folio(validated_data, modelo, request=None):
+    """Asigna el folio si el cliente no lo envió. Devuelve True si lo asignó."""
+    tipo = modelo._meta.model_name
+    campo = f"numero_{tipo}"
+    if validated_data.get(campo):
+        return False
+    validated_data[campo] = asignar_folio(tipo, request)
+    return True
+
+
+def registrar_venta_con_folio(modelo, validated_data, detalles_data, request=None, folio_del_servidor=False):
+    """
+    registrar_venta, pero si el folio lo asignó el servidor y un cliente ya
+    guardó ese mismo número a mano, pasa al siguiente folio en vez de fallar.
+    Un número enviado por el cliente no se cambia: el IntegrityError sube.
+    """
+    tipo = modelo._meta.model_name
+    campo = f"numero_{tipo}"
+    for intento in range(REINTENTOS_FOLIO + 1):
+        try:
+            return registrar_venta(modelo, validated_data, detalles_data)
+        except IntegrityError:
+            if not folio_del_servidor or intento == REINTENTOS_FOLIO or not folio_en_uso(modelo, validated_data[campo]):
+                raise
+            validated_data[campo] = asignar_folio(tipo, request)
+
+
+def errores_de_integridad(modelo, numero):
+    """Errores de validación para un IntegrityError al guardar un documento."""
+    campo = f"numero_{modelo._meta.model_name}"
+    # Sólo es número repetido si el número ya está guardado; cualquier otra
+    # restricción (FK, NOT NULL) se informa aparte
+    if folio_en_uso(modelo, numero):
+        return {campo: ["Ya existe un documento con este número."]}
+    return {"non_field_errors": ["El documento no cumple una restricción de la base de datos."]}
+
+
+class VentaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     detalles = DetalleVentaSerializer(many=True)
 
-    class Meta:
-        model = Boleta
-        # Quitamos "cliente" porque no existe en el modelo Boleta
-        fields = [
-            "id", "fecha", "vendedor", "numero_boleta",
-            "total_neto", "total_iva", "total_final", "detalles"
-        ]
-        read_only_fields = ["fecha", "total_neto", "total_iva", "total_final", "vendedor"]
-
     def create(self, validated_data):
         detalles_data = validated_data.pop("detalles")
-        
+
         # Obtenemos el usuario del contexto (request.user)
+        # (puede ser un TokenUser sin fila de BD, por eso usamos el id)
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            validated_data['vendedor'] = request.user
-
-        with transaction.atomic():
-            # 1. Crear la Boleta
-            boleta = Boleta.objects.create(**validated_data)
-
-            total_neto = Decimal(0)
-
-            # 2. Procesar Detalles
-            for detalle in detalles_data:
-                producto = detalle["producto"]
-                cantidad = detalle["cantidad"]
-                precio = detalle["precio_unitario"]
-                
-                # Opcional: Validar que el precio coincida con producto.precio si no permites cambios manuales
-                
-                subtotal = Decimal(cantidad) * Decimal(precio)
-                total_neto += subtotal
-                
-                # IMPORTANTE: Usamos 'boleta=boleta' (no venta=boleta)
-                DetalleVenta.objects.create(
-                    boleta=boleta,
-                    producto=producto,
-                    cantidad=cantidad,
-                    subtotal=subtotal
-                )
-
-            # 3. Cálculos Finales (usando Decimal)
-            # IVA 19%
-            iva = total_neto * Decimal('0.19')
-            total_final = total_neto + iva
+            validated_data['vendedor_id'] = id_usuario(request.user)
+
+        # Si el cliente no envió número, el servidor asigna el folio
+        # (antes de abrir la transacción de la venta, ver ventas/folios.py)
+        del_servidor = completar_folio(validated_data, self.Meta.model, request)
+
+        # Totales en memoria + stock + 1 INSERT de cabecera + 1 bulk_create de detalles
+        try:
+            return registrar_venta_con_folio(self.Meta.model, validated_data, detalles_data,
+                                             request, folio_del_servidor=del_servidor)
+        except StockInsuficiente as exc:
+            raise serializers.ValidationError({"detalles": [str(exc)]})
+        except IntegrityError:
+            # Otro request guardó el mismo número entre la validación y la escritura
+            numero = validated_data[f"numero_{self.Meta.model._meta.model_name}"]
+            raise serializers.ValidationError(errores_de_integridad(self.Meta.model, numero))
 
-            boleta.total_neto = total_neto
-            boleta.total_iva = iva
-            boleta.total_final = total_final
-            boleta.save()
-            
-            return boleta
+# -----------------------------------------------------------------------------
+# SERIALIZER DE BOLETA
+# -----------------------------------------------------------------------------
+class BoletaSerializer(VentaSerializer):
+    class Meta:
+        model = Boleta
+        # Quitamos "cliente" porque no existe en el modelo Boleta
+        fields = [
+            "id", "fecha", "vendedor", "sesion", "numero_boleta",
+            "total_neto", "total_iva", "total_final", "detalles"
+        ]
+        read_only_fields = ["fecha", "total_neto", "total_iva", "total_final", "vendedor", "sesion"]
+        # Los listados no traen las líneas salvo ?expand=detalles
+        campos_expandibles = ["detalles"]
+        # Opcional: si no viene, se asigna un folio en el servidor
+        extra_kwargs = {"numero_boleta": {"required": False, "allow_blank": True}}
 
 # -----------------------------------------------------------------------------
 # SERIALIZER DE FACTURA
 # -----------------------------------------------------------------------------
-class FacturaSerializer(serializers.ModelSerializer):
-    detalles = DetalleVentaSerializer(many=True)
-
+class FacturaSerializer(VentaSerializer):
     class Meta:
         model = Factura
         # Quitamos "cliente" genérico, dejamos los datos específicos de factura
         fields = [
-            "id", "fecha", "vendedor", "numero_factura",
+            "id", "fecha", "vendedor", "sesion", "numero_factura",
             "rut_cliente", "razon_social", "giro", "direccion",
             "total_neto", "total_iva", "total_final", "detalles"
         ]
-        read_only_fields = ["fecha", "total_neto", "total_iva", "total_final", "vendedor"]
-
-    def create(self, validated_data):
-        detalles_data = validated_data.pop("detalles")
-        
-        request = self.context.get('request')
-        if request and hasattr(request, 'user'):
-            validated_data['vendedor'] = request.user
-
-        with transaction.atomic():
-            factura = Factura.objects.create(**validated_data)
-
-            total_neto = Decimal(0)
-
-            for detalle in detalles_data:
-                producto = detalle["producto"]
-                cantidad = detalle["cantidad"]
-                precio = detalle["precio_unitario"]
-
-                subtotal = Decimal(cantidad) * Decimal(precio)
-                total_neto += subtotal
-                
-                # IMPORTANTE: Usamos 'factura=factura'
-                DetalleVenta.objects.create(
-                    factura=factura,
-                    producto=producto,
-                    cantidad=cantidad,
-                    subtotal=subtotal
-                )
+        read_only_fields = ["fecha", "total_neto", "total_iva", "total_final", "vendedor", "sesion"]
+        campos_expandibles = ["detalles"]
+        extra_kwargs = {"numero_factura": {"required": False, "allow_blank": True}}
 
-            iva = total_neto * Decimal('0.19')
-            total_final = total_neto + iva
-
-            factura.total_neto = total_neto
-            factura.total_iva = iva
-            factura.total_final = total_final
-            factura.save()
-            
-            return factura
+# -----------------------------------------------------------------------------
+# SERIALIZER DEL LIBRO DE VENTAS (Boleta y Factura juntas, sólo lectura)
+# -----------------------------------------------------------------------------
+class LibroVentaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LibroVenta
+        fields = [
+            "id", "tipo", "documento_id", "numero", "fecha", "vendedor",
+            "total_neto", "total_iva", "total_final"
+        ]
+        read_only_fields = fields
 
 # -----------------------------------------------------------------------------
 # SERIALIZER DE ESTADO
@@ -153,3 +218,13 @@ class EstadoCajaSerializer(serializers.Serializer):
     caja_abierta = serializers.BooleanField()
 
 
+class SesionCajaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SesionCaja
+        fields = [
+            "id", "fecha_apertura", "fecha_cierre",
+            "cantidad", "total_neto", "total_iva", "total_final"
+        ]
+        read_only_fields = fields
+
+
@@ -0,0 +1,351 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Exists, F, IntegerField, Value, When
+from django.utils import timezone
+from productos.cache import invalidar_stock
+from productos.models import Producto
+from .cache import cache_reportes
+from .models import DetalleVenta, LibroVenta, ResumenProductoDiario, ResumenVentaDiario, SesionCaja
+
+# -----------------------------------------------------------------------------
+# MOTOR DE ESCRITURA DE VENTAS (compartido por Boleta y Factura)
+# -----------------------------------------------------------------------------
+IVA = Decimal('0.19')
+CENTAVOS = Decimal('0.01')
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, producto_id, cantidad):
+        self.producto_id = producto_id
+        self.cantidad = cantidad
+        super().__init__(f"Stock insuficiente para el producto {producto_id} (se piden {cantidad}).")
+
+
+def redondear(valor):
+    # Mismo redondeo que aplica la BD al guardar un DecimalField(decimal_places=2)
+    return valor.quantize(CENTAVOS, rounding=ROUND_HALF_EVEN)
+
+
+def calcular_totales(detalles_data):
+    """
+    Calcula en memoria el subtotal de cada línea y los totales del documento.
+    Devuelve (lineas, totales) donde cada línea es un dict con
+    producto, cantidad y subtotal.
+    """
+    lineas = []
+    total_neto = Decimal(0)
+
+    for detalle in detalles_data:
+        cantidad = detalle["cantidad"]
+        subtotal = redondear(Decimal(cantidad) * Decimal(detalle["precio_unitario"]))
+        total_neto += subtotal
+        lineas.append({
+            "producto": detalle["producto"],
+            "cantidad": cantidad,
+            "subtotal": subtotal,
+        })
+
+    total_iva = redondear(total_neto * IVA)
+    totales = {
+        "total_neto": total_neto,
+        "total_iva": total_iva,
+        "total_final": total_neto + total_iva,
+    }
+    return lineas, totales
+
+
+def registrar_venta(modelo, validated_data, detalles_data):
+    """
+    Crea un documento de venta (Boleta o Factura) con sus detalles.
+
+    Los totales se calculan antes de tocar la BD, así la cabecera se inserta
+    una sola vez con sus valores finales y todas las líneas van en un único
+    bulk_create. Con el stock (un UPDATE), el libro, los resúmenes y la caja,
+    la cantidad de consultas no depende de la cantidad de líneas.
+    """
+    return registrar_ventas(modelo, [(validated_data, detalles_data)])[0]
+
+
+def registrar_ventas(modelo, documentos):
+    """
+    Igual que registrar_venta pero para varios documentos del mismo tipo
+    (lista de (validated_data, detalles_data)) en una sola transacción:
+    un UPDATE de stock para todos los productos, un bulk_create de
+    cabeceras, uno de detalles, uno del libro de ventas, un UPDATE de resumen por
+    (día, vendedor), uno por (día, producto, vendedor) y uno de los totales
+    de la caja abierta. Devuelve los documentos creados en el mismo orden.
+
+    Lanza StockInsuficiente (y no guarda nada) si alguna línea sobrevende.
+    """
+    preparados = [(validated_data, *calcular_totales(detalles_data))
+                  for validated_data, detalles_data in documentos]
+
+    # 'boleta' o 'factura': nombre de la FK en DetalleVenta
+    campo_documento = modelo._meta.model_name
+
+    with transaction.atomic():
+        descontar_stock(lineas for _, lineas, _ in preparados)
+
+        sesion_id = id_sesion_abierta()
+        creados = modelo.objects.bulk_create([
+            modelo(**{"sesion_id": sesion_id, **validated_data}, **totales)
+            for validated_data, _, totales in preparados
+        ])
+
+        DetalleVenta.objects.bulk_create([
+            DetalleVenta(**{campo_documento: documento}, **linea)
+            for documento, (_, lineas, _) in zip(creados, preparados)
+            for linea in lineas
+        ])
+
+        registrar_en_libro(creados)
+        acumular_resumenes(creados)
+        acumular_en_sesiones(creados)
+        acumular_productos(
+            (documento, lineas) for documento, (_, lineas, _) in zip(creados, preparados)
+        )
+
+    return creados
+
+
+# -----------------------------------------------------------------------------
+# CAJA (SesionCaja con totales acumulados)
+# -----------------------------------------------------------------------------
+def sesion_abierta(queryset=None):
+    """
+    La sesión de caja abierta o None. A lo más hay una (índice único parcial
+    una_caja_abierta): sin ORDER BY (first() ordenaría por pk) la consulta
+    lee sólo ese índice.
+    """
+    queryset = SesionCaja.objects.all() if queryset is None else queryset
+    return next(iter(queryset.filter(fecha_cierre__isnull=True)[:1]), None)
+
+
+def id_sesion_abierta():
+    return sesion_abierta(SesionCaja.objects.values_list("id", flat=True))
+
+
+def acumular_en_sesiones(documentos, signo=1):
+    # Un UPDATE atómico por sesión (normalmente una sola: la abierta)
+    deltas = {}
+    for documento in documentos:
+        if documento.sesion_id is None:
+            continue
+        delta = deltas.setdefault(documento.sesion_id, [0, Decimal(0), Decimal(0), Decimal(0)])
+        delta[0] += 1
+        delta[1] += documento.total_neto
+        delta[2] += documento.total_iva
+        delta[3] += documento.total_final
+
+    for sesion_id, (cantidad, neto, iva, final) in deltas.items():
+        SesionCaja.objects.filter(pk=sesion_id).update(
+            cantidad=F("cantidad") + signo * cantidad,
+            total_neto=F("total_neto") + signo * neto,
+            total_iva=F("total_iva") + signo * iva,
+            total_final=F("total_final") + signo * final,
+        )
+
+
+# -----------------------------------------------------------------------------
+# LIBRO DE VENTAS (Boleta y Factura en una sola tabla)
+# -----------------------------------------------------------------------------
+def fila_libro(documento):
+    tipo = documento._meta.model_name
+    return LibroVenta(
+        tipo=tipo,
+        documento_id=documento.pk,
+        numero=getattr(documento, f"numero_{tipo}"),
+        fecha=documento.fecha,
+        vendedor_id=documento.vendedor_id,
+        total_neto=documento.total_neto,
+        total_iva=documento.total_iva,
+        total_final=documento.total_final,
+    )
+
+
+def registrar_en_libro(documentos):
+    # Debe llamarse dentro de la transacción de la venta
+    LibroVenta.objects.bulk_create([fila_libro(documento) for documento in documentos])
+
+
+# -----------------------------------------------------------------------------
+# STOCK
+# -----------------------------------------------------------------------------
+def cantidad_por_producto(cantidades):
+    # CASE id WHEN ... THEN cantidad: un valor distinto por fila en un solo UPDATE
+    return Case(
+        *[When(pk=producto_id, then=Value(cantidad)) for producto_id, cantidad in sorted(cantidades.items())],
+        output_field=IntegerField(),
+    )
+
+
+def descontar_stock(grupos_de_lineas):
+    """
+    Descuenta el stock de todas las líneas en un solo UPDATE condicional
+    (stock >= cantidad, con un CASE por id de producto), sin leer antes: no
+    se pierden actualizaciones entre terminales. Es todo o nada: si a algún
+    producto no le alcanza no se descuenta ninguno, y sólo en ese caso una
+    segunda consulta busca cuál fue. El conteo de filas es la verificación
+    final (una carrera en otro motor también termina en StockInsuficiente).
+    """
+    cantidades = {}
+    for lineas in grupos_de_lineas:
+        for linea in lineas:
+            producto_id = linea["producto"].pk
+            cantidades[producto_id] = cantidades.get(producto_id, 0) + linea["cantidad"]
+    cantidades = {producto_id: cantidad for producto_id, cantidad in cantidades.items() if cantidad}
+    if not cantidades:
+        return
+
+    pedido = cantidad_por_producto(cantidades)
+    insuficientes = Producto.objects.filter(pk__in=cantidades, stock__lt=pedido)
+    descontados = (
+        Producto.objects
+        .filter(~Exists(insuficientes), pk__in=cantidades, stock__gte=pedido)
+        .update(stock=F("stock") - pedido)
+    )
+    if descontados != len(cantidades):
+        # Sin stock suficiente o producto borrado. La excepción revierte la
+        # transacción completa de la venta
+        faltante = next(iter(insuficientes.order_by("pk").values_list("pk", flat=True)[:1]), min(cantidades))
+        raise StockInsuficiente(faltante, cantidades[faltante])
+
+    # update() no dispara señales; sólo cambió el stock, no el resto del catálogo
+    transaction.on_commit(invalidar_stock)
+
+
+def devolver_stock(lineas):
+    """
+    Repone el stock de las líneas de una venta borrada (cada una con
+    producto_id y cantidad), en un solo UPDATE.
+    """
+    cantidades = {}
+    for linea in lineas:
+        cantidades[linea["producto_id"]] = cantidades.get(linea["producto_id"], 0) + linea["cantidad"]
+    cantidades = {producto_id: cantidad for producto_id, cantidad in cantidades.items() if cantidad}
+    if not cantidades:
+        return
+
+    Producto.objects.filter(pk__in=cantidades).update(stock=F("stock") + cantidad_por_producto(cantidades))
+    transaction.on_commit(invalidar_stock)
+
+
+# -----------------------------------------------------------------------------
+# RESUMEN DIARIO (día, vendedor, tipo)
+# -----------------------------------------------------------------------------
+def acumular_resumen(documento, signo=1):
+    """
+    Suma (signo=1) o resta (signo=-1) un documento en su fila de
+    ResumenVentaDiario. Debe llamarse dentro de la transacción de la venta.
+    """
+    acumular_resumenes([documento], signo)
+
+
+def acumular_resumenes(documentos, signo=1):
+    # Agrupamos en memoria: una sola escritura por fila de resumen afectada
+    deltas = {}
+    for documento in documentos:
+        clave = (timezone.localdate(documento.fecha), documento.vendedor_id, documento._meta.model_name)
+        delta = deltas.setdefault(clave, [0, Decimal(0), Decimal(0), Decimal(0)])
+        delta[0] += 1
+        delta[1] += documento.total_neto
+        delta[2] += documento.total_iva
+        delta[3] += documento.total_final
+
+    # Los reportes cacheados que incluyen estos días ya no valen: ahora y al
+    # confirmar (por si alguien recalculó con los datos de antes del COMMIT)
+    invalidar = cache_reportes.invalidar_hoy
+    if any(dia < timezone.localdate() for dia, _, _ in deltas):
+        invalidar = cache_reportes.limpiar
+    if deltas:
+        invalidar()
+        transaction.on_commit(invalidar)
+
+    for (dia, vendedor_id, tipo), (cantidad, neto, iva, final) in deltas.items():
+        _sumar_en_resumen(ResumenVentaDiario, {"dia": dia, "vendedor_id": vendedor_id, "tipo": tipo}, {
+            "cantidad": signo * cantidad,
+            "total_neto": signo * neto,
+            "total_iva": signo * iva,
+            "total_final": signo * final,
+        })
+
+
+# -----------------------------------------------------------------------------
+# RESUMEN POR PRODUCTO (día, producto, vendedor)
+# -----------------------------------------------------------------------------
+def acumular_productos(documentos_y_lineas, signo=1):
+    """
+    Suma (o resta) unidades e ingresos netos de cada línea en
+    ResumenProductoDiario. Recibe pares (documento, lineas) donde cada línea
+    tiene producto (o producto_id), cantidad y subtotal. Las líneas se
+    agrupan por (día, producto, vendedor) antes de escribir.
+    """
+    deltas = {}
+    for documento, lineas in documentos_y_lineas:
+        dia = timezone.localdate(documento.fecha)
+        for linea in lineas:
+            producto_id = linea["producto"].pk if "producto" in linea else linea["producto_id"]
+            delta = deltas.setdefault((dia, producto_id, documento.vendedor_id), [0, Decimal(0)])
+            delta[0] += linea["cantidad"]
+            delta[1] += linea["subtotal"]
+
+    filas = [(clave, delta) for clave, delta in deltas.items() if delta[0]]
+    if signo > 0 and connection.features.supports_update_conflicts_with_target:
+        # Una venta toca muchos productos: un solo INSERT ... ON CONFLICT
+        # para todos, así la escritura no crece con las líneas
+        _sumar_productos_upsert(filas)
+        return
+
+    for (dia, producto_id, vendedor_id), (cantidad, ingresos) in filas:
+        _sumar_en_resumen(
+            ResumenProductoDiario,
+            {"dia": dia, "producto_id": producto_id, "vendedor_id": vendedor_id},
+            {"cantidad": signo * cantidad, "total_neto": signo * ingresos},
+        )
+
+
+def _sumar_productos_upsert(filas, lote=1000):
+    tabla = connection.ops.quote_name(ResumenProductoDiario._meta.db_table)
+    for inicio in range(0, len(filas), lote):
+        parte = filas[inicio:inicio + lote]
+        sql = (
+            f"INSERT INTO {tabla} (dia, producto_id, vendedor_id, cantidad, total_neto) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(parte))} "
+            "ON CONFLICT (dia, producto_id, vendedor_id) DO UPDATE SET "
+            f"cantidad = {tabla}.cantidad + excluded.cantidad, "
+            f"total_neto = {tabla}.total_neto + excluded.total_neto"
+        )
+        parametros = []
+        for (dia, producto_id, vendedor_id), (cantidad, ingresos) in parte:
+            parametros += [
+                connection.ops.adapt_datefield_value(dia), producto_id, vendedor_id,
+                cantidad, connection.ops.adapt_decimalfield_value(ingresos, 14, 2),
+            ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, parametros)
+
+
+def _sumar_en_resumen(modelo, filtro, deltas):
+    """
+    Aplica `deltas` (campo -> cantidad a sumar) a la fila de `modelo` que
+    cumple `filtro`, creándola si no existe. "cantidad" decide el signo: las
+    filas que llegan a cantidad 0 se borran.
+    """
+    cantidad = deltas["cantidad"]
+    incrementos = {campo: F(campo) + valor for campo, valor in deltas.items()}
+
+    # UPDATE atómico: no hay lectura previa que se pueda perder
+    if modelo.objects.filter(**filtro).update(**incrementos):
+        if cantidad < 0:
+            # Una fila existe sólo si hubo ventas: así sirve de calendario de días con ventas
+            modelo.objects.filter(**filtro, cantidad=0).delete()
+        return
+    if cantidad < 0:
+        return
+
+    try:
+        # Savepoint: si otra transacción creó la fila primero, reintentamos el UPDATE
+        with transaction.atomic():
+            modelo.objects.create(**filtro, **deltas)
+    except IntegrityError:
+        modelo.objects.filter(**filtro).update(**incrementos)
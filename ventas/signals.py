@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .cache import cache_reportes
+from .models import Boleta, Factura, LibroVenta
+from .services import acumular_en_sesiones, acumular_productos, acumular_resumen, devolver_stock, fila_libro
+
+
+# Antes de borrar una venta (sus detalles se borran en cascada) se descuentan
+# sus líneas del resumen por producto y sus unidades vuelven al stock
+@receiver(pre_delete, sender=Boleta)
+@receiver(pre_delete, sender=Factura)
+def descontar_productos_venta_borrada(sender, instance, **kwargs):
+    lineas = list(instance.detalles.values('producto_id', 'cantidad', 'subtotal'))
+    acumular_productos([(instance, lineas)], signo=-1)
+    devolver_stock(lineas)
+
+
+# Al borrar una venta (API, admin o cascada) se descuenta del resumen diario
+# y de su sesión de caja, y sale del libro de ventas
+@receiver(post_delete, sender=Boleta)
+@receiver(post_delete, sender=Factura)
+def descontar_venta_borrada(sender, instance, **kwargs):
+    acumular_resumen(instance, signo=-1)
+    acumular_en_sesiones([instance], signo=-1)
+    LibroVenta.objects.filter(tipo=sender._meta.model_name, documento_id=instance.pk).delete()
+
+
+# registrar_ventas escribe el libro en su bulk_create (sin señales): post_save
+# sólo llega con save() directos (admin, edición por la API)
+@receiver(post_save, sender=Boleta)
+@receiver(post_save, sender=Factura)
+def sincronizar_libro(sender, instance, created, **kwargs):
+    fila = fila_libro(instance)
+    if created:
+        fila.save()
+        return
+    LibroVenta.objects.filter(tipo=fila.tipo, documento_id=fila.documento_id).update(
+        numero=fila.numero,
+        total_neto=fila.total_neto,
+        total_iva=fila.total_iva,
+        total_final=fila.total_final,
+    )
+
+
+# Editar una venta (PATCH/PUT, admin) cambia lo que muestran los reportes
+# guardados (numero y totales de detalle_lista), también los de días
+# cerrados: se descartan todos, ahora y al confirmar
+@receiver(post_save, sender=Boleta)
+@receiver(post_save, sender=Factura)
+def invalidar_reportes_venta_editada(sender, instance, created, **kwargs):
+    if created:
+        return
+    cache_reportes.limpiar()
+    transaction.on_commit(cache_reportes.limpiar)
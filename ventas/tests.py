@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import warnings
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db import connections
+from django.test import AsyncClient, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APITestCase, APITransactionTestCase
+from productos.cache import cache_catalogo
+from productos.models import Producto
+from usuarios.models import User
+from .models import (Boleta, Factura, DetalleVenta, LibroVenta, ResumenProductoDiario, ResumenVentaDiario,
+                     SecuenciaFolio, SesionCaja)
+from .fechas import inicio_del_dia, leer_fecha, rango_dias
+from .folios import AsignadorFolios, asignador
+from .cache import CacheReportes, cache_reportes
+from .reportes import ConsultaReporte
+from .serializers import BoletaSerializer
+from .services import registrar_venta
+from tienda.db import archivo_marca
+from tienda.formato_json import JSONParserRapido, JSONRendererRapido
+from tienda.instrumentacion import histogramas
 
-# Create your tests here.
+
+class CrearVentaTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f"Producto {i}", precio=Decimal('1000.00'), stock=1000)
+            for i in range(40)
+        ])
+
+    def payload_boleta(self, numero, lineas):
+        return {
+            "numero_boleta": numero,
+            "detalles": [
+                {"producto": p.id, "cantidad": 2, "precio_unitario": "1000.00"}
+                for p in self.productos[:lineas]
+            ],
+        }
+
+    def test_boleta_guarda_totales_y_detalles(self):
+        resp = self.client.post('/api/boletas/', self.payload_boleta('B1', 3), format='json')
+
+        self.assertEqual(resp.status_code, 201)
+        boleta = Boleta.objects.get(numero_boleta='B1')
+        self.assertEqual(boleta.total_neto, Decimal('6000.00'))
+        self.assertEqual(boleta.total_iva, Decimal('1140.00'))
+        self.assertEqual(boleta.total_final, Decimal('7140.00'))
+        self.assertEqual(DetalleVenta.objects.filter(boleta=boleta).count(), 3)
+
+    def test_vendedor_numerico_con_token_jwt(self):
+        # Con JWT request.user es un TokenUser, cuyo id viene del claim como texto
+        token = self.client.post('/api/auth/login/', {"username": "vendedor", "password": "x"}).data["access"]
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        resp = self.client.post('/api/boletas/', self.payload_boleta('B1', 1), format='json')
+        self.assertEqual(resp.data["vendedor"], self.vendedor.id)
+        lote = self.client.post('/api/ventas/lote/', {"boletas": [self.payload_boleta('B2', 1)]}, format='json')
+        self.assertEqual(lote.status_code, 201, lote.data)
+        self.assertEqual(Boleta.objects.get(numero_boleta='B2').vendedor_id, self.vendedor.id)
+        self.assertEqual(self.client.get(f'/api/boletas/{resp.data["id"]}/').data["vendedor"], self.vendedor.id)
+
+    def test_escritura_no_crece_con_las_lineas(self):
+        def escrituras(numero, lineas):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post('/api/boletas/', self.payload_boleta(numero, lineas), format='json')
+            return [q for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+
+        escrituras('B0', 1)  # la primera venta del día crea las filas de resumen
+        self.assertEqual(len(escrituras('B1', 1)), len(escrituras('B2', 40)))
+
+    def test_validacion_resuelve_productos_en_una_consulta(self):
+        serializer = BoletaSerializer(data=self.payload_boleta('B1', 40))
+        # Unicidad de numero_boleta + un solo SELECT de productos para las 40 líneas
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['detalles'][39]['producto'], self.productos[39])
+
+        payload = self.payload_boleta('B2', 2)
+        payload['detalles'][1]['producto'] = 999999
+        serializer = BoletaSerializer(data=payload)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('producto', serializer.errors['detalles'][1])
+
+    @override_settings(VENTAS_VALIDAR_PRECIO=True)
+    def test_precio_distinto_al_del_catalogo(self):
+        payload = self.payload_boleta('B1', 2)
+        payload['detalles'][1]['precio_unitario'] = "900.00"
+        resp = self.client.post('/api/boletas/', payload, format='json')
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('precio_unitario', resp.data['detalles'][1])
+        self.assertEqual(self.client.post('/api/boletas/', self.payload_boleta('B2', 2), format='json').status_code, 201)
+
+
+class ListadoVentasTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.productos = Producto.objects.bulk_create([
+            Producto(nombre=f"Producto {i}", precio=Decimal('500.00'), stock=1000)
+            for i in range(5)
+        ])
+        self.folio = 0
+
+    def crear_ventas(self, cantidad):
+        detalles = [
+            {"producto": p, "cantidad": 1, "precio_unitario": p.precio}
+            for p in self.productos
+        ]
+        for _ in range(cantidad):
+            self.folio += 1
+            registrar_venta(Boleta, {"vendedor": self.vendedor, "numero_boleta": f"B{self.folio}"}, detalles)
+            registrar_venta(Factura, {
+                "vendedor": self.vendedor, "numero_factura": f"F{self.folio}",
+                "rut_cliente": "11111111-1", "razon_social": "Cliente", "giro": "Giro", "direccion": "Calle 1",
+            }, detalles)
+
+    def consultas_listado(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_consultas_constantes_al_listar(self):
+        for url in ('/api/boletas/', '/api/facturas/'):
+            for params, esperadas in ((None, 1), ({"expand": "detalles"}, 2)):
+                with self.subTest(url=url, params=params):
+                    self.crear_ventas(2)
+                    pocas = self.consultas_listado(url, params)
+                    self.crear_ventas(20)
+                    muchas = self.consultas_listado(url, params)
+                    self.assertEqual(pocas, muchas)
+                    self.assertEqual(muchas, esperadas)
+
+    def test_listado_liviano_y_expandido(self):
+        self.crear_ventas(1)
+        boleta = self.client.get('/api/boletas/').json()[0]
+        self.assertNotIn("detalles", boleta)
+        self.assertIn("total_final", boleta)
+
+        expandida = self.client.get('/api/boletas/', {"expand": "detalles"}).json()[0]
+        self.assertEqual(len(expandida["detalles"]), 5)
+
+        # El detalle de una venta trae siempre sus líneas
+        detalle = self.client.get(f'/api/boletas/{boleta["id"]}/').json()
+        self.assertEqual(len(detalle["detalles"]), 5)
+
+    def test_fields_limita_campos_y_columnas(self):
+        self.crear_ventas(1)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/facturas/', {"fields": "id,numero_factura,total_final"})
+        self.assertEqual(list(resp.json()[0]), ["id", "numero_factura", "total_final"])
+        sql = ctx.captured_queries[0]['sql']
+        self.assertIn('"numero_factura"', sql)
+        self.assertNotIn('"razon_social"', sql)
+
+        resp = self.client.get('/api/facturas/', {"fields": "id,no_existe"})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("fields", resp.json())
+
+    def test_fields_con_una_relacion_la_expande(self):
+        self.crear_ventas(1)
+        self.assertEqual(self.consultas_listado('/api/boletas/', {"fields": "id,detalles"}), 2)
+
+        boleta = self.client.get('/api/boletas/', {"fields": "id,detalles"}).json()[0]
+        self.assertEqual(list(boleta), ["id", "detalles"])
+        self.assertEqual(len(boleta["detalles"]), 5)
+
+
+class ResumenVentaDiarioTests(APITestCase):
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.jefe)
+        self.producto = Producto.objects.create(nombre="Producto", precio=Decimal('1000.00'), stock=1000)
+        self.detalles = [{"producto": self.producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}]
+
+    def vender(self, numero):
+        return registrar_venta(Boleta, {"vendedor": self.vendedor, "numero_boleta": numero}, self.detalles)
+
+    def filas_resumen(self):
+        return list(ResumenVentaDiario.objects.order_by('dia', 'vendedor_id', 'tipo').values(
+            'dia', 'vendedor_id', 'tipo', 'cantidad', 'total_neto', 'total_iva', 'total_final'))
+
+    def test_reporte_lee_el_resumen(self):
+        self.vender('B1')
+        self.vender('B2')
+
+        resp = self.client.get('/api/reporte-ventas/', {'vendedor_id': self.vendedor.id})
+
+        resumen = resp.data['resumen_boletas']
+        self.assertEqual(resumen['cantidad_boletas'], 2)
+        self.assertEqual(resumen['suma_total'], Decimal('2380.00'))
+        self.assertEqual(resp.data['facturas']['resumen']['cantidad_facturas'], 0)
+
+    def test_borrar_venta_descuenta_del_resumen(self):
+        self.vender('B1')
+        self.vender('B2').delete()
+
+        fila = ResumenVentaDiario.objects.get()
+        self.assertEqual(fila.cantidad, 1)
+        self.assertEqual(fila.total_neto, Decimal('1000.00'))
+
+    def test_reconstruir_coincide_con_incremental(self):
+        self.vender('B1')
+        self.vender('B2')
+        incremental = self.filas_resumen()
+
+        call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+
+        self.assertEqual(self.filas_resumen(), incremental)
+
+
+class OpcionesFiltroTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.otro = User.objects.create_user(username='otro', password='x', role='vendedor')
+        self.client.force_authenticate(self.jefe)
+        producto = Producto.objects.create(nombre="Producto", precio=Decimal('1000.00'), stock=1000)
+        self.detalles = [{"producto": producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}]
+
+    def vender(self, vendedor, numero, hace_dias=0):
+        boleta = registrar_venta(Boleta, {"vendedor": vendedor, "numero_boleta": numero}, self.detalles)
+        if hace_dias:
+            # Movemos la venta a un día anterior y reconstruimos el resumen
+            Boleta.objects.filter(pk=boleta.pk).update(fecha=boleta.fecha - timedelta(days=hace_dias))
+            call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+        return boleta
+
+    def test_dias_disponibles_por_vendedor(self):
+        self.vender(self.vendedor, 'B1', hace_dias=3)
+        self.vender(self.otro, 'B2')
+        self.vender(self.vendedor, 'B3')
+
+        todos = self.client.get('/api/filtros-reporte/').data['dias_disponibles']
+        del_vendedor = self.client.get(
+            '/api/filtros-reporte/', {'vendedor_id': self.vendedor.id}).data['dias_disponibles']
+        del_otro = self.client.get(
+            '/api/filtros-reporte/', {'vendedor_id': self.otro.id}).data['dias_disponibles']
+
+        self.assertEqual(len(todos), 2)
+        self.assertEqual(todos, sorted(todos))
+        self.assertEqual(del_vendedor, todos)
+        self.assertEqual(len(del_otro), 1)
+
+    def test_dia_sin_ventas_desaparece_al_borrar(self):
+        self.vender(self.vendedor, 'B1').delete()
+
+        resp = self.client.get('/api/filtros-reporte/')
+
+        self.assertEqual(resp.data['dias_disponibles'], [])
+
+    def test_vendedores_cacheados_e_invalidados(self):
+        self.client.get('/api/filtros-reporte/')
+        with self.assertNumQueries(1):  # sólo el calendario
+            self.client.get('/api/filtros-reporte/')
+
+        User.objects.create_user(username='nuevo', password='x', role='vendedor')
+        nombres = [v['username'] for v in self.client.get('/api/filtros-reporte/').data['vendedores']]
+
+        self.assertIn('nuevo', nombres)
+
+    def test_login_no_invalida_los_vendedores(self):
+        self.client.get('/api/filtros-reporte/')
+        update_last_login(None, self.vendedor)  # lo que guarda cada login
+
+        with self.assertNumQueries(1):  # sólo el calendario
+            self.client.get('/api/filtros-reporte/')
+
+
+class FiltroFechaTests(APITestCase):
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.client.force_authenticate(self.jefe)
+
+    def test_fecha_invalida_responde_400(self):
+        resp = self.client.get('/api/reporte-ventas/', {'fecha': '2025-13-45'})
+
+        self.assertEqual(resp.status_code, 400)
+
+    def test_rango_respeta_time_zone(self):
+        with override_settings(TIME_ZONE='America/Santiago'):
+            inicio, fin = rango_dias(leer_fecha('2025-07-01'))
+
+        self.assertEqual(inicio.isoformat(), '2025-07-01T00:00:00-04:00')
+        self.assertEqual(fin - inicio, timedelta(days=1))
+
+
+class ExportarReporteTests(APITestCase):
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.client.force_authenticate(self.jefe)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        detalles = [{"producto": self.producto, "cantidad": 2, "precio_unitario": Decimal('1000.00')}]
+        registrar_venta(Boleta, {"vendedor": self.jefe, "numero_boleta": "B1"}, detalles)
+        registrar_venta(Factura, {
+            "vendedor": self.jefe, "numero_factura": "F1",
+            "rut_cliente": "11111111-1", "razon_social": "Cliente", "giro": "Giro", "direccion": "Calle 1",
+        }, detalles)
+
+    def exportar(self, formato):
+        resp = self.client.get('/api/reporte-ventas/', {'exportar': formato})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return b''.join(resp.streaming_content).decode()
+
+    def test_csv_incluye_documentos_y_detalles(self):
+        filas = list(csv.DictReader(io.StringIO(self.exportar('csv'))))
+
+        self.assertEqual(
+            [(f['registro'], f['tipo'], f['numero']) for f in filas],
+            [('documento', 'boleta', 'B1'), ('detalle', 'boleta', 'B1'),
+             ('documento', 'factura', 'F1'), ('detalle', 'factura', 'F1')],
+        )
+        self.assertEqual(filas[1]['nombre_producto'], 'Arroz')
+        self.assertEqual(filas[2]['total_final'], '2380.00')
+
+    def test_ndjson_una_fila_por_linea(self):
+        filas = [json.loads(linea) for linea in self.exportar('ndjson').splitlines()]
+
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[2]['razon_social'], 'Cliente')
+        self.assertEqual(filas[3]['subtotal'], '2000.00')
+
+    def test_formato_desconocido_responde_400(self):
+        resp = self.client.get('/api/reporte-ventas/', {'exportar': 'xlsx'})
+
+        self.assertEqual(resp.status_code, 400)
+
+
+class SerieReporteTests(APITestCase):
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.otro = User.objects.create_user(username='otro', password='x', role='vendedor')
+        self.client.force_authenticate(self.jefe)
+        producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        self.detalles = [{"producto": producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}]
+
+        # 3 boletas en días distintos (2 en la misma semana ISO) y 1 factura
+        for numero, vendedor, dia in (('B1', self.jefe, '2025-03-03'), ('B2', self.jefe, '2025-03-05'),
+                                      ('B3', self.otro, '2025-04-10')):
+            self.vender(Boleta, {"numero_boleta": numero}, vendedor, dia)
+        self.vender(Factura, {
+            "numero_factura": "F1", "rut_cliente": "11111111-1", "razon_social": "Cliente",
+            "giro": "Giro", "direccion": "Calle 1",
+        }, self.jefe, '2025-03-04')
+        call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+
+    def vender(self, modelo, datos, vendedor, dia):
+        documento = registrar_venta(modelo, {"vendedor": vendedor, **datos}, self.detalles)
+        modelo.objects.filter(pk=documento.pk).update(fecha=inicio_del_dia(leer_fecha(dia)) + timedelta(hours=12))
+
+    def reporte(self, **params):
+        resp = self.client.get('/api/reporte-ventas/', params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_rango_desde_hasta(self):
+        data = self.reporte(desde='2025-03-04', hasta='2025-03-31')
+
+        self.assertEqual(data['resumen_boletas']['cantidad_boletas'], 1)
+        self.assertEqual(data['facturas']['resumen']['cantidad_facturas'], 1)
+
+    def test_serie_por_semana_y_mes(self):
+        semanas = self.reporte(group_by='week')['serie']
+        meses = self.reporte(group_by='month')['serie']
+
+        self.assertEqual([p['boletas']['cantidad'] for p in semanas], [2, 1])
+        self.assertEqual([p['facturas']['cantidad'] for p in semanas], [1, 0])
+        self.assertEqual([str(p['periodo']) for p in meses], ['2025-03-01', '2025-04-01'])
+
+    def test_serie_por_vendedor(self):
+        serie = self.reporte(group_by='vendedor', desde='2025-03-01')['serie']
+
+        self.assertEqual({p['vendedor_id']: p['boletas']['cantidad'] for p in serie},
+                         {self.jefe.id: 2, self.otro.id: 1})
+
+    def test_serie_es_una_consulta(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.reporte(group_by='day', desde='2025-01-01', hasta='2025-12-31')
+
+        agrupadas = [q for q in ctx.captured_queries if 'GROUP BY' in q['sql']]
+        self.assertEqual(len(agrupadas), 1)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/reporte-ventas/', {'group_by': 'hora'}).status_code, 400)
+        self.assertEqual(self.client.get(
+            '/api/reporte-ventas/', {'desde': '2025-05-01', 'hasta': '2025-04-01'}).status_code, 400)
+
+
+class VentasLoteTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+
+    def boleta(self, numero, cantidad=1):
+        return {"numero_boleta": numero, "detalles": [
+            {"producto": self.producto.id, "cantidad": cantidad, "precio_unitario": "1000.00"}]}
+
+    def test_documentos_validos_se_guardan_aunque_haya_errores(self):
+        registrar_venta(Boleta, {"vendedor": self.vendedor, "numero_boleta": "B0"},
+                        [{"producto": self.producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}])
+        payload = {
+            "boletas": [self.boleta("B1"), self.boleta("B0"), {"numero_boleta": "B2", "detalles": "x"},
+                        self.boleta("B1"), self.boleta("B3", cantidad=3)],
+            "facturas": [{
+                "numero_factura": "F1", "rut_cliente": "11111111-1", "razon_social": "Cliente",
+                "giro": "Giro", "direccion": "Calle 1",
+                "detalles": [{"producto": self.producto.id, "cantidad": 2, "precio_unitario": "1000.00"}],
+            }],
+        }
+
+        resp = self.client.post('/api/ventas/lote/', payload, format='json')
+
+        self.assertEqual(resp.status_code, 207)
+        self.assertEqual([r['estado'] for r in resp.data['boletas']],
+                         ['creado', 'error', 'error', 'error', 'creado'])
+        self.assertEqual(resp.data['facturas'][0]['estado'], 'creado')
+        self.assertEqual(set(Boleta.objects.values_list('numero_boleta', flat=True)), {'B0', 'B1', 'B3'})
+        self.assertEqual(Boleta.objects.get(numero_boleta='B3').total_neto, Decimal('3000.00'))
+
+        fila = ResumenVentaDiario.objects.get(tipo='boleta')
+        self.assertEqual(fila.cantidad, 3)
+        self.assertEqual(fila.total_neto, Decimal('5000.00'))
+
+    def test_lote_completo_responde_201(self):
+        resp = self.client.post('/api/ventas/lote/', {"boletas": [self.boleta(f"B{i}") for i in range(20)]},
+                                format='json')
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Boleta.objects.count(), 20)
+        self.assertEqual(DetalleVenta.objects.count(), 20)
+
+    def test_cuerpo_mal_formado_responde_400(self):
+        for payload in ([self.boleta("B1")], {"boletas": 5}, {"boletas": [self.boleta("B1")], "facturas": "x"}):
+            with self.subTest(payload=payload):
+                resp = self.client.post('/api/ventas/lote/', payload, format='json')
+                self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Boleta.objects.exists())
+
+
+class VentasLoteIntegridadTests(APITransactionTestCase):
+    # SQLite revisa las FK al confirmar: hace falta un COMMIT real
+    def test_restriccion_que_no_es_numero_repetido(self):
+        vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        self.client.force_authenticate(vendedor)
+        User.objects.filter(pk=vendedor.pk).delete()  # el vendedor_id ya no existe: falla la FK
+
+        resp = self.client.post('/api/ventas/lote/', {"boletas": [{"numero_boleta": "B1", "detalles": [
+            {"producto": producto.id, "cantidad": 1, "precio_unitario": "1000.00"}]}]}, format='json')
+
+        self.assertEqual(resp.status_code, 207)
+        self.assertEqual(list(resp.data['boletas'][0]['errores']), ["non_field_errors"])
+        self.assertFalse(Boleta.objects.exists())
+
+
+class FoliosTests(APITestCase):
+    def setUp(self):
+        asignador.reiniciar()
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+
+    def vender(self, **extra):
+        payload = {"detalles": [{"producto": self.producto.id, "cantidad": 1, "precio_unitario": "1000.00"}], **extra}
+        resp = self.client.post('/api/boletas/', payload, format='json', **self.cabeceras)
+        self.assertEqual(resp.status_code, 201)
+        return resp.data['numero_boleta']
+
+    cabeceras = {}
+
+    def test_asigna_folio_despues_del_mayor_existente(self):
+        self.vender(numero_boleta="41")
+        self.vender(numero_boleta="B-99")  # otro formato: no cuenta
+
+        self.assertEqual([self.vender(), self.vender(), self.vender()], ["42", "43", "44"])
+
+    def test_salta_folios_que_un_cliente_ya_uso(self):
+        self.assertEqual(self.vender(), "1")  # reserva el bloque 1..20 en memoria
+        self.vender(numero_boleta="2")
+        self.vender(numero_boleta="3")
+
+        self.assertEqual(self.vender(), "4")
+        self.vender(numero_boleta="5")
+        lote = self.client.post('/api/ventas/lote/', {"boletas": [
+            {"detalles": [{"producto": self.producto.id, "cantidad": 1, "precio_unitario": "1000.00"}]},
+        ]}, format='json')
+        self.assertEqual(lote.status_code, 201)
+        self.assertEqual(Boleta.objects.get(pk=lote.data['boletas'][0]['id']).numero_boleta, "6")
+
+    @override_settings(FOLIOS_POR_TERMINAL=True)
+    def test_serie_por_terminal(self):
+        self.cabeceras = {"HTTP_X_TERMINAL": "T1"}
+        self.assertEqual([self.vender(), self.vender()], ["T1-1", "T1-2"])
+        self.cabeceras = {"HTTP_X_TERMINAL": "T2"}
+        self.assertEqual(self.vender(), "T2-1")
+
+    def test_un_viaje_a_la_bd_por_bloque(self):
+        local = AsignadorFolios(tamano_bloque=10)
+        folios = [local.siguiente('factura') for _ in range(25)]
+
+        self.assertEqual(len(set(folios)), 25)
+        self.assertEqual(local.reservas, 3)
+        self.assertEqual(SecuenciaFolio.objects.get(tipo='factura').siguiente, 31)
+
+
+class FoliosConcurrentesTests(APITransactionTestCase):
+    def test_workers_concurrentes_no_repiten_folios(self):
+        # Cada hilo simula un worker con su asignador (bloques en memoria) y
+        # su propia conexión, como benchmark_folios
+        workers = [AsignadorFolios(tamano_bloque=7) for _ in range(4)]
+        folios, errores = [], []
+        arranque = threading.Barrier(len(workers))
+
+        def trabajar(asignador):
+            try:
+                arranque.wait()
+                folios.extend(asignador.siguiente('boleta') for _ in range(50))
+            except Exception as exc:
+                errores.append(repr(exc))
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(w,)) for w in workers]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(folios), 200)
+        self.assertEqual(len(set(folios)), 200)
+        # 50 folios por worker en bloques de 7: 8 reservas cada uno, no 50
+        self.assertEqual([w.reservas for w in workers], [8, 8, 8, 8])
+        self.assertEqual(SecuenciaFolio.objects.get(tipo='boleta').siguiente, 1 + 4 * 8 * 7)
+
+
+class StockTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.arroz = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=5)
+        self.azucar = Producto.objects.create(nombre="Azúcar", precio=Decimal('900.00'), stock=5)
+
+    def vender(self, numero, *lineas):
+        return self.client.post('/api/boletas/', {"numero_boleta": numero, "detalles": [
+            {"producto": p.id, "cantidad": c, "precio_unitario": str(p.precio)} for p, c in lineas
+        ]}, format='json')
+
+    def test_descuenta_stock_de_todas_las_lineas(self):
+        resp = self.vender('B1', (self.arroz, 2), (self.azucar, 1), (self.arroz, 1))
+
+        self.assertEqual(resp.status_code, 201)
+        self.arroz.refresh_from_db()
+        self.azucar.refresh_from_db()
+        self.assertEqual((self.arroz.stock, self.azucar.stock), (2, 4))
+
+    def test_sobreventa_rechaza_la_venta_completa(self):
+        resp = self.vender('B1', (self.azucar, 1), (self.arroz, 6))
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('detalles', resp.data)
+        self.assertFalse(Boleta.objects.exists())
+        self.azucar.refresh_from_db()
+        self.assertEqual(self.azucar.stock, 5)
+
+    def test_borrar_la_venta_repone_el_stock(self):
+        self.vender('B1', (self.arroz, 2), (self.azucar, 1), (self.arroz, 1))
+        self.vender('B2', (self.arroz, 1))
+        etag = self.client.get('/api/productos/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Boleta.objects.filter(numero_boleta='B1').delete()
+
+        self.arroz.refresh_from_db()
+        self.azucar.refresh_from_db()
+        self.assertEqual((self.arroz.stock, self.azucar.stock), (4, 5))
+        resp = self.client.get('/api/productos/')
+        self.assertNotEqual(resp['ETag'], etag)
+        self.assertEqual({p["nombre"]: p["stock"] for p in resp.json()}, {"Arroz": 4, "Azúcar": 5})
+
+    def test_lote_aisla_el_documento_que_sobrevende(self):
+        boleta = lambda numero, cantidad: {"numero_boleta": numero, "detalles": [
+            {"producto": self.arroz.id, "cantidad": cantidad, "precio_unitario": "1000.00"}]}
+
+        resp = self.client.post('/api/ventas/lote/', {"boletas": [
+            boleta('B1', 3), boleta('B2', 3), boleta('B3', 2)]}, format='json')
+
+        self.assertEqual([r['estado'] for r in resp.data['boletas']], ['creado', 'error', 'creado'])
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.stock, 0)
+
+    def test_venta_actualiza_el_stock_sin_invalidar_el_catalogo(self):
+        cache_catalogo().clear()
+        etag = self.client.get('/api/productos/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vender('B1', (self.arroz, 2))
+
+        # Respuesta guardada + una consulta de (id, stock), sin volver a serializar
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get('/api/productos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual({p['id']: p['stock'] for p in resp.data}, {self.arroz.id: 3, self.azucar.id: 5})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/productos/').data, resp.data)
+
+    def test_pruebas_no_usan_la_cache_en_archivo(self):
+        self.assertIsInstance(cache_catalogo(), LocMemCache)
+
+
+class ReplicaRouterTests(APITransactionTestCase):
+    databases = {'default', 'reporting'}
+
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.client.force_authenticate(self.jefe)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        registrar_venta(Boleta, {"vendedor": self.jefe, "numero_boleta": "B1"},
+                        [{"producto": self.producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}])
+
+    def consultas_por_alias(self, metodo, url, datos=None):
+        with CaptureQueriesContext(connections['default']) as primario, \
+                CaptureQueriesContext(connections['reporting']) as replica:
+            resp = getattr(self.client, metodo)(url, datos, format='json')
+        return resp, len(primario.captured_queries), len(replica.captured_queries)
+
+    def test_reportes_y_listados_leen_de_la_replica(self):
+        for url in ('/api/reporte-ventas/', '/api/filtros-reporte/', '/api/boletas/'):
+            with self.subTest(url=url):
+                resp, primario, replica = self.consultas_por_alias('get', url)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(primario, 0)
+                self.assertGreater(replica, 0)
+
+    def test_request_que_escribe_lee_sus_escrituras_del_primario(self):
+        resp, primario, replica = self.consultas_por_alias('post', '/api/boletas/', {
+            "numero_boleta": "B2",
+            "detalles": [{"producto": self.producto.id, "cantidad": 1, "precio_unitario": "1000.00"}],
+        })
+
+        self.assertEqual(resp.status_code, 201)
+        self.assertGreater(primario, 0)
+        self.assertEqual(replica, 0)
+
+    def test_fuera_de_un_request_todo_va_al_primario(self):
+        with CaptureQueriesContext(connections['reporting']) as replica:
+            Boleta.objects.count()
+
+        self.assertEqual(len(replica.captured_queries), 0)
+
+
+class ModoWALTests(APITestCase):
+    def test_migrate_activa_wal_y_conectar_no_toca_el_archivo(self):
+        # La BD de pruebas pasó por migrate: ya está en WAL
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+        # Una BD existente en modo clásico (como db.sqlite3) no cambia al conectarse
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        ruta = os.path.join(directorio, 'existente.sqlite3')
+        with sqlite3.connect(ruta) as crear:
+            crear.execute('CREATE TABLE t (x)')
+        with open(ruta, 'rb') as archivo:
+            cabecera = archivo.read(100)
+
+        otra = connections['default'].__class__({**connection.settings_dict, 'NAME': ruta}, alias='existente')
+        try:
+            with otra.cursor() as cursor:
+                cursor.execute('SELECT count(*) FROM t')
+        finally:
+            otra.close()
+        with open(ruta, 'rb') as archivo:
+            self.assertEqual(archivo.read(100), cabecera)
+
+
+class ReportesAsyncTests(APITransactionTestCase):
+    # Las consultas corren en otros hilos/conexiones: los datos deben estar confirmados
+    databases = {'default', 'reporting'}
+
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        for modelo, campo, numero in ((Boleta, 'numero_boleta', 'B1'), (Factura, 'numero_factura', 'F1'),
+                                      (Factura, 'numero_factura', 'F2')):
+            registrar_venta(modelo, {"vendedor": self.vendedor, campo: numero},
+                            [{"producto": producto, "cantidad": 2, "precio_unitario": Decimal('1000.00')}])
+
+    def test_misma_respuesta_que_la_vista_sincrona(self):
+        for url in ('/api/reporte-ventas/', '/api/reporte-ventas/?group_by=vendedor',
+                    f'/api/reporte-ventas/?vendedor_id={self.vendedor.id}',
+                    '/api/filtros-reporte/'):
+            with self.subTest(url=url):
+                sincrona = self.client.get(url)
+                asincrona = self.client.get(url.replace('/?', '/async/?') if '?' in url else url + 'async/')
+                self.assertEqual(asincrona.status_code, 200)
+                self.assertEqual(asincrona.content, sincrona.content)
+
+    async def test_exportacion_en_streaming_async(self):
+        sincrona = await sync_to_async(self.client.get)('/api/reporte-ventas/?exportar=csv')
+        esperado = await sync_to_async(b''.join)(sincrona.streaming_content)
+
+        with warnings.catch_warnings():
+            # "StreamingHttpResponse must consume synchronous iterators...": lo leería entero
+            warnings.simplefilter('error')
+            resp = await AsyncClient().get('/api/reporte-ventas/async/?exportar=csv')
+            self.assertTrue(resp.is_async)
+            contenido = b''.join([bloque async for bloque in resp])  # como lo consume el handler ASGI
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(contenido, esperado)
+        self.assertEqual(contenido.count(b'\r\n'), 1 + 3 + 3)  # cabecera, documentos y líneas
+
+    def test_parametros_invalidos_y_token_invalido(self):
+        resp = self.client.get('/api/reporte-ventas/async/?group_by=anio')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("group_by", resp.json())
+
+        resp = self.client.get('/api/reporte-ventas/async/', HTTP_AUTHORIZATION='Bearer no-es-un-token')
+        self.assertEqual(resp.status_code, 401)
+
+
+class LibroVentasTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        linea = [{"producto": producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}]
+        for i in range(3):
+            registrar_venta(Boleta, {"vendedor": self.vendedor, "numero_boleta": f"B{i}"}, linea)
+        for i in range(2):
+            registrar_venta(Factura, {"vendedor": self.vendedor, "numero_factura": f"F{i}",
+                                      "rut_cliente": "1-9", "razon_social": "X", "giro": "X", "direccion": "X"}, linea)
+
+    def test_paginacion_keyset_recorre_ambos_tipos(self):
+        # Misma fecha para todas: el id desempata
+        LibroVenta.objects.update(fecha=LibroVenta.objects.first().fecha)
+        vistos = []
+        url = '/api/libro-ventas/?limite=2'
+        while url:
+            with self.assertNumQueries(1):
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            vistos.extend(fila["id"] for fila in resp.data["resultados"])
+            url = resp.data["siguiente"]
+
+        self.assertEqual(vistos, list(LibroVenta.objects.order_by('-fecha', '-id').values_list('id', flat=True)))
+        self.assertEqual(len(vistos), 5)
+
+    def test_totales_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/libro-ventas/totales/')
+
+        self.assertEqual(resp.data["boleta"]["cantidad"], 3)
+        self.assertEqual(resp.data["factura"]["cantidad"], 2)
+        self.assertEqual(resp.data["total"]["suma_total"], Decimal('5950.00'))
+
+        resp = self.client.get('/api/libro-ventas/totales/?tipo=factura')
+        self.assertEqual(resp.data["boleta"]["cantidad"], 0)
+        self.assertEqual(resp.data["total"]["cantidad"], 2)
+
+    def test_borrar_o_editar_documento_actualiza_el_libro(self):
+        boleta = Boleta.objects.get(numero_boleta='B0')
+        boleta.numero_boleta = 'B100'
+        boleta.save()
+        self.assertTrue(LibroVenta.objects.filter(tipo='boleta', numero='B100').exists())
+
+        boleta.delete()
+        self.assertFalse(LibroVenta.objects.filter(tipo='boleta', documento_id=boleta.id).exists())
+        self.assertEqual(LibroVenta.objects.count(), 4)
+
+    def test_cursor_invalido_responde_400(self):
+        self.assertEqual(self.client.get('/api/libro-ventas/?cursor=xyz').status_code, 400)
+
+
+class RankingProductosTests(APITestCase):
+    def setUp(self):
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.jefe)
+        self.arroz, self.te, self.sal = Producto.objects.bulk_create([
+            Producto(nombre=nombre, precio=Decimal('1000.00'), stock=1000) for nombre in ("Arroz", "Té", "Sal")
+        ])
+        # Arroz: 5 u. / 5000; Té: 1 u. / 3000; Sal: 2 u. / 2000
+        self.vender(self.jefe, "B1", [(self.arroz, 3, '1000.00'), (self.te, 1, '3000.00')])
+        self.vender(self.vendedor, "B2", [(self.arroz, 2, '1000.00'), (self.sal, 2, '1000.00')])
+
+    def vender(self, vendedor, numero, lineas):
+        return registrar_venta(Boleta, {"vendedor": vendedor, "numero_boleta": numero}, [
+            {"producto": producto, "cantidad": cantidad, "precio_unitario": Decimal(precio)}
+            for producto, cantidad, precio in lineas
+        ])
+
+    def test_top_por_ingresos_y_unidades(self):
+        resp = self.client.get('/api/analitica/productos/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["totales"], {"unidades": 8, "ingresos": Decimal('10000.00')})
+        self.assertEqual([p["nombre"] for p in resp.data["productos"]], ["Arroz", "Té", "Sal"])
+        self.assertEqual(resp.data["productos"][0]["participacion"], Decimal('50.00'))
+
+        resp = self.client.get('/api/analitica/productos/?orden=unidades&limite=2')
+        self.assertEqual([p["nombre"] for p in resp.data["productos"]], ["Arroz", "Sal"])
+
+        resp = self.client.get(f'/api/analitica/productos/?vendedor_id={self.vendedor.id}')
+        self.assertEqual([(p["nombre"], p["unidades"]) for p in resp.data["productos"]], [("Arroz", 2), ("Sal", 2)])
+
+    def test_tendencia_en_consultas_fijas(self):
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/analitica/productos/?group_by=day')
+        hoy = timezone.localdate()
+        self.assertEqual(resp.data["productos"][0]["tendencia"],
+                         [{"periodo": hoy, "unidades": 5, "ingresos": Decimal('5000.00')}])
+
+    def test_borrar_venta_y_reconstruir_coinciden(self):
+        self.vender(self.jefe, "B3", [(self.te, 4, '1000.00')])
+        Boleta.objects.get(numero_boleta="B1").delete()
+        incremental = set(ResumenProductoDiario.objects.values_list('producto_id', 'vendedor_id', 'cantidad', 'total_neto'))
+
+        call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+        reconstruido = set(ResumenProductoDiario.objects.values_list('producto_id', 'vendedor_id', 'cantidad', 'total_neto'))
+        self.assertEqual(incremental, reconstruido)
+        self.assertIn((self.te.id, self.jefe.id, 4, Decimal('4000.00')), reconstruido)
+
+    def test_solo_jefe_de_venta_y_parametros(self):
+        self.assertEqual(self.client.get('/api/analitica/productos/?orden=precio').status_code, 400)
+        self.assertEqual(self.client.get('/api/analitica/productos/?limite=0').status_code, 400)
+        self.client.force_authenticate(self.vendedor)
+        self.assertEqual(self.client.get('/api/analitica/productos/').status_code, 403)
+
+
+class SesionCajaTests(APITestCase):
+    def setUp(self):
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(self.vendedor)
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+
+    def vender(self, numero):
+        return self.client.post('/api/boletas/', {
+            "numero_boleta": numero,
+            "detalles": [{"producto": self.producto.id, "cantidad": 1, "precio_unitario": "1000.00"}],
+        }, format='json')
+
+    def test_ventas_acumulan_en_la_sesion_abierta(self):
+        self.assertIsNone(self.vender('B0').data["sesion"])
+        sesion_id = self.client.post('/api/caja/abrir/').data["sesion"]["id"]
+        self.assertEqual(self.vender('B1').data["sesion"], sesion_id)
+        self.vender('B2')
+
+        with self.assertNumQueries(1):
+            estado = self.client.get('/api/caja/estado/').data
+        self.assertTrue(estado["caja_abierta"])
+        self.assertEqual(estado["sesion"]["cantidad"], 2)
+        self.assertEqual(Decimal(estado["sesion"]["total_final"]), Decimal('2380.00'))
+
+        Boleta.objects.get(numero_boleta='B2').delete()
+        resp = self.client.post('/api/caja/cerrar/')
+        self.assertEqual(resp.data["sesion"]["cantidad"], 1)
+        self.assertEqual(Decimal(resp.data["sesion"]["total_final"]), Decimal('1190.00'))
+        self.assertFalse(self.client.get('/api/caja/estado/').data["caja_abierta"])
+
+    def test_una_sola_sesion_abierta(self):
+        self.assertEqual(self.client.post('/api/caja/abrir/').status_code, 201)
+        self.assertEqual(self.client.post('/api/caja/abrir/').status_code, 400)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SesionCaja.objects.create()
+
+        self.client.post('/api/caja/cerrar/')
+        self.assertEqual(self.client.post('/api/caja/abrir/').status_code, 201)
+        self.assertEqual(SesionCaja.objects.filter(fecha_cierre__isnull=True).count(), 1)
+
+
+class CacheReportesTests(APITestCase):
+    def setUp(self):
+        cache_reportes.reiniciar()
+        self.vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        self.folio = 0
+
+    def vender(self):
+        self.folio += 1
+        return registrar_venta(Boleta, {"vendedor": self.vendedor, "numero_boleta": f"B{self.folio}"},
+                               [{"producto": self.producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}])
+
+    def test_dia_cerrado_se_sirve_desde_la_cache(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        boleta = self.vender()
+        Boleta.objects.filter(pk=boleta.pk).update(fecha=inicio_del_dia(ayer) + timedelta(hours=12))
+        call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+        url = f'/api/reporte-ventas/?fecha={ayer.isoformat()}'
+
+        primera = self.client.get(url)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url)
+
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda.data["resumen_boletas"]["cantidad_boletas"], 1)
+        self.assertEqual(cache_reportes.estadisticas()["aciertos"], 1)
+
+    def test_editar_una_factura_invalida_los_dias_cerrados(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        factura = registrar_venta(Factura, {"vendedor": self.vendedor, "numero_factura": "F1", "rut_cliente": "1-9",
+                                            "razon_social": "X", "giro": "X", "direccion": "X"},
+                                  [{"producto": self.producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}])
+        Factura.objects.filter(pk=factura.pk).update(fecha=inicio_del_dia(ayer) + timedelta(hours=12))
+        call_command('reconstruir_resumen_ventas', stdout=io.StringIO())
+        url = f'/api/reporte-ventas/?fecha={ayer.isoformat()}'
+        self.assertEqual(self.client.get(url).data["facturas"]["detalle_lista"][0]["numero_factura"], "F1")
+
+        self.client.force_authenticate(User.objects.create_user(username='jefe', password='x', role='jefe venta'))
+        resp = self.client.patch(f'/api/facturas/{factura.pk}/', {"numero_factura": "F9"}, format='json')
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.client.get(url).data["facturas"]["detalle_lista"][0]["numero_factura"], "F9")
+
+    def test_editar_en_otro_worker_invalida_los_dias_cerrados(self):
+        otro_worker = CacheReportes()
+        self.assertEqual(otro_worker.obtener('dia-cerrado', lambda: 'antes', True), 'antes')
+
+        cache_reportes.limpiar()  # este worker editó una venta
+
+        self.assertEqual(otro_worker.obtener('dia-cerrado', lambda: 'despues', True), 'despues')
+
+    def test_replica_atrasada_no_se_guarda_para_siempre(self):
+        hace_una_semana = timezone.localdate() - timedelta(days=7)
+        consulta = ConsultaReporte({"fecha": hace_una_semana.isoformat()})
+        consulta.qs_resumen = consulta.qs_resumen.using('reporting')
+        self.assertTrue(consulta.inmutable())  # réplica sobre el mismo archivo que el primario
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        datos = connections['reporting'].settings_dict
+        self.addCleanup(datos.__setitem__, 'NAME', datos['NAME'])
+        datos['NAME'] = os.path.join(directorio, 'replica.sqlite3')
+        self.assertFalse(consulta.inmutable())  # copia sin marca de sincronización
+
+        for dias, esperado in ((8, False), (0, True)):
+            with open(archivo_marca(datos['NAME']), 'w', encoding='utf-8') as archivo:
+                archivo.write(str((timezone.now() - timedelta(days=dias)).timestamp()))
+            self.assertIs(consulta.inmutable(), esperado)
+
+    def test_hoy_se_invalida_con_una_venta_nueva(self):
+        self.vender()
+        self.assertEqual(self.client.get('/api/reporte-ventas/').data["resumen_boletas"]["cantidad_boletas"], 1)
+        self.vender()
+        self.assertEqual(self.client.get('/api/reporte-ventas/').data["resumen_boletas"]["cantidad_boletas"], 2)
+        self.assertEqual(cache_reportes.estadisticas()["aciertos"], 0)
+
+    @override_settings(REPORTES_CACHE_MAX=2)
+    def test_desalojo_lru(self):
+        dias = [(timezone.localdate() - timedelta(days=n)).isoformat() for n in (3, 4, 5)]
+        for dia in dias[:2]:
+            self.client.get(f'/api/reporte-ventas/?fecha={dia}')
+        self.client.get(f'/api/reporte-ventas/?fecha={dias[0]}')  # dias[0] pasa a ser el más reciente
+        self.client.get(f'/api/reporte-ventas/?fecha={dias[2]}')  # desaloja dias[1]
+
+        estadisticas = cache_reportes.estadisticas()
+        self.assertEqual((estadisticas["entradas"], estadisticas["desalojos"]), (2, 1))
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/reporte-ventas/?fecha={dias[0]}')
+
+
+@override_settings(INSTRUMENTACION=True, INSTRUMENTACION_UMBRAL_MS=60_000)
+class InstrumentacionTests(APITestCase):
+    def setUp(self):
+        histogramas.reiniciar()
+        self.jefe = User.objects.create_user(username='jefe', password='x', role='jefe venta')
+        self.client.force_authenticate(self.jefe)
+
+    @override_settings(INSTRUMENTACION_UMBRAL_MS=0)
+    def test_server_timing_log_e_histograma(self):
+        with self.assertLogs('tienda.instrumentacion', 'WARNING') as logs:
+            resp = self.client.get('/api/boletas/')
+            # Con umbral 0 también /api/metricas/ queda registrado como lento
+            metricas = self.client.get('/api/metricas/').json()
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertRegex(resp['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ consultas", ser;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn("Request lento: GET /api/boletas/", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+        ruta = metricas["rutas"]["GET api/boletas/"]
+        self.assertEqual(ruta["requests"], 1)
+        self.assertEqual(sum(ruta["histograma_ms"].values()), 1)
+
+    def test_metricas_solo_para_admin(self):
+        vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        self.client.force_authenticate(vendedor)
+        self.assertEqual(self.client.get('/api/metricas/').status_code, 403)
+
+    @override_settings(INSTRUMENTACION=False)
+    def test_desactivada_no_agrega_cabecera(self):
+        resp = self.client.get('/api/boletas/')
+        self.assertNotIn('Server-Timing', resp)
+        self.assertEqual(histogramas.como_dict(), {})
+
+
+@override_settings(INSTRUMENTACION=True, INSTRUMENTACION_UMBRAL_MS=60_000)
+class InstrumentacionAsyncTests(APITransactionTestCase):
+    databases = {'default', 'reporting'}
+
+    def setUp(self):
+        histogramas.reiniciar()
+        cache_reportes.reiniciar()
+        vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        producto = Producto.objects.create(nombre="Arroz", precio=Decimal('1000.00'), stock=1000)
+        registrar_venta(Boleta, {"vendedor": vendedor, "numero_boleta": "B1"},
+                        [{"producto": producto, "cantidad": 1, "precio_unitario": Decimal('1000.00')}])
+
+    async def test_cuenta_las_consultas_de_vistas_async(self):
+        # Camino ASGI: las consultas corren en hilos de sync_to_async(thread_sensitive=False)
+        resp = await AsyncClient().get('/api/reporte-ventas/async/')
+
+        self.assertEqual(resp.status_code, 200)
+        consultas = int(re.search(r'desc="(\d+) consultas"', resp['Server-Timing']).group(1))
+        self.assertGreater(consultas, 0)
+        self.assertEqual(histogramas.como_dict()["GET api/reporte-ventas/async/"]["requests"], 1)
+
+
+class FormatoJSONTests(APITestCase):
+    def assertMismaSalida(self, data, accepted_media_type=None):
+        self.assertEqual(
+            JSONRendererRapido().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_salida_identica_al_renderer_de_drf(self):
+        ahora = timezone.now()
+        casos = [
+            {"suma_total": Decimal('1190.00'), "suma_iva": Decimal('0.19'), "cantidad": 3},
+            [Decimal('12345678901234567.89'), Decimal('0.00001'), Decimal('-0.00'), 12.5, 0.001],
+            {"fecha": ahora, "dia": ahora.date(), "hora": ahora.time().replace(tzinfo=None)},
+            {"texto": "ñandú \u2028 \u2029 </script> \x00", 1: "clave entera"},
+            {"grande": 2 ** 70, "lista": (1, 2, 3)},
+        ]
+        for data in casos:
+            with self.subTest(data=data):
+                self.assertMismaSalida(data)
+        self.assertMismaSalida({"a": [1, 2]}, 'application/json; indent=4')
+
+    def test_nan_decimal_falla_como_en_drf(self):
+        with self.assertRaises(ValueError):
+            JSONRendererRapido().render({"total": Decimal('NaN')})
+
+    def test_listado_de_boletas_igual_byte_a_byte(self):
+        vendedor = User.objects.create_user(username='vendedor', password='x', role='vendedor')
+        producto = Producto.objects.create(nombre="Té", precio=Decimal('990.00'), stock=10)
+        registrar_venta(Boleta, {"vendedor": vendedor, "numero_boleta": "B1"},
+                        [{"producto": producto, "cantidad": 3, "precio_unitario": producto.precio}])
+        self.client.force_authenticate(vendedor)
+
+        resp = self.client.get('/api/boletas/', {"expand": "detalles"})
+        self.assertEqual(resp.content, JSONRenderer().render(resp.data))
+
+    def test_parser_acepta_y_rechaza_como_drf(self):
+        for cuerpo in (b'{"cantidad": 2, "precio": 990.5, "lista": [1, "\\u00f1"]}', b'[123456789012345678901234567890]'):
+            with self.subTest(cuerpo=cuerpo):
+                self.assertEqual(JSONParserRapido().parse(io.BytesIO(cuerpo)), JSONParser().parse(io.BytesIO(cuerpo)))
+        for cuerpo in (b'{"total": NaN}', b'{"a": 1'):
+            with self.subTest(cuerpo=cuerpo), self.assertRaises(ParseError):
+                JSONParserRapido().parse(io.BytesIO(cuerpo))
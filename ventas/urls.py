@@ -1,20 +1,32 @@
 from django.urls import path, include
 from rest_framework import routers
-from .views import BoletaViewSet, FacturaViewSet, GestionCajaView, AbrirCajaView, CerrarCajaView, OpcionesFiltroView, ReporteVentasView
+from .views import BoletaViewSet, FacturaViewSet, LibroVentasViewSet, GestionCajaView, AbrirCajaView, CerrarCajaView, OpcionesFiltroView, ReporteVentasView, VentasLoteView, OpcionesFiltroAsyncView, ReporteVentasAsyncView, ProductosTopView
 
 # Router específico de ventas
 router = routers.DefaultRouter()
 router.register(r'boletas', BoletaViewSet, basename='boleta')
 router.register(r'facturas', FacturaViewSet, basename='factura')
+# Libro de ventas: boletas y facturas en un solo listado (api/libro-ventas/)
+router.register(r'libro-ventas', LibroVentasViewSet, basename='libro-ventas')
 
 urlpatterns = [
-    # Rutas del router (api/boletas/, api/facturas/)
+    # Rutas del router (api/boletas/, api/facturas/, api/libro-ventas/)
     path('', include(router.urls)),
 
+    # Sincronización de ventas offline (varias boletas/facturas por request)
+    path('ventas/lote/', VentasLoteView.as_view(), name='ventas-lote'),
+
     path('filtros-reporte/', OpcionesFiltroView.as_view(), name='filtros-reporte'),
 
     path('reporte-ventas/', ReporteVentasView.as_view(), name='reporte-ventas'),
 
+    # Mismos reportes como vistas async (consultas en paralelo bajo ASGI)
+    path('filtros-reporte/async/', OpcionesFiltroAsyncView.as_view(), name='filtros-reporte-async'),
+    path('reporte-ventas/async/', ReporteVentasAsyncView.as_view(), name='reporte-ventas-async'),
+
+    # Ranking de productos por unidades/ingresos (jefes de venta)
+    path('analitica/productos/', ProductosTopView.as_view(), name='analitica-productos'),
+
     # Rutas manuales de Caja (api/caja/...)
     path('caja/estado/', GestionCajaView.as_view(), name='caja-estado'),
     path('caja/abrir/', AbrirCajaView.as_view(), name='caja-abrir'),
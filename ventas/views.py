@@ -1,164 +1,376 @@
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from usuarios.permisos import IsAdminOrVendedor, IsAdmin, IsVendedor
-from .models import Boleta, Factura
-from .serializers import BoletaSerializer, FacturaSerializer
+from .models import Boleta, Factura, DetalleVenta, LibroVenta
+from .serializers import (BoletaSerializer, FacturaSerializer, LibroVentaSerializer, SesionCajaSerializer,
+                          completar_folio, errores_de_integridad, ids_de_productos, registrar_venta_con_folio)
+from .services import StockInsuficiente, registrar_ventas, sesion_abierta
 
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
-from django.contrib.auth import get_user_model
+from usuarios.cache import obtener_vendedores
+from productos.models import Producto
 
-from django.db.models import Sum, Count
-from django.db.models.functions import Coalesce
-from decimal import Decimal
+from django.db.models import Prefetch
 
 from rest_framework.permissions import AllowAny
 
 from rest_framework.views import APIView
+from tienda.campos import CamposDinamicosViewMixin
+from tienda.db import LecturaReplicaMixin, leer_de_replica
 
 from .models import SesionCaja
+from .cache import cache_reportes
+from .exportar import respuesta_exportacion
+from .reportes import ConsultaReporte, RankingProductos, dias_con_ventas, ejecutar_en_paralelo, formato_resumen
+from .fechas import inicio_del_dia, leer_rango
+from .paginacion import PaginacionKeyset
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count, Sum
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from tienda.formato_json import JSONRendererRapido
+from usuarios.autenticacion import JWTClaimsAuthentication, id_usuario
+
 
 
+# Detalles con su producto en un solo viaje: DetalleVentaSerializer lee
+# producto.nombre y producto.precio en cada línea.
+DETALLES_CON_PRODUCTO = Prefetch(
+    'detalles',
+    queryset=DetalleVenta.objects.select_related('producto'),
+)
 
     
-class BoletaViewSet(viewsets.ModelViewSet):
+class BoletaViewSet(CamposDinamicosViewMixin, LecturaReplicaMixin, viewsets.ModelViewSet):
+    # Listado: 1 consulta (sólo cabeceras). Con ?expand=detalles o en el
+    # detalle de una boleta: 2 fijas, boletas + (detalles JOIN productos)
     queryset = Boleta.objects.all()
     serializer_class = BoletaSerializer
+    expansiones = {"detalles": DETALLES_CON_PRODUCTO}
 
 
-class FacturaViewSet(viewsets.ModelViewSet):
+class FacturaViewSet(CamposDinamicosViewMixin, LecturaReplicaMixin, viewsets.ModelViewSet):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
+    expansiones = {"detalles": DETALLES_CON_PRODUCTO}
+
+
+class LibroVentasViewSet(LecturaReplicaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Boletas y facturas juntas, de la más reciente a la más antigua, en una
+    sola consulta paginada por (fecha, id). Filtros: tipo, vendedor_id,
+    fecha/desde/hasta.
+    """
+    queryset = LibroVenta.objects.all()
+    serializer_class = LibroVentaSerializer
+    pagination_class = PaginacionKeyset
+    filter_backends = []
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+
+        tipo = params.get('tipo')
+        if tipo:
+            if tipo not in dict(LibroVenta.TIPO_CHOICES):
+                raise ValidationError({"tipo": "Use boleta o factura."})
+            qs = qs.filter(tipo=tipo)
+
+        vendedor_id = params.get('vendedor_id')
+        if vendedor_id:
+            qs = qs.filter(vendedor_id=vendedor_id)
+
+        desde, hasta = leer_rango(params)
+        if desde:
+            qs = qs.filter(fecha__gte=inicio_del_dia(desde))
+        if hasta:
+            qs = qs.filter(fecha__lt=inicio_del_dia(hasta + timedelta(days=1)))
+        return qs
+
+    # GET: libro-ventas/totales/ (mismos filtros, una consulta para ambos tipos)
+    @action(detail=False)
+    def totales(self, request):
+        por_tipo = {
+            fila['tipo']: fila
+            for fila in self.get_queryset().order_by().values('tipo').annotate(
+                cantidad=Count('id'),
+                total_neto=Sum('total_neto'),
+                total_iva=Sum('total_iva'),
+                total_final=Sum('total_final'),
+            )
+        }
+        vacio = {"cantidad": 0, "total_neto": Decimal('0.00'),
+                 "total_iva": Decimal('0.00'), "total_final": Decimal('0.00')}
+        filas = [por_tipo.get(tipo, vacio) for tipo, _ in LibroVenta.TIPO_CHOICES]
+        total = {campo: sum(fila[campo] for fila in filas) for campo in vacio}
+
+        return Response({
+            **{tipo: formato_resumen(fila) for (tipo, _), fila in zip(LibroVenta.TIPO_CHOICES, filas)},
+            "total": formato_resumen(total),
+        })
+
+
+# Lote de ventas offline: POST ventas/lote/ con {"boletas": [...], "facturas": [...]}
+MAX_DOCUMENTOS_LOTE = 500
+
+
+class VentasLoteView(APIView):
+    """
+    Sincronización de ventas hechas sin conexión. Valida cada documento por
+    separado y guarda todos los válidos de cada tipo con registrar_ventas
+    (una transacción por tipo). Devuelve un resultado por documento, en el
+    mismo orden recibido, así un documento malo no rechaza el lote.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrVendedor]
+
+    TIPOS = (
+        ('boletas', BoletaSerializer, 'numero_boleta'),
+        ('facturas', FacturaSerializer, 'numero_factura'),
+    )
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"detail": "Se esperaba un objeto con las listas 'boletas' y 'facturas'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        documentos = {tipo: request.data.get(tipo) or [] for tipo, _, _ in self.TIPOS}
+        no_listas = {tipo: ["Se esperaba una lista de documentos."]
+                     for tipo, valor in documentos.items() if not isinstance(valor, list)}
+        if no_listas:
+            return Response(no_listas, status=status.HTTP_400_BAD_REQUEST)
+
+        total = sum(len(lista) for lista in documentos.values())
+        if total > MAX_DOCUMENTOS_LOTE:
+            return Response({"detail": f"Máximo {MAX_DOCUMENTOS_LOTE} documentos por lote."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        resultados = {}
+        for tipo, serializer_class, campo_numero in self.TIPOS:
+            resultados[tipo] = self.procesar(request, documentos[tipo], serializer_class, campo_numero)
+
+        hubo_errores = any(r['estado'] != 'creado' for lista in resultados.values() for r in lista)
+        return Response(resultados, status=status.HTTP_207_MULTI_STATUS if hubo_errores else status.HTTP_201_CREATED)
+
+    def procesar(self, request, documentos, serializer_class, campo_numero):
+        resultados = [None] * len(documentos)
+        validos = []
+        numeros_vistos = set()
+        folios_del_servidor = set()
+
+        # Productos de todas las líneas del lote en una sola consulta
+        ids = set()
+        for datos in documentos:
+            if isinstance(datos, dict):
+                ids |= ids_de_productos(datos.get('detalles'))
+        productos = Producto.objects.in_bulk(ids)
+
+        for indice, datos in enumerate(documentos):
+            serializer = serializer_class(data=datos, context={'request': request, 'productos': productos})
+            if not serializer.is_valid():
+                resultados[indice] = {"indice": indice, "estado": "error", "errores": serializer.errors}
+                continue
+
+            validated_data = dict(serializer.validated_data)
+            if completar_folio(validated_data, serializer_class.Meta.model, request):
+                folios_del_servidor.add(indice)
+            numero = validated_data[campo_numero]
+            if numero in numeros_vistos:
+                resultados[indice] = {"indice": indice, "estado": "error",
+                                      "errores": {campo_numero: ["Número repetido dentro del lote."]}}
+                continue
+            numeros_vistos.add(numero)
+
+            detalles_data = validated_data.pop('detalles')
+            validated_data['vendedor_id'] = id_usuario(request.user)
+            validos.append((indice, validated_data, detalles_data))
+
+        if not validos:
+            return resultados
+
+        modelo = serializer_class.Meta.model
+        try:
+            creados = registrar_ventas(modelo, [(vd, dd) for _, vd, dd in validos])
+            for (indice, _, _), documento in zip(validos, creados):
+                resultados[indice] = self.creado(indice, documento)
+        except (IntegrityError, StockInsuficiente):
+            # Otro terminal ganó un número entre la validación y la escritura,
+            # el lote completo sobrevende o falló otra restricción de la BD:
+            # reintentamos de a uno para aislar a los documentos con problemas
+            # (en orden, como llegaron). Un folio asignado aquí que ya estaba
+            # usado se reemplaza por el siguiente
+            for indice, validated_data, detalles_data in validos:
+                try:
+                    documento = registrar_venta_con_folio(modelo, validated_data, detalles_data, request,
+                                                          folio_del_servidor=indice in folios_del_servidor)
+                    resultados[indice] = self.creado(indice, documento)
+                except IntegrityError:
+                    resultados[indice] = {"indice": indice, "estado": "error",
+                                          "errores": errores_de_integridad(modelo, validated_data[campo_numero])}
+                except StockInsuficiente as exc:
+                    resultados[indice] = {"indice": indice, "estado": "error",
+                                          "errores": {"detalles": [str(exc)]}}
+
+        return resultados
+
+    def creado(self, indice, documento):
+        return {"indice": indice, "estado": "creado", "id": documento.id}
 
 
 class GestionCajaView(APIView):
     # GET: caja/estado/
     def get(self, request):
-        # ¿Existe alguna sesión sin fecha de cierre?
-        esta_abierta = SesionCaja.objects.filter(fecha_cierre__isnull=True).exists()
-        return Response({"caja_abierta": esta_abierta})
+        # La sesión abierta (si hay) con sus totales: una lectura del índice parcial
+        sesion = sesion_abierta()
+        return Response({
+            "caja_abierta": sesion is not None,
+            "sesion": SesionCajaSerializer(sesion).data if sesion else None,
+        })
 
 class AbrirCajaView(APIView):
     # POST: caja/abrir/
     permission_classes = [AllowAny]
     def post(self, request):
-        # Si ya está abierta, no hacemos nada
-        if SesionCaja.objects.filter(fecha_cierre__isnull=True).exists():
+        # El índice único parcial impide una segunda sesión abierta, aun
+        # entre dos requests simultáneos
+        try:
+            with transaction.atomic():
+                sesion = SesionCaja.objects.create()
+        except IntegrityError:
             return Response({"detail": "Ya estaba abierta"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Creamos el registro (la fecha se pone sola automática)
-        SesionCaja.objects.create()
-        return Response({"detail": "Caja abierta"}, status=status.HTTP_201_CREATED)
+        return Response({"detail": "Caja abierta", "sesion": SesionCajaSerializer(sesion).data},
+                        status=status.HTTP_201_CREATED)
     
 class CerrarCajaView(APIView):
     # POST: caja/cerrar/
     def post(self, request):
         # Buscamos la sesión activa
-        sesion = SesionCaja.objects.filter(fecha_cierre__isnull=True).first()
+        sesion = sesion_abierta()
 
         if not sesion:
             return Response({"detail": "No hay caja abierta"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Cerramos poniendo la hora actual
+        # Cerramos poniendo la hora actual; los totales ya están acumulados
         sesion.fecha_cierre = timezone.now()
-        sesion.save()
+        sesion.save(update_fields=["fecha_cierre"])
 
-        return Response({"detail": "Caja cerrada"}, status=status.HTTP_200_OK)
+        return Response({"detail": "Caja cerrada", "sesion": SesionCajaSerializer(sesion).data},
+                        status=status.HTTP_200_OK)
     
 
 
 
-User = get_user_model()
-
-class OpcionesFiltroView(APIView):
+class OpcionesFiltroView(LecturaReplicaMixin, APIView):
     def get(self, request):
-        # 1. Obtener lista de usuarios que son vendedores (puedes filtrar por grupo o is_staff)
-        vendedores = User.objects.filter(role='vendedor', is_active=True).values('id', 'username', 'first_name', 'last_name')
-        
-        # 2. Opcional: Obtener fechas donde hubo ventas (para bloquear días vacíos en el calendario)
-        # Esto une fechas de boletas y facturas y elimina duplicados
-        fechas_boletas = Boleta.objects.values_list('fecha__date', flat=True)
-        fechas_facturas = Factura.objects.values_list('fecha__date', flat=True)
-        # Set elimina duplicados y ordenamos
-        dias_con_ventas = sorted(list(set(fechas_boletas) | set(fechas_facturas)))
+        # 1. Vendedores activos (cacheados, se invalidan al modificar usuarios)
+        vendedores = obtener_vendedores()
+
+        # 2. Días con ventas (para bloquear días vacíos en el calendario)
+        dias = dias_con_ventas(request.query_params.get('vendedor_id'))
 
         return Response({
-            "vendedores": list(vendedores),
-            "dias_disponibles": dias_con_ventas 
+            "vendedores": vendedores,
+            "dias_disponibles": dias 
         })
 
 
 
-class ReporteVentasView(APIView):
+class ReporteVentasView(LecturaReplicaMixin, APIView):
     def get(self, request):
-        # 1. Obtener parámetros
-        vendedor_id = request.query_params.get('vendedor_id')
-        fecha = request.query_params.get('fecha')
+        consulta = ConsultaReporte(request.query_params)
 
-        qs_boletas = Boleta.objects.all()
-        qs_facturas = Factura.objects.all()
+        # Exportación (?exportar=csv|ndjson): boletas, facturas y sus líneas en streaming
+        if consulta.exportar:
+            return respuesta_exportacion(consulta.exportar, consulta.qs_boletas, consulta.qs_facturas)
 
-        # 2. Filtros (Vendedor y Fecha)
-        if vendedor_id:
-            qs_boletas = qs_boletas.filter(vendedor_id=vendedor_id)
-            qs_facturas = qs_facturas.filter(vendedor_id=vendedor_id)
-
-        if fecha:
-            qs_boletas = qs_boletas.filter(fecha__date=fecha)
-            qs_facturas = qs_facturas.filter(fecha__date=fecha)
-
-        # 3. Agregación para BOLETAS (Solo totales, sin lista detallada)
-        reporte_boletas = qs_boletas.aggregate(
-            cantidad=Count('id'),
-            total_neto=Coalesce(Sum('total_neto'), Decimal('0.00')),
-            total_iva=Coalesce(Sum('total_iva'), Decimal('0.00')),
-            total_final=Coalesce(Sum('total_final'), Decimal('0.00'))
-        )
-
-        # 4. Agregación para FACTURAS (Totales generales de facturas)
-        reporte_facturas_totales = qs_facturas.aggregate(
-            cantidad=Count('id'),
-            total_neto=Coalesce(Sum('total_neto'), Decimal('0.00')),
-            total_iva=Coalesce(Sum('total_iva'), Decimal('0.00')),
-            total_final=Coalesce(Sum('total_final'), Decimal('0.00'))
-        )
-
-        # 5. LISTA DETALLADA DE FACTURAS
-        # Usamos .values() para traer solo los campos necesarios y mejorar rendimiento
-        lista_facturas = qs_facturas.values(
-            'numero_factura', 
-            'total_neto', 
-            'total_iva', 
-            'total_final'
-        ).order_by('numero_factura') # Opcional: ordenar por número
-
-        # 6. Construir Respuesta
-        data = {
-            "metadata": {
-                "vendedor": vendedor_id if vendedor_id else "Todos",
-                "fecha": fecha if fecha else "Histórico"
-            },
-            
-            # Sección Boletas (Solo resumen)
-            "resumen_boletas": {
-                "cantidad_boletas": reporte_boletas['cantidad'],
-                "suma_neto": reporte_boletas['total_neto'],
-                "suma_iva": reporte_boletas['total_iva'],
-                "suma_total": reporte_boletas['total_final']
-            },
-
-            # Sección Facturas (Resumen + Detalle)
-            "facturas": {
-                "resumen": {
-                    "cantidad_facturas": reporte_facturas_totales['cantidad'],
-                    "suma_neto": reporte_facturas_totales['total_neto'],
-                    "suma_iva": reporte_facturas_totales['total_iva'],
-                    "suma_total": reporte_facturas_totales['total_final']
-                },
-                # Aquí está la lista solicitada
-                "detalle_lista": list(lista_facturas)
-            }
-        }
+        # Días cerrados: una vez calculado, el reporte sale de la caché
+        def generar():
+            return consulta.armar({nombre: tarea() for nombre, tarea in consulta.tareas().items()})
+
+        return Response(cache_reportes.obtener(consulta.clave(), generar, consulta.inmutable()))
+
+
+
+class ProductosTopView(LecturaReplicaMixin, APIView):
+    # GET: analitica/productos/?desde=&hasta=&vendedor_id=&orden=ingresos|unidades&limite=&group_by=
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(RankingProductos(request.query_params).resultado())
+
+
+# -----------------------------------------------------------------------------
+# VERSIONES ASÍNCRONAS (ASGI)
+# Mismas respuestas byte a byte que OpcionesFiltroView y ReporteVentasView,
+# pero las consultas independientes corren a la vez, cada una en su hilo y
+# con su propia conexión, sin ocupar un worker mientras esperan a la BD.
+# -----------------------------------------------------------------------------
+class VistaAsyncAPI(View):
+    """Base mínima: autenticación JWT y errores/render como en DRF."""
+
+    autenticacion = JWTClaimsAuthentication
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            await self.autenticar(request)
+            # Igual que LecturaReplicaMixin: sólo GET, que nunca escribe
+            leer_de_replica()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.respuesta_error(request, exc)
+
+    async def autenticar(self, request):
+        autenticador = self.autenticacion()
+        resultado = await sync_to_async(autenticador.authenticate)(request)
+        if resultado is not None:
+            request.user, request.auth = resultado
+
+    def respuesta_error(self, request, exc):
+        # Mismo cuerpo que exception_handler de DRF
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        respuesta = self.respuesta(data, status=exc.status_code)
+        if isinstance(exc, AuthenticationFailed):
+            respuesta.status_code = status.HTTP_401_UNAUTHORIZED
+            respuesta['WWW-Authenticate'] = self.autenticacion().authenticate_header(request)
+        return respuesta
+
+    def respuesta(self, data, status=200):
+        renderer = JSONRendererRapido()
+        return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+class OpcionesFiltroAsyncView(VistaAsyncAPI):
+    # GET: filtros-reporte/async/
+    async def get(self, request):
+        vendedor_id = request.GET.get('vendedor_id')
+        resultados = await ejecutar_en_paralelo({
+            "vendedores": obtener_vendedores,
+            "dias_disponibles": lambda: dias_con_ventas(vendedor_id),
+        })
+        return self.respuesta(resultados)
+
+
+class ReporteVentasAsyncView(VistaAsyncAPI):
+    # GET: reporte-ventas/async/
+    async def get(self, request):
+        consulta = ConsultaReporte(request.GET)
+
+        if consulta.exportar:
+            # Mismas filas que la vista síncrona, transmitidas por bloques desde un generador async
+            return respuesta_exportacion(consulta.exportar, consulta.qs_boletas, consulta.qs_facturas,
+                                         asincrona=True)
 
-        return Response(data)
\ No newline at end of file
+        data, version = cache_reportes.buscar(consulta.clave())
+        if data is None:
+            data = consulta.armar(await ejecutar_en_paralelo(consulta.tareas()))
+            cache_reportes.guardar(consulta.clave(), data, consulta.inmutable(), version)
+        return self.respuesta(data)